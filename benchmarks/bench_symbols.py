@@ -0,0 +1,94 @@
+# bench_symbols.py
+"""Payload bits per chaotic step against symbol error rate.
+
+Runs transmitter and receiver in-process (no sockets): the masked states
+are rounded to float32 as on the wire, optional Gaussian channel noise
+is added, and the receiver recovers s_r = v - w on every component
+(decision-directed, as ReceiverCore decodes).
+
+Run from the repository root:  python -m benchmarks.bench_symbols
+"""
+import argparse
+import contextlib
+import json
+import sys
+import numpy as np
+from utilities.lorenz import ChaoticSystem
+from utilities.perturbation import PerturbationDecoder, PerturbationEncoder, SymbolMapper
+from utilities.receiver import ReceiverCore
+
+CONFIGS = [(1, 8), (2, 8), (3, 8), (3, 10), (3, 12), (3, 14), (3, 16)]
+
+
+def _channel(states, noise, rng):
+    states = states.astype(np.float32)
+    if noise:
+        states += rng.normal(0.0, noise, states.shape).astype(np.float32)
+    return states
+
+
+def _synchronized_pair(noise, rng):
+    transmitter = ChaoticSystem()
+    receiver = ReceiverCore(plot=False)
+    # Heavy noise can keep the error average above the lock threshold;
+    # decode anyway after 5000 steps so the SER shows the damage
+    for _ in range(50):
+        receiver.process_block(_channel(transmitter.integrate(100), noise, rng))
+        if receiver.synchronized:
+            break
+    return transmitter, receiver
+
+
+def symbol_error_rate(mapper, n_bytes=4096, noise=0.0, seed=0):
+    """(bits per step, SER); mapper None is the legacy 1-char-per-step scheme"""
+    rng = np.random.default_rng(seed)
+    transmitter, receiver = _synchronized_pair(noise, rng)
+
+    if mapper is None:
+        codes = rng.integers(32, 127, n_bytes, dtype=np.uint8)
+        true_states = transmitter.integrate(n_bytes)
+        masked = true_states.copy()
+        masked[:, 0] += PerturbationEncoder.encode_array(codes.tobytes())
+        recovered, _ = receiver.recover_components(_channel(masked, noise, rng),
+                                                   (PerturbationEncoder.SCALE_FACTOR, 95))
+        decoded = np.frombuffer(PerturbationDecoder.decode_array(recovered[:, 0]), np.uint8)
+        return float(np.log2(95)), float(np.mean(decoded != codes))
+
+    data = rng.integers(0, 256, n_bytes, dtype=np.uint8).tobytes()
+    sent = mapper.symbols_from_bytes(data)
+    perturb = mapper.map(data)
+    true_states = transmitter.integrate(len(perturb))
+    recovered, _ = receiver.recover_components(_channel(true_states + perturb, noise, rng),
+                                               (mapper.step, mapper.mark))
+    received = mapper.demap_symbols(recovered).reshape(-1)
+    return float(mapper.bits_per_step), float(np.mean(received != sent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bytes', type=int, default=4096)
+    parser.add_argument('--noise', type=float, nargs='+', default=[0.0, 1e-6, 1e-5, 1e-4])
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    rows = []
+    for components, bits in [(None, None)] + CONFIGS:
+        mapper = SymbolMapper(components, bits) if components else None
+        label = f"{components}x{bits}-bit" if components else "legacy ascii"
+        # Receiver progress messages stay out of the table / JSON on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            results = [symbol_error_rate(mapper, args.bytes, noise) for noise in args.noise]
+        rows.append({'scheme': label, 'bits_per_step': results[0][0],
+                     'ser': {str(n): r[1] for n, r in zip(args.noise, results)}})
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'scheme':>14} {'bits/step':>9} " + " ".join(f"SER@{n:<8g}" for n in args.noise))
+    for row in rows:
+        print(f"{row['scheme']:>14} {row['bits_per_step']:9.2f} "
+              + " ".join(f"{ser:<12.2e}" for ser in row['ser'].values()))
+
+
+if __name__ == "__main__":
+    main()
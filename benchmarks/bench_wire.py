@@ -0,0 +1,43 @@
+# bench_wire.py
+"""Encode/decode cost per frame: binary wire format vs legacy pickle.
+
+Run from the repository root:  python -m benchmarks.bench_wire
+"""
+import argparse
+import time
+import numpy as np
+from utilities.wire import get_codec
+
+
+def time_ns_per_call(func, n_frames):
+    start = time.perf_counter_ns()
+    for _ in range(n_frames):
+        func()
+    return (time.perf_counter_ns() - start) / n_frames
+
+
+def bench_codec(name, n_frames=100000):
+    encode, decode = get_codec(name)
+    state = np.array([0.1, 0.11, 0.12])
+    true_state = state.copy()
+    packet = encode(state, true_state, seq=1)
+    return {
+        'codec': name,
+        'frame_bytes': len(packet),
+        'encode_ns': time_ns_per_call(lambda: encode(state, true_state, seq=1), n_frames),
+        'decode_ns': time_ns_per_call(lambda: decode(packet), n_frames),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100000)
+    args = parser.parse_args()
+    for name in ('binary', 'pickle'):
+        r = bench_codec(name, args.frames)
+        print(f"{r['codec']:>7}: {r['frame_bytes']:4d} B/frame  "
+              f"encode {r['encode_ns']:8.0f} ns/frame  decode {r['decode_ns']:8.0f} ns/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,530 @@
+# suite.py
+"""Reproducible performance benchmarks with JSON output.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --only integrator codec --compare baseline.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import numpy as np
+from benchmarks.bench_wire import bench_codec
+from utilities.checkpoints import CheckpointStore
+from utilities.communication import Communicator
+from utilities.lorenz import ChaoticEnsemble, ChaoticSystem
+from utilities.pacing import Pacer
+from utilities.perturbation import PerturbationDecoder, PerturbationEncoder, SymbolMapper
+from utilities.receiver import Receiver, ReceiverCore
+from utilities.sender import SecureSender
+from utilities.server import SessionServer
+from utilities.stream import StreamEncoder, decode_trajectory
+from utilities.transport import QueueTransport, UnixTransport
+from utilities.wire import FLAG_PREAMBLE, decode_frame, encode_frame
+
+MESSAGE = "The quick brown fox jumps over the lazy dog. 0123456789 "
+
+
+def _rate(count, seconds):
+    return count / max(seconds, 1e-9)
+
+
+def bench_integrator(n_steps=50000, ensemble_size=10000):
+    system = ChaoticSystem()
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        system.continuous_step()
+    step_rate = _rate(n_steps, time.perf_counter() - start)
+
+    out = np.empty((n_steps, 3))
+    start = time.perf_counter()
+    system.integrate(n_steps, out=out)
+    integrate_rate = _rate(n_steps, time.perf_counter() - start)
+
+    exact = ChaoticSystem(method='exact')
+    n_exact = n_steps // 10
+    start = time.perf_counter()
+    exact.integrate(n_exact)
+    exact_rate = _rate(n_exact, time.perf_counter() - start)
+
+    ensemble = ChaoticEnsemble(ensemble_size, system_type='receiver')
+    errors = np.zeros(ensemble_size)
+    n_ensemble = 100
+    start = time.perf_counter()
+    for _ in range(n_ensemble):
+        ensemble.step(errors)
+    ensemble_rate = _rate(n_ensemble * ensemble_size, time.perf_counter() - start)
+
+    return {
+        'continuous_step_steps_per_s': step_rate,
+        'integrate_steps_per_s': integrate_rate,
+        'integrate_exact_steps_per_s': exact_rate,
+        'ensemble_system_steps_per_s': ensemble_rate,
+    }
+
+
+def bench_codec_chars(n_chars=50000):
+    text = (MESSAGE * (n_chars // len(MESSAGE) + 1))[:n_chars]
+    start = time.perf_counter()
+    perturbations = [PerturbationEncoder.encode(c) for c in text]
+    encode_rate = _rate(n_chars, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    decoded = ''.join(PerturbationDecoder.decode(p) for p in perturbations)
+    decode_rate = _rate(n_chars, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    values = PerturbationEncoder.encode_array(text)
+    encode_array_rate = _rate(n_chars, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    decoded_array = PerturbationDecoder.decode_array(values).decode('latin-1')
+    decode_array_rate = _rate(n_chars, time.perf_counter() - start)
+
+    wire = {r['codec']: r for r in (bench_codec(name, n_chars) for name in ('binary', 'pickle'))}
+    return {
+        'encode_chars_per_s': encode_rate,
+        'decode_chars_per_s': decode_rate,
+        'encode_array_chars_per_s': encode_array_rate,
+        'decode_array_chars_per_s': decode_array_rate,
+        'roundtrip_ok': decoded == text == decoded_array,
+        'wire': wire,
+    }
+
+
+def _transport_pair(kind, port, tmp):
+    """(receiver, sender) Communicators and the destination for a backend"""
+    if kind == 'udp':
+        return (Communicator(port=port, is_sender=False),
+                Communicator(port=0, is_sender=True), f"localhost:{port}")
+    if kind == 'unix':
+        path = os.path.join(tmp, 'receiver.sock')
+        return (Communicator(0, False, transport=UnixTransport(path)),
+                Communicator(0, True, transport=UnixTransport()), path)
+    receiver = QueueTransport()
+    return (Communicator(0, False, transport=receiver),
+            Communicator(0, True, transport=QueueTransport()), receiver.address)
+
+
+def bench_transport(port, n_frames=20000, burst=64, kinds=('udp', 'unix', 'queue')):
+    """Send/receive frames in bursts on one thread, per transport backend"""
+    state = np.array([0.1, 0.11, 0.12])
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in kinds:
+            receiver, sender, dest = _transport_pair(kind, port, tmp)
+            # A Unix datagram receiver queues only net.unix.max_dgram_qlen
+            # datagrams (often 10) before a blocking sender stalls
+            n_burst = min(burst, 8) if kind == 'unix' else burst
+            received = 0
+            send_time = receive_time = 0.0
+            try:
+                for _ in range(n_frames // n_burst):
+                    start = time.perf_counter()
+                    for _ in range(n_burst):
+                        sender.send(state, true_state=state, dest=dest)
+                    send_time += time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    received += len(receiver.receive_frames(timeout=0.01))
+                    receive_time += time.perf_counter() - start
+            finally:
+                receiver.close()
+                sender.close()
+            sent = (n_frames // n_burst) * n_burst
+            results[kind] = {
+                'send_frames_per_s': _rate(sent, send_time),
+                'receive_frames_per_s': _rate(received, receive_time),
+                'frames_lost': sent - received,
+            }
+    return results
+
+
+def bench_in_process(n_chars=5000, batch_size='auto'):
+    """SecureSender and Receiver in one thread over an in-process queue"""
+    message = (MESSAGE * (n_chars // len(MESSAGE) + 1))[:n_chars]
+    link = QueueTransport()
+    receiver = Receiver(plot=False, transport=link)
+    sender = SecureSender(batch_size=batch_size, rate=None, handshake=False,
+                          transport=QueueTransport(), dest=link.address)
+    try:
+        start = time.perf_counter()
+        sender._synchronization_preamble()
+        while receiver.poll(0):
+            pass
+        sender.send_message(message)
+        while receiver.poll(0):
+            pass
+        elapsed = time.perf_counter() - start
+    finally:
+        receiver.close()
+        receiver.comm.close()
+        sender.comm.close()
+    decoded = ''.join(receiver.decoded_buffer)
+    return {
+        'samples_per_s': _rate(sender.samples_sent, elapsed),
+        'synchronized': receiver.synchronized,
+        'accuracy': sum(a == b for a, b in zip(decoded, message)) / len(message),
+    }
+
+
+def bench_pacing(duration=0.5, rates=(1000, 10000, 100000, None)):
+    """Achieved vs target rate of the sender pacer, one sample per wait"""
+    results = {}
+    for rate in rates:
+        pacer = Pacer(rate=rate)
+        n = int(rate * duration) if rate else 200000
+        for _ in range(n):
+            pacer.wait(1)
+        stats = pacer.stats()
+        results[str(rate or 'unthrottled')] = {
+            'achieved_samples_per_s': stats['achieved_rate'],
+            'ratio': stats['achieved_rate'] / rate if rate else None,
+        }
+    return results
+
+
+def bench_loss(losses=(0.0, 0.01, 0.05, 0.2), n_chars=2000, reorder=0.05, seed=0):
+    """In-process lossy, reordering channel into one ReceiverCore
+
+    Accuracy is over the samples that were delivered; the receiver must
+    stay locked without a new preamble.
+    """
+    message = (MESSAGE * (n_chars // len(MESSAGE) + 1))[:n_chars]
+    results = {}
+    for loss in losses:
+        rng = random.Random(seed)
+        transmitter, receiver = ChaoticSystem(), ReceiverCore(plot=False)
+        preamble = transmitter.integrate(300)
+        for i, state in enumerate(preamble):
+            receiver.handle_frame(decode_frame(encode_frame(state, seq=i, flags=FLAG_PREAMBLE)))
+
+        base = transmitter.steps
+        states = transmitter.integrate(n_chars)
+        states[:, 0] += PerturbationEncoder.encode_array(message)
+        delivered = [i for i in range(n_chars) if rng.random() >= loss]
+        for j in range(len(delivered) - 1):
+            if rng.random() < reorder:
+                delivered[j], delivered[j + 1] = delivered[j + 1], delivered[j]
+        start = len(receiver.decoded_buffer)
+        for i in delivered:
+            receiver.handle_frame(decode_frame(encode_frame(states[i], seq=base + i)))
+        receiver.flush_reorder()
+
+        expected = [message[i] for i in sorted(delivered)]
+        decoded = receiver.decoded_buffer[start:]
+        counters = receiver.metrics.counters
+        results[str(loss)] = {
+            'accuracy': sum(a == b for a, b in zip(decoded, expected)) / len(expected),
+            'synchronized': receiver.synchronized,
+            'samples_lost': counters['samples_lost'].value,
+            'sync_resets': counters['sync_resets'].value,
+        }
+    return results
+
+
+def bench_checkpoints(n=200000, n_seeks=200, seed=0):
+    """Seek to random steps: first pass fills checkpoints, second reuses them"""
+    rng = np.random.default_rng(seed)
+    targets = rng.integers(0, n, n_seeks).tolist()
+    store = CheckpointStore(interval=1000)
+    system = ChaoticSystem(system_type='receiver')
+    start = time.perf_counter()
+    store.seek(system, n)
+    fill_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for target in targets:
+        store.seek(system, target)
+    seek_seconds = time.perf_counter() - start
+
+    # Late joiner: receiver starting mid-stream, with and without a seek
+    transmitter = ChaoticSystem()
+    transmitter.integrate(n // 4)
+    first = transmitter.steps
+    preamble = transmitter.integrate(1000)
+    lock = {}
+    for name, checkpoints in (('cold', None), ('seek', store)):
+        receiver = ReceiverCore(plot=False, checkpoints=checkpoints)
+        lock[name] = None
+        for i, state in enumerate(preamble):
+            receiver.handle_frame(decode_frame(encode_frame(state, seq=first + i)))
+            if receiver.synchronized:
+                lock[name] = i + 1
+                break
+    return {
+        'fill_steps_per_s': _rate(n, fill_seconds),
+        'seek_ms': 1e3 * seek_seconds / n_seeks,
+        'late_join_lock_steps_cold': lock['cold'],
+        'late_join_lock_steps_seek': lock['seek'],
+    }
+
+
+def bench_stream(n_bytes=1 << 20, seed=0):
+    """File -> memmapped masked trajectory -> file, byte exact"""
+    payload = np.random.default_rng(seed).integers(0, 256, n_bytes, dtype=np.uint8).tobytes()
+    with tempfile.TemporaryDirectory() as tmp:
+        source, trajectory, output = (os.path.join(tmp, name)
+                                      for name in ('in.bin', 'trajectory.npy', 'out.bin'))
+        with open(source, 'wb') as f:
+            f.write(payload)
+        # Offline: the sender only integrates and masks, no socket needed
+        sender = SecureSender(comm=types.SimpleNamespace(), symbol_mapper=SymbolMapper())
+        start = time.perf_counter()
+        StreamEncoder(sender).to_memmap(source, trajectory)
+        encode_seconds = time.perf_counter() - start
+        receiver = ReceiverCore(plot=False, symbol_mapper=SymbolMapper())
+        start = time.perf_counter()
+        decode_trajectory(trajectory, output, receiver)
+        decode_seconds = time.perf_counter() - start
+        with open(output, 'rb') as f:
+            exact = f.read() == payload
+    return {
+        'encode_bytes_per_s': _rate(n_bytes, encode_seconds),
+        'decode_bytes_per_s': _rate(n_bytes, decode_seconds),
+        'byte_exact': exact,
+    }
+
+
+def bench_startup(port, roles=('receiver --no-plot', 'server'), runs=5):
+    """Wall time from spawning main.py to its ready line, per headless role"""
+    results = {}
+    for role in roles:
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            proc = subprocess.Popen(
+                [sys.executable, 'main.py', '--timing', *role.split(), '--port', str(port)],
+                stdout=subprocess.PIPE, text=True)
+            try:
+                for line in proc.stdout:
+                    if 'ready in' in line:
+                        times.append(time.perf_counter() - start)
+                        break
+            finally:
+                proc.kill()
+                proc.wait()
+        results[role.split()[0] + '_ms'] = 1e3 * float(np.median(times)) if times else None
+    return results
+
+
+def _loopback(port, message, batch_size, rate=None, handshake=True, timeout=30.0):
+    """Headless SecureSender -> Receiver over localhost"""
+    receiver = Receiver(port=port, plot=False)
+    stop = threading.Event()
+    sync_done = threading.Event()
+
+    def receive_loop():
+        while not stop.is_set():
+            frame = receiver.comm.receive_frame()
+            if frame is None:
+                continue
+            receiver.handle_frame(frame)
+            if receiver.synchronized:
+                sync_done.set()
+
+    thread = threading.Thread(target=receive_loop, daemon=True)
+    thread.start()
+    sender = SecureSender(dest_port=port, batch_size=batch_size, rate=rate,
+                          handshake=handshake)
+    try:
+        start = time.perf_counter()
+        preamble_steps = sender._synchronization_preamble()
+        sync_done.wait(timeout)
+        sync_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sender.send_message(message)
+        deadline = time.monotonic() + timeout
+        while receiver.samples_received < sender.samples_sent and time.monotonic() < deadline:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+    finally:
+        stop.set()
+        thread.join()
+        receiver.close()
+        receiver.comm.close()
+        sender.comm.close()
+
+    decoded = ''.join(receiver.decoded_buffer)
+    correct = sum(a == b for a, b in zip(decoded, message))
+    steps = receiver.metrics.histograms['sync_convergence_steps']
+    return {
+        'synchronized': receiver.synchronized,
+        'sync_steps': steps.max if steps.count else None,
+        'sync_seconds': sync_seconds,
+        'sync_preamble_steps': preamble_steps,
+        'chars_per_s': _rate(len(message), elapsed),
+        'accuracy': correct / len(message),
+        'samples_lost': sender.samples_sent - receiver.samples_received,
+    }
+
+
+def bench_sync(port, batch_size='auto', rate=None, handshake=True):
+    return {k: v for k, v in _loopback(port, ' ', batch_size, rate, handshake).items()
+            if k.startswith('sync') or k == 'synchronized'}
+
+
+def bench_end_to_end(port, n_chars=5000, batch_size='auto', rate=None, handshake=True):
+    message = (MESSAGE * (n_chars // len(MESSAGE) + 1))[:n_chars]
+    return _loopback(port, message, batch_size, rate, handshake)
+
+
+def bench_sessions(port, n_sessions=2000, preamble=150, block=50):
+    """Many synthetic links into one SessionServer, interleaved on one thread"""
+    server = SessionServer(port=port, capacity=n_sessions)
+    transmitters = ChaoticEnsemble(n_sessions)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    message = MESSAGE[:20]
+    codes = PerturbationEncoder.encode_array(message)
+    server_time = 0.0
+
+    def drain():
+        nonlocal server_time
+        start = time.perf_counter()
+        while True:
+            datagrams = server.receive_batch(0.01)
+            if not datagrams:
+                break
+            server.process(datagrams)
+        server_time += time.perf_counter() - start
+
+    try:
+        n_steps = preamble + len(message)
+        trajectory = np.empty((n_steps, n_sessions, 3))
+        for i in range(n_steps):
+            trajectory[i] = transmitters.step()
+        trajectory[preamble:, :, 0] += codes[:, None]
+        blocks = [(s, min(s + block, preamble)) for s in range(0, preamble, block)]
+        blocks.append((preamble, n_steps))
+        for start, end in blocks:
+            flags = FLAG_PREAMBLE if start < preamble else 0
+            for session in range(n_sessions):
+                sock.sendto(encode_frame(trajectory[start:end, session], seq=start,
+                                         flags=flags, session=session), ('127.0.0.1', port))
+                if session % 500 == 499:
+                    drain()  # Keep the socket buffer from overflowing
+            drain()
+    finally:
+        server.close()
+        sock.close()
+
+    decoded = sum(''.join(server.decoded.get(s, [])).endswith(message)
+                  for s in range(n_sessions))
+    return {
+        'sessions': n_sessions,
+        'sessions_synchronized': int(server.synchronized.sum()),
+        'sessions_decoded': decoded,
+        'samples_per_s': _rate(server.metrics.counters['samples_received'].value, server_time),
+        'packets_per_s': _rate(server.metrics.counters['packets_received'].value, server_time),
+    }
+
+
+BENCHMARKS = {
+    'integrator': lambda args: bench_integrator(),
+    'codec': lambda args: bench_codec_chars(),
+    'pacing': lambda args: bench_pacing(),
+    'transport': lambda args: bench_transport(args.port),
+    'in_process': lambda args: bench_in_process(args.chars, args.batch_size),
+    'sync': lambda args: bench_sync(args.port + 1, args.batch_size, args.rate,
+                                    not args.no_handshake),
+    'end_to_end': lambda args: bench_end_to_end(args.port + 2, args.chars, args.batch_size,
+                                                args.rate, not args.no_handshake),
+    'sessions': lambda args: bench_sessions(args.port + 3, args.sessions),
+    'loss': lambda args: bench_loss(),
+    'checkpoints': lambda args: bench_checkpoints(),
+    'stream': lambda args: bench_stream(),
+    'startup': lambda args: bench_startup(args.port + 4),
+}
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.time(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def _flatten(results, prefix=''):
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(baseline, current):
+    """Print each numeric result next to the baseline and their ratio"""
+    old = dict(_flatten(baseline['results']))
+    for name, value in _flatten(current['results']):
+        if name in old and old[name]:
+            print(f"{name:60s} {old[name]:14.4g} -> {value:14.4g}  x{value / old[name]:.2f}")
+
+
+def _batch_size(value):
+    return value if value == 'auto' else int(value)
+
+
+def _rate_arg(value):
+    return None if value == 'none' else float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chaos link performance benchmarks")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS),
+                        help="run a subset (default: all)")
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--compare', help="baseline results JSON to compare against")
+    parser.add_argument('--port', type=int, default=12360,
+                        help="first of five localhost ports to use")
+    parser.add_argument('--chars', type=int, default=5000,
+                        help="message length for the end-to-end run")
+    parser.add_argument('--batch-size', type=_batch_size, default='auto',
+                        help="sender samples per datagram, or 'auto'")
+    parser.add_argument('--rate', type=_rate_arg, default=50000,
+                        help="sender samples/sec for loopback runs, or 'none' for unthrottled")
+    parser.add_argument('--sessions', type=int, default=2000,
+                        help="concurrent links for the session server run")
+    parser.add_argument('--no-handshake', action='store_true',
+                        help="always send the full 1000-step preamble")
+    args = parser.parse_args(argv)
+
+    report = {'meta': _metadata(), 'results': {}}
+    for name in args.only or BENCHMARKS:
+        print(f"[BENCH] {name}...", file=sys.stderr)
+        # Keep sender/receiver progress lines out of the JSON on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            report['results'][name] = BENCHMARKS[name](args)
+
+    text = json.dumps(report, indent=2, default=float)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,302 @@
-from utilities.sender import SecureSender
-from utilities.receiver import Receiver
-
-def main():
-    role = input("Enter role [sender/receiver]: ").lower()
-    
-    if role.startswith('s'):
-        SecureSender().run()
-    elif role.startswith('r'):
-        Receiver().run()
+# main.py
+"""Command-line entry point
+
+    python main.py receiver --no-plot --port 12346
+    python main.py sender --port 12346 --rate 50000 --message "hello"
+    python main.py server --port 12346 --sessions 20000
+    python main.py cluster --port 12346 --workers 4
+    python main.py loadgen --sessions 1000 --loss 0.05 --burst 3
+
+Each role imports only what it uses (the plotting stack only with a
+plotting receiver), so headless instances start quickly; --timing
+prints the time from interpreter start to ready. Senders and receivers
+dump a per-stage time breakdown on SIGUSR1 and cProfile the next packets
+on SIGUSR2 (see utilities/profiling.py).
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+
+
+def _ready(args, role):
+    if args.timing:
+        print(f"[MAIN] {role} ready in {1e3 * (time.perf_counter() - _STARTED):.1f} ms")
+
+
+def _rate(value):
+    return None if value == 'none' else float(value)
+
+
+def _batch_size(value):
+    return value if value == 'auto' else int(value)
+
+
+def _mapper(args):
+    if not args.symbols:
+        return None
+    from utilities.perturbation import SymbolMapper
+    return SymbolMapper()
+
+
+def _checkpoints(args):
+    if not args.checkpoints:
+        return None
+    from utilities.checkpoints import CheckpointStore
+    return CheckpointStore(path=args.checkpoint_dir)
+
+
+def _profiling(args, profiler):
+    """--profile turns the stage timers on; SIGUSR1/SIGUSR2 work either way"""
+    if args.profile:
+        profiler.enable()
+    profiler.install_signals(args.profile_packets, args.profile_out)
+
+
+def run_sender(args):
+    from utilities.sender import SecureSender
+    transport = None
+    if args.unix:
+        from utilities.transport import UnixTransport
+        transport = UnixTransport()
+    sender = SecureSender(dest_port=args.port, host=args.host, batch_size=args.batch_size,
+                          symbol_mapper=_mapper(args), rate=args.rate, burst=args.burst,
+                          handshake=not args.no_handshake, session=args.session,
+                          transport=transport, dest=args.unix)
+    _profiling(args, sender.profiler)
+    _ready(args, 'sender')
+    if args.file is None and args.message is None:
+        sender.run()
+        return
+    try:
+        sender._synchronization_preamble()
+        if args.message is not None:
+            sender.send_message(args.message)
+        if args.file is not None:
+            steps = sender.send_file(args.file)
+            print(f"[SENDER] {args.file}: {steps} steps sent ({sender.pacer.describe()})")
+    finally:
+        if sender.profiler.enabled:
+            sender.profiler.dump()
+        sender.comm.close()
+
+
+def run_receiver(args):
+    if args.use_async:
+        import asyncio
+        from utilities.aio import AsyncReceiver
+        receiver = AsyncReceiver(port=args.port, plot=not args.no_plot,
+                                 on_message=lambda text: print(text, end='', flush=True),
+                                 symbol_mapper=_mapper(args), checkpoints=_checkpoints(args))
+        _profiling(args, receiver.profiler)
+        _ready(args, 'receiver')
+        try:
+            asyncio.run(receiver.run())
+        except KeyboardInterrupt:
+            pass
+        if receiver.profiler.enabled:
+            receiver.profiler.dump()
+        return
+    from utilities.receiver import Receiver
+    transport = None
+    if args.unix:
+        from utilities.transport import UnixTransport
+        transport = UnixTransport(args.unix)
+    receiver = Receiver(port=args.port, plot=not args.no_plot,
+                        metrics_interval=args.metrics_interval, metrics_path=args.metrics_path,
+                        checkpoints=_checkpoints(args), symbol_mapper=_mapper(args),
+                        output=args.output, transport=transport)
+    _profiling(args, receiver.profiler)
+    _ready(args, 'receiver')
+    receiver.run()
+
+
+def _print_message(session, text):
+    print(f"[{session}] {text}", flush=True)
+
+
+def run_server(args):
+    from utilities.server import SessionServer
+    server = SessionServer(port=args.port, host=args.host, capacity=args.sessions,
+                           idle_timeout=args.idle_timeout, on_message=_print_message,
+                           reuse_port=args.reuse_port, checkpoints=_checkpoints(args))
+    _ready(args, 'server')
+    server.run()
+
+
+def run_cluster(args):
+    from utilities.cluster import ReceiverCluster
+    cluster = ReceiverCluster(port=args.port, host=args.host, workers=args.workers,
+                              mode=args.mode, on_message=_print_message,
+                              capacity=args.sessions, idle_timeout=args.idle_timeout,
+                              checkpoints=_checkpoints(args))
+    cluster.start()
+    _ready(args, 'cluster')
+    cluster.run(args.duration)
+    print(cluster.metrics_snapshot()['counters'])
+
+
+def run_loadgen(args):
+    if args.attach:
+        # Load a receiver that is already running; no capacity search
+        from utilities.loadgen import LoadGenerator
+        generator = LoadGenerator(args.sessions, args.port, host=args.host, block=args.block,
+                                  rate=args.rate, loss=args.loss, burst=args.burst,
+                                  first_session=args.first_session, seed=args.seed)
+        _ready(args, 'loadgen')
+        try:
+            achieved = generator.run(args.duration)
+        finally:
+            generator.close()
+        print(f"[LOADGEN] {achieved:.0f} pkts/s, {generator.packets_sent} sent, "
+              f"{int(generator.acked.sum())}/{args.sessions} sessions locked")
+        return
+    from utilities.loadgen import find_capacity
+    _ready(args, 'loadgen')
+    levels, best = find_capacity(port=args.port, sessions=args.sessions, rates=args.rates,
+                                 start_rate=args.rate or 2000, duration=args.duration,
+                                 block=args.block, loss=args.loss, burst=args.burst,
+                                 workers=args.workers, mode=args.mode, seed=args.seed)
+    if best is None:
+        print("[LOADGEN] no level was sustained")
     else:
-        print("Invalid role")
+        print(f"[LOADGEN] capacity: {best['packets_per_s']:.0f} pkts/s, "
+              f"{best['chars_per_s']:.0f} chars/s over {args.sessions} sessions")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Chaos-based secure communication")
+    parser.add_argument('--timing', action='store_true',
+                        help="print the startup time once the role is ready")
+    roles = parser.add_subparsers(dest='role')
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--port', type=int, default=12346,
+                        help="receiving port (the destination for a sender)")
+
+    # Receiving roles only: they seek the sender's trajectory
+    checkpoints = argparse.ArgumentParser(add_help=False)
+    checkpoints.add_argument('--checkpoints', action='store_true',
+                             help="seek the sender's trajectory via a CheckpointStore")
+    checkpoints.add_argument('--checkpoint-dir', default=None,
+                             help="persist checkpoints as memory-mapped files here "
+                                  "(implies --checkpoints)")
+
+    # Single links only: the multi-session server decodes characters
+    symbols = argparse.ArgumentParser(add_help=False)
+    symbols.add_argument('--symbols', action='store_true',
+                         help="8 bits on x, y and z per step (SymbolMapper); both ends must match")
+
+    profiling = argparse.ArgumentParser(add_help=False)
+    profiling.add_argument('--profile', action='store_true',
+                           help="per-stage timers from the start (else SIGUSR1 turns them on)")
+    profiling.add_argument('--profile-packets', type=int, default=1000,
+                           help="packets cProfiled after SIGUSR2")
+    profiling.add_argument('--profile-out', default=None,
+                           help="write cProfile stats here instead of printing them")
+
+    link = argparse.ArgumentParser(add_help=False)
+    link.add_argument('--unix', default=None, metavar='PATH',
+                      help="Unix datagram socket at PATH instead of UDP (same host)")
+
+    sender = roles.add_parser('sender', parents=[common, symbols, profiling, link], help="transmitter")
+    sender.add_argument('--host', default='localhost')
+    sender.add_argument('--rate', type=_rate, default=1000,
+                        help="samples per second, or 'none' for unpaced")
+    sender.add_argument('--burst', type=int, default=None)
+    sender.add_argument('--batch-size', type=_batch_size, default=1,
+                        help="samples per datagram, or 'auto'")
+    sender.add_argument('--session', type=int, default=0)
+    sender.add_argument('--no-handshake', action='store_true',
+                        help="fixed-length preamble instead of waiting for the receiver's ack")
+    sender.add_argument('--message', default=None, help="send one message and exit")
+    sender.add_argument('--file', default=None, help="stream a file and exit (implies --symbols)")
+    sender.set_defaults(run=run_sender)
+
+    receiver = roles.add_parser('receiver', parents=[common, checkpoints, symbols, profiling, link],
+                                help="single-session receiver")
+    receiver.add_argument('--no-plot', action='store_true', help="headless: no dashboard")
+    receiver.add_argument('--async', dest='use_async', action='store_true',
+                          help="asyncio receiver")
+    receiver.add_argument('--metrics-interval', type=float, default=None)
+    receiver.add_argument('--metrics-path', default=None,
+                          help="write the periodic snapshots here (needs --metrics-interval)")
+    receiver.add_argument('--output', default=None,
+                          help="write a streamed file here and exit (implies --symbols)")
+    receiver.set_defaults(run=run_receiver)
+
+    for name, helptext, run in (('server', "many sessions on one port", run_server),
+                                ('cluster', "many sessions over worker processes", run_cluster)):
+        role = roles.add_parser(name, parents=[common, checkpoints], help=helptext)
+        role.add_argument('--host', default='')
+        role.add_argument('--sessions', type=int, default=65536, help="session capacity")
+        role.add_argument('--idle-timeout', type=float, default=30.0)
+        role.set_defaults(run=run)
+    roles.choices['server'].add_argument('--reuse-port', action='store_true')
+    cluster = roles.choices['cluster']
+    cluster.add_argument('--workers', type=int, default=None)
+    cluster.add_argument('--mode', choices=('auto', 'reuseport', 'dispatch'), default='auto')
+    cluster.add_argument('--duration', type=float, default=None)
+
+    loadgen = roles.add_parser('loadgen', help="synthetic transmitters for capacity planning")
+    loadgen.add_argument('--port', type=int, default=12346)
+    loadgen.add_argument('--host', default='127.0.0.1')
+    loadgen.add_argument('--sessions', type=int, default=100, help="concurrent transmitters")
+    loadgen.add_argument('--rate', type=_rate, default=None,
+                         help="aggregate packets per second ('none': unpaced); "
+                              "the first search level without --attach")
+    loadgen.add_argument('--rates', type=float, nargs='+', default=None,
+                         help="test exactly these levels instead of searching")
+    loadgen.add_argument('--duration', type=float, default=2.0, help="seconds per level")
+    loadgen.add_argument('--block', type=int, default=20, help="samples per datagram")
+    loadgen.add_argument('--loss', type=float, default=0.0, help="injected packet loss fraction")
+    loadgen.add_argument('--burst', type=float, default=1.0, help="mean loss burst, in packets")
+    loadgen.add_argument('--workers', type=int, default=1, help="workers of the launched cluster")
+    loadgen.add_argument('--mode', choices=('auto', 'reuseport', 'dispatch'), default='auto')
+    loadgen.add_argument('--attach', action='store_true',
+                         help="load a receiver already running on --port at --rate")
+    loadgen.add_argument('--first-session', type=int, default=0)
+    loadgen.add_argument('--seed', type=int, default=0)
+    loadgen.set_defaults(run=run_loadgen)
+    return parser
+
+
+def parse_args(parser, argv=None):
+    """Parse and resolve implied flags; combinations that would be
+    silently ignored are rejected with parser.error
+    """
+    args = parser.parse_args(argv)
+    if getattr(args, 'use_async', False):
+        # The asyncio receiver has UDP only, no file sink and no reporter
+        unsupported = [flag for flag, value in (('--unix', args.unix), ('--output', args.output),
+                                                ('--metrics-interval', args.metrics_interval),
+                                                ('--metrics-path', args.metrics_path))
+                       if value is not None]
+        if unsupported:
+            parser.error(f"--async does not support {', '.join(unsupported)}")
+    if getattr(args, 'metrics_path', None) and not args.metrics_interval:
+        parser.error("--metrics-path needs --metrics-interval")
+    if getattr(args, 'file', None):
+        args.symbols = True
+    if getattr(args, 'output', None):
+        args.symbols = True
+    if getattr(args, 'checkpoint_dir', None):
+        args.checkpoints = True
+    return args
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parse_args(parser, argv)
+    if args.role is None:
+        role = input("Enter role [sender/receiver]: ").lower()
+        if not role or role[0] not in 'sr':
+            print("Invalid role")
+            return
+        args = parse_args(parser, ['sender' if role.startswith('s') else 'receiver'])
+    args.run(args)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,102 @@
+# test_checkpoints.py
+import numpy as np
+import pytest
+from utilities.checkpoints import CheckpointStore, trajectory_key
+from utilities.lorenz import ChaoticSystem
+from utilities.receiver import ReceiverCore
+from utilities.wire import FLAG_PREAMBLE, Frame
+
+
+def _reference(n):
+    system = ChaoticSystem()
+    system.integrate(n)
+    return system.state.copy()
+
+
+@pytest.mark.parametrize('n', [0, 1, 99, 100, 250, 1234])
+def test_seek_matches_integration(n):
+    store = CheckpointStore(interval=100)
+    system = ChaoticSystem()
+    store.seek(system, n)
+    np.testing.assert_allclose(system.state, _reference(n), rtol=1e-12, atol=1e-12)
+    assert system.steps == n
+
+
+def test_seek_backwards_and_hits():
+    store = CheckpointStore(interval=100)
+    system = ChaoticSystem()
+    store.seek(system, 1000)
+    assert store.misses == 1
+    store.seek(system, 500)
+    store.seek(system, 700)
+    assert store.hits == 2
+    np.testing.assert_allclose(system.state, _reference(700), rtol=1e-12, atol=1e-12)
+
+
+def test_cache_is_bounded():
+    store = CheckpointStore(interval=10, cache_size=5)
+    store.seek(ChaoticSystem(), 200)
+    assert len(store._cache) == 5
+
+
+def test_memmapped_checkpoints_persist(tmp_path):
+    store = CheckpointStore(interval=100, path=str(tmp_path))
+    store.seek(ChaoticSystem(), 1000)
+    store.flush()
+    reopened = CheckpointStore(interval=100, cache_size=1, path=str(tmp_path))
+    system = ChaoticSystem()
+    reopened.seek(system, 900)
+    assert (reopened.hits, reopened.misses) == (1, 0)
+    np.testing.assert_allclose(system.state, _reference(900), rtol=1e-12, atol=1e-12)
+
+
+def test_reopen_with_another_interval(tmp_path):
+    CheckpointStore(interval=1000, path=str(tmp_path)).seek(ChaoticSystem(), 5000)
+    reopened = CheckpointStore(interval=500, path=str(tmp_path))
+    system = ChaoticSystem()
+    reopened.seek(system, 2000)
+    assert reopened.misses == 1  # Rows of the other interval are not reused
+    np.testing.assert_allclose(system.state, _reference(2000), rtol=1e-12, atol=1e-12)
+
+
+def test_reopen_rejects_a_mismatched_file(tmp_path):
+    store = CheckpointStore(interval=100, max_steps=10000, path=str(tmp_path))
+    store.seek(ChaoticSystem(), 300)
+    (filename,) = tmp_path.iterdir()
+    np.save(filename, np.zeros((5, 3)))
+    with pytest.raises(ValueError):
+        CheckpointStore(interval=100, max_steps=10000, path=str(tmp_path)).seek(
+            ChaoticSystem(), 300)
+
+
+def test_latest_below_follows_evictions():
+    store = CheckpointStore(interval=10, cache_size=3)
+    key = trajectory_key(ChaoticSystem())
+    for row in (5, 1, 9, 3):  # Evicts row 5
+        store.put(key, row, np.zeros(3))
+    assert store._latest_below(key, 8) == 3
+    assert store._latest_below(key, 20) == 9
+    assert store._latest_below(key, 0) == 0
+    store.get(key, 1)  # Refreshed, so row 9 goes next
+    store.put(key, 7, np.zeros(3))
+    assert store._latest_below(key, 20) == 7
+
+
+def test_trajectory_key_tracks_parameters():
+    system = ChaoticSystem()
+    key = trajectory_key(system)
+    assert trajectory_key(ChaoticSystem()) == key
+    system.a = -1.2
+    assert trajectory_key(system) != key
+    assert trajectory_key(ChaoticSystem(), dt=0.002) != key
+
+
+def test_receiver_joining_mid_stream_locks_at_once():
+    transmitter = ChaoticSystem()
+    transmitter.integrate(20000)  # Steps sent before the receiver started
+    receiver = ReceiverCore(plot=False, checkpoints=CheckpointStore(interval=1000))
+    for _ in range(6):
+        states = transmitter.integrate(20)
+        receiver.handle_frame(Frame(transmitter.steps - 20, 0, FLAG_PREAMBLE,
+                                    states.astype(np.float32), None))
+    assert receiver.synchronized
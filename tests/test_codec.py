@@ -0,0 +1,46 @@
+# test_codec.py
+import numpy as np
+import pytest
+from utilities.encoder import TextEncoder
+from utilities.perturbation import PerturbationDecoder, PerturbationEncoder, char_codes
+
+PRINTABLE = ''.join(map(chr, range(32, 128)))
+
+
+def test_encode_array_matches_per_char_encode():
+    expected = np.array([PerturbationEncoder.encode(c)[0] for c in PRINTABLE], dtype=np.float32)
+    np.testing.assert_array_equal(PerturbationEncoder.encode_array(PRINTABLE), expected)
+
+
+def test_encode_array_accepts_bytes():
+    np.testing.assert_array_equal(PerturbationEncoder.encode_array(PRINTABLE.encode()),
+                                  PerturbationEncoder.encode_array(PRINTABLE))
+
+
+def test_decode_array_matches_per_char_decode():
+    rng = np.random.default_rng(0)
+    # Clean values, noisy values and out-of-range values on both sides
+    values = np.concatenate((PerturbationEncoder.encode_array(PRINTABLE),
+                             rng.uniform(-0.05, 0.3, 2000)))
+    expected = ''.join(PerturbationDecoder.decode([v, 0.0, 0.0]) for v in values)
+    assert PerturbationDecoder.decode_array(values).decode('latin-1') == expected
+
+
+def test_round_trip_through_float32():
+    values = PerturbationEncoder.encode_array(PRINTABLE)
+    assert PerturbationDecoder.decode_array(values).decode() == PRINTABLE
+
+
+def test_decode_array_clamps():
+    assert PerturbationDecoder.decode_array([-1.0, 10.0]) == b' \x7f'
+
+
+@pytest.mark.parametrize('data', ['', 'abc', 'héllo ✓', b'\x00\xff'])
+def test_char_codes(data):
+    expected = list(data) if isinstance(data, bytes) else [ord(c) for c in data]
+    assert char_codes(data).tolist() == expected
+
+
+def test_text_encoder_round_trip():
+    encoder = TextEncoder()
+    assert encoder.decode(encoder.encode('héllo ✓')) == 'héllo ✓'
@@ -0,0 +1,37 @@
+# test_main.py
+import pytest
+from main import build_parser, parse_args
+
+
+def _parse(*argv):
+    return parse_args(build_parser(), list(argv))
+
+
+@pytest.mark.parametrize('argv', [
+    ['receiver', '--metrics-path', 'metrics.json'],
+    ['receiver', '--async', '--unix', '/tmp/rx.sock'],
+    ['receiver', '--async', '--output', 'out.bin'],
+    ['receiver', '--async', '--metrics-interval', '1'],
+    ['sender', '--checkpoints'],
+    ['sender', '--checkpoint-dir', 'ckpt'],
+])
+def test_ignored_combinations_are_rejected(argv):
+    with pytest.raises(SystemExit):
+        _parse(*argv)
+
+
+@pytest.mark.parametrize('role', ['receiver', 'server', 'cluster'])
+def test_checkpoint_dir_implies_checkpoints(role):
+    assert _parse(role, '--checkpoint-dir', 'ckpt').checkpoints
+    assert not _parse(role).checkpoints
+
+
+def test_implied_symbols():
+    assert _parse('receiver', '--output', 'out.bin').symbols
+    assert _parse('sender', '--file', 'in.bin').symbols
+    assert _parse('receiver', '--async', '--symbols', '--checkpoints').symbols
+
+
+def test_metrics_path_with_interval():
+    args = _parse('receiver', '--metrics-interval', '2', '--metrics-path', 'm.json')
+    assert (args.metrics_interval, args.metrics_path) == (2.0, 'm.json')
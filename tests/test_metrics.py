@@ -0,0 +1,43 @@
+# test_metrics.py
+import json
+import numpy as np
+import pytest
+from utilities.metrics import LogLinearHistogram, Metrics, MetricsReporter
+from utilities.receiver import Receiver
+from utilities.transport import QueueTransport
+
+
+def test_histogram_pending_values_are_read():
+    h = LogLinearHistogram(flush_at=1024)
+    for value in (1.0, 2.0, 3.0):
+        h.record(value)
+    assert (h.count, h.total, h.min, h.max) == (3, 6.0, 1.0, 3.0)
+    assert h.snapshot()['p50'] >= 2.0
+
+
+def test_histogram_batches_match_record_many():
+    values = np.random.default_rng(0).lognormal(5, 3, 5000)
+    one, many = LogLinearHistogram(flush_at=100), LogLinearHistogram()
+    for value in values.tolist():
+        one.record(value)
+    many.record_many(values)
+    one, many = one.snapshot(), many.snapshot()
+    assert one.pop('mean') == pytest.approx(many.pop('mean'))  # Summation order differs
+    assert one == many
+
+
+def test_reporter_stop_without_start(tmp_path):
+    path = str(tmp_path / 'metrics.json')
+    metrics = Metrics()
+    metrics.counter('packets').inc(3)
+    MetricsReporter(metrics, interval=1.0, path=path).stop()
+    with open(path) as f:
+        assert json.load(f)['counters']['packets'] == 3
+
+
+def test_receiver_with_reporter_closes_before_run(tmp_path):
+    receiver = Receiver(plot=False, metrics_interval=1.0, transport=QueueTransport(),
+                        metrics_path=str(tmp_path / 'metrics.txt'))
+    receiver.close()
+    receiver.comm.close()
+    assert (tmp_path / 'metrics.txt').exists()
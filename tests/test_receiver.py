@@ -0,0 +1,168 @@
+# test_receiver.py
+import numpy as np
+import pytest
+from utilities.lorenz import ChaoticSystem
+from utilities.perturbation import PerturbationEncoder, SymbolMapper
+from utilities.receiver import ReceiverCore
+from utilities.sync import SyncTracker
+from utilities.wire import FLAG_PREAMBLE, FLAG_SYNC_ACK, decode_frame, encode_frame
+
+MESSAGE = 'The quick brown fox jumps over the lazy dog 0123456789!'
+
+
+class RecordingReceiver(ReceiverCore):
+    """ReceiverCore that keeps its back-channel frames"""
+
+    def __init__(self, **kwargs):
+        super().__init__(plot=False, **kwargs)
+        self.controls = []
+
+    def send_control(self, flags):
+        self.controls.append(flags)
+
+
+class Link:
+    """Transmitter side: masked trajectory cut into wire frames"""
+
+    def __init__(self, block=20, symbol_mapper=None):
+        self.system = ChaoticSystem()
+        self.block = block
+        self.symbol_mapper = symbol_mapper
+
+    def preamble(self, n):
+        return self._frames(self.system.integrate(n), FLAG_PREAMBLE)
+
+    def message(self, text):
+        if self.symbol_mapper is not None:
+            perturb = self.symbol_mapper.map(text.encode())
+            return self._frames(self.system.integrate(len(perturb)) + perturb, 0)
+        perturb = PerturbationEncoder.encode_array(text)
+        states = self.system.integrate(len(perturb))
+        states[:, 0] += perturb
+        return self._frames(states, 0)
+
+    def _frames(self, states, flags):
+        first = self.system.steps - len(states)
+        # Through the codec, so the receiver sees float32 like on the wire
+        return [decode_frame(encode_frame(states[i:i + self.block], seq=first + i, flags=flags))
+                for i in range(0, len(states), self.block)]
+
+
+def _feed(receiver, frames):
+    return ''.join(receiver.handle_frame(frame) for frame in frames)
+
+
+def test_locks_within_preamble_and_decodes():
+    link, receiver = Link(), RecordingReceiver()
+    _feed(receiver, link.preamble(600))
+    assert receiver.synchronized
+    assert _feed(receiver, link.message(MESSAGE)) == MESSAGE
+
+
+def test_preamble_after_lock_is_tracked_not_decoded():
+    link, receiver = Link(), RecordingReceiver()
+    text = _feed(receiver, link.preamble(1000))
+    assert receiver.synchronized and text == ''
+    # Every preamble datagram after lock is acked
+    assert receiver.controls and set(receiver.controls) == {FLAG_SYNC_ACK}
+    assert _feed(receiver, link.message(MESSAGE)) == MESSAGE
+    assert ''.join(receiver.decoded_buffer) == MESSAGE
+
+
+def test_symbols_after_lock():
+    mapper = SymbolMapper()
+    link = Link(symbol_mapper=mapper)
+    receiver = RecordingReceiver(symbol_mapper=SymbolMapper())
+    _feed(receiver, link.preamble(800))
+    assert _feed(receiver, link.message(MESSAGE + '\x00')) == MESSAGE + '\x00'
+    assert receiver.metrics.counter('samples_decoded').value == len(MESSAGE) + 1
+
+
+def test_long_decode_keeps_lock():
+    # Decision-directed feedback: the message does not drag the receiver off
+    link, receiver = Link(block=200), RecordingReceiver()
+    _feed(receiver, link.preamble(600))
+    text = MESSAGE * 400
+    assert _feed(receiver, link.message(text)) == text
+
+
+def test_sync_tracker_matches_window_mean():
+    rng = np.random.default_rng(0)
+    values = rng.random(1000)
+    tracker = SyncTracker(window=100)
+    pos = 0
+    for n in (1, 7, 99, 100, 3, 250, 40):
+        tracker.extend(values[pos:pos + n])
+        pos += n
+        assert tracker.mean == pytest.approx(values[max(0, pos - 100):pos].mean())
+    assert tracker.ready
+    tracker.reset()
+    assert not tracker.ready and tracker.mean == 0.0
+
+
+def _locked(**kwargs):
+    link, receiver = Link(**kwargs), RecordingReceiver()
+    _feed(receiver, link.preamble(600))
+    assert receiver.synchronized
+    return link, receiver
+
+
+def _counter(receiver, name):
+    return receiver.metrics.counter(name).value
+
+
+def test_reordered_frames_decode_in_order():
+    link, receiver = _locked(block=5)
+    frames = link.message(MESSAGE)
+    for i in range(0, len(frames) - 1, 2):
+        frames[i], frames[i + 1] = frames[i + 1], frames[i]
+    assert _feed(receiver, frames) + receiver.flush_reorder() == MESSAGE
+    assert _counter(receiver, 'packets_reordered') >= len(frames) // 2
+    assert _counter(receiver, 'samples_lost') == 0
+
+
+def test_duplicates_and_overlaps_are_trimmed():
+    link, receiver = _locked(block=5)
+    frames = link.message(MESSAGE)
+    duplicated = [f for frame in frames for f in (frame, frame)]
+    assert _feed(receiver, duplicated) == MESSAGE
+    assert _counter(receiver, 'packets_stale') == len(frames)
+
+
+def test_lost_frame_is_free_run_over():
+    link, receiver = _locked(block=5)
+    frames = link.message(MESSAGE)
+    del frames[3]
+    # The gap is held for reorder_window frames, then given up on
+    text = _feed(receiver, frames) + receiver.flush_reorder()
+    assert text == MESSAGE[:15] + MESSAGE[20:]
+    assert _counter(receiver, 'samples_lost') == 5
+    assert _counter(receiver, 'loss_gaps') == 1
+    assert receiver.synchronized
+
+
+def test_flush_reorder_gives_up_on_a_gap():
+    link, receiver = _locked(block=5)
+    frames = link.message(MESSAGE)
+    assert _feed(receiver, frames[2:4]) == ''  # Held behind the missing frames
+    assert receiver.flush_reorder() == MESSAGE[10:20]
+    assert _counter(receiver, 'samples_lost') == 10
+
+
+def test_sequence_numbers_wrap():
+    link = Link()
+    link.system.steps = 2 ** 32 - 300
+    receiver = RecordingReceiver()
+    _feed(receiver, link.preamble(600))
+    assert receiver.synchronized
+    assert _feed(receiver, link.message(MESSAGE)) == MESSAGE
+
+
+def test_long_gap_drops_lock():
+    link, receiver = _locked()
+    receiver.max_free_run = 100
+    link.system.integrate(500)  # Steps that never arrive
+    frames = link.message(MESSAGE)
+    receiver.reorder_window = 0
+    _feed(receiver, frames[:1])
+    assert not receiver.synchronized
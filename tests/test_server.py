@@ -0,0 +1,100 @@
+# test_server.py
+import time
+import numpy as np
+import pytest
+from utilities.lorenz import ChaoticSystem
+from utilities.perturbation import PerturbationEncoder
+from utilities.server import SessionServer
+from utilities.transport import QueueTransport
+from utilities.wire import FLAG_PREAMBLE, FLAG_SYNC_ACK, decode_frame, encode_frame
+
+BLOCK = 20
+
+
+def _datagrams(system, states, session, flags, addr):
+    first = system.steps - len(states)
+    return [(encode_frame(states[i:i + BLOCK], seq=first + i, flags=flags, session=session), addr)
+            for i in range(0, len(states), BLOCK)]
+
+
+def _preamble(system, n, session, addr='client'):
+    return _datagrams(system, system.integrate(n), session, FLAG_PREAMBLE, addr)
+
+
+def _message(system, text, session, addr='client'):
+    states = system.integrate(len(text))
+    states[:, 0] += PerturbationEncoder.encode_array(text)
+    return _datagrams(system, states, session, 0, addr)
+
+
+@pytest.fixture
+def server():
+    server = SessionServer(capacity=8, transport=QueueTransport())
+    yield server
+    server.close()
+
+
+def test_interleaved_sessions_decode_independently(server):
+    texts = {session: f"session {session} says hello" * 3 for session in (3, 11, 500)}
+    systems = {session: ChaoticSystem() for session in texts}
+    streams = {s: _preamble(systems[s], 600, s) + _message(systems[s], texts[s], s)
+               for s in texts}
+    rng = np.random.default_rng(0)
+    while any(streams.values()):
+        batch = []
+        for stream in streams.values():
+            batch += stream[:3]
+            del stream[:3]
+        rng.shuffle(batch)  # Out of order within a batch is put back in order
+        server.process(batch)
+    assert len(server) == 3
+    for session, text in texts.items():
+        assert ''.join(server.decoded[session]) == text
+
+
+def test_unknown_and_malformed_datagrams_are_counted(server):
+    system = ChaoticSystem()
+    server.process(_message(system, 'abc', session=1) + [(b'junk', 'client')])
+    counters = server.metrics.snapshot()['counters']
+    assert counters['packets_unknown_session'] == 1
+    assert counters['packets_malformed'] == 1
+    assert len(server) == 0
+
+
+def test_acks_locked_preamble_frames():
+    client = QueueTransport()
+    server = SessionServer(capacity=2, transport=QueueTransport())
+    try:
+        server.process(_preamble(ChaoticSystem(), 1000, session=5, addr=client.address))
+        acks = [decode_frame(data) for data, _ in client.recv_batch(1000)]
+        assert acks and all(f.flags == FLAG_SYNC_ACK and f.session == 5 for f in acks)
+    finally:
+        server.close()
+        client.close()
+
+
+def test_full_table_rejects_without_evicting_same_batch_arrivals():
+    server = SessionServer(capacity=1, idle_timeout=0.0, transport=QueueTransport())
+    try:
+        a, b = ChaoticSystem(), ChaoticSystem()
+        server.process(_preamble(a, BLOCK, session=1) + _preamble(b, BLOCK, session=2))
+        assert set(server.slots) == {1}
+        assert server.metrics.counter('sessions_rejected').value == 1
+        # Once session 1 has been idle, a new session takes its slot
+        time.sleep(0.01)
+        server.decoded[1] = ['stale']
+        server.process(_preamble(b, BLOCK, session=2))
+        assert set(server.slots) == {2}
+        assert 1 not in server.decoded and 1 not in server.peers
+    finally:
+        server.close()
+
+
+def test_error_sum_stays_consistent(server):
+    system = ChaoticSystem()
+    for datagram in _preamble(system, 2000, session=9):
+        server.process([datagram])
+    slot = server.slots[9]
+    assert server.synchronized[slot]
+    assert server.error_sum[slot] == pytest.approx(float(server.error_ring[slot].sum()),
+                                                   rel=1e-6, abs=1e-12)
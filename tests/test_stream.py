@@ -0,0 +1,97 @@
+# test_stream.py
+import io
+import numpy as np
+import pytest
+from utilities.perturbation import SymbolMapper
+from utilities.receiver import ReceiverCore
+from utilities.sender import SecureSender
+from utilities.stream import (STREAM_HEADER, STREAM_MAGIC, StreamDecoder, StreamEncoder,
+                              decode_trajectory)
+from utilities.transport import QueueTransport
+
+
+@pytest.fixture
+def sender():
+    sender = SecureSender(rate=None, symbol_mapper=SymbolMapper(), transport=QueueTransport(),
+                          dest='nowhere')
+    yield sender
+    sender.comm.close()
+
+
+def _payload(n, seed=0):
+    data = np.random.default_rng(seed).integers(0, 256, n, dtype=np.uint8).tobytes()
+    return b'\x00\x00' + data + b'\x00'  # NUL at both ends
+
+
+def test_decoder_skips_junk_and_split_headers():
+    payload = _payload(1000)
+    junk = b'noise' + STREAM_MAGIC[:3] + b'more'  # Includes a false start
+    stream = junk + STREAM_HEADER.pack(STREAM_MAGIC, len(payload)) + payload + b'trailing'
+    out = io.BytesIO()
+    decoder = StreamDecoder(out)
+    rng = np.random.default_rng(1)
+    pos = 0
+    while pos < len(stream):
+        n = int(rng.integers(1, 9))
+        decoder.feed(stream[pos:pos + n])
+        pos += n
+    assert decoder.done and out.getvalue() == payload
+    assert decoder.skipped == len(junk)
+
+
+def test_decoder_waits_for_magic():
+    decoder = StreamDecoder(io.BytesIO())
+    decoder.feed(b'\x00' * 100)
+    assert decoder.size is None and not decoder.done
+
+
+@pytest.mark.parametrize('size', [0, 1, 2, 1000, 20000])
+def test_memmap_round_trip(sender, tmp_path, size):
+    payload = _payload(size)[:size]
+    source = tmp_path / 'in.bin'
+    source.write_bytes(payload)
+    encoder = StreamEncoder(sender, chunk_steps=64)
+    states = encoder.to_memmap(str(source), str(tmp_path / 'masked.npy'), preamble=600)
+    assert len(states) == 600 + encoder.n_steps(size)
+
+    out = tmp_path / 'out.bin'
+    receiver = ReceiverCore(plot=False, symbol_mapper=SymbolMapper())
+    written = decode_trajectory(str(tmp_path / 'masked.npy'), str(out), receiver,
+                                block_steps=500)
+    assert written == size
+    assert out.read_bytes() == payload
+
+
+def test_file_object_source(sender, tmp_path):
+    payload = _payload(5000, seed=2)
+    encoder = StreamEncoder(sender, chunk_steps=100)
+    with open(tmp_path / 'in.bin', 'wb+') as f:
+        f.write(payload)
+        f.seek(0)
+        blocks = list(encoder.blocks(f))
+    steps = sum(len(masked) for masked, _ in blocks)
+    assert steps == encoder.n_steps(len(payload))
+
+
+def test_encoder_installs_a_mapper():
+    sender = SecureSender(rate=None, transport=QueueTransport(), dest='nowhere')
+    try:
+        assert StreamEncoder(sender).mapper is sender.symbol_mapper is not None
+    finally:
+        sender.comm.close()
+
+
+def test_encoder_rejects_partial_byte_steps():
+    sender = SecureSender(rate=None, symbol_mapper=SymbolMapper(bits=5),
+                          transport=QueueTransport(), dest='nowhere')
+    try:
+        with pytest.raises(ValueError):
+            StreamEncoder(sender)
+    finally:
+        sender.comm.close()
+
+
+def test_decode_trajectory_needs_mapper(tmp_path):
+    np.save(tmp_path / 'empty.npy', np.zeros((1, 3), dtype=np.float32))
+    with pytest.raises(ValueError):
+        decode_trajectory(str(tmp_path / 'empty.npy'), io.BytesIO(), ReceiverCore(plot=False))
@@ -0,0 +1,79 @@
+# test_symbols.py
+import numpy as np
+import pytest
+from utilities.perturbation import SymbolMapper
+
+BITS = (1, 3, 5, 7, 8, 9, 10, 12, 16, 24)
+
+
+def _payloads():
+    rng = np.random.default_rng(0)
+    return [b'', b'\x00', b'\x00\x00\x00', b'a\x00b', bytes(range(256)),
+            rng.integers(0, 256, 97, dtype=np.uint8).tobytes()]
+
+
+@pytest.mark.parametrize('components', (1, 2, 3))
+@pytest.mark.parametrize('bits', BITS)
+def test_round_trip(components, bits):
+    mapper = SymbolMapper(components=components, bits=bits)
+    for data in _payloads():
+        perturb = mapper.map(data)
+        assert perturb.shape == (mapper.n_steps(len(data)), 3)
+        assert mapper.demap(perturb) == data
+
+
+@pytest.mark.parametrize('bits', BITS)
+def test_consecutive_messages_stay_aligned(bits):
+    mapper = SymbolMapper(bits=bits)
+    messages = [b'\x00', b'hello', b'\x00\x00', b'world\x00']
+    perturb = np.concatenate([mapper.map(m) for m in messages])
+    assert mapper.demap(perturb) == b''.join(messages)
+
+
+def test_demap_across_block_boundaries():
+    mapper = SymbolMapper(components=3, bits=10)
+    data = bytes(range(256)) * 3
+    perturb = mapper.map(data)
+    out = b''.join(mapper.demap(perturb[i:i + 7]) for i in range(0, len(perturb), 7))
+    assert out == data
+
+
+def test_idle_steps_decode_to_nothing():
+    mapper = SymbolMapper()
+    assert mapper.demap(np.zeros((50, 3))) == b''
+    # Preamble around a message adds no bytes
+    perturb = np.concatenate((np.zeros((5, 3)), mapper.map(b'\x00\x01'), np.zeros((5, 3))))
+    assert mapper.demap(perturb) == b'\x00\x01'
+
+
+def test_nul_byte_is_not_idle():
+    mapper = SymbolMapper()
+    symbols = mapper.symbols_from_bytes(b'\x00\x00\x00')
+    assert (symbols != SymbolMapper.IDLE).all()
+    assert mapper.map(b'\x00\x00\x00').max() > 0
+
+
+def test_amplitudes_stay_in_range():
+    mapper = SymbolMapper(bits=8)
+    perturb = mapper.map(b'\xff' * 30)
+    assert perturb.min() >= 0 and perturb.max() <= mapper.max_amplitude
+
+
+def test_noise_below_half_a_level_is_tolerated():
+    mapper = SymbolMapper(bits=8)
+    data = bytes(range(256))
+    perturb = mapper.map(data)
+    noise = np.random.default_rng(1).uniform(-0.45, 0.45, perturb.shape) * mapper.step
+    assert mapper.demap(perturb + noise) == data
+
+
+def test_bits_per_step():
+    assert SymbolMapper(components=3, bits=8).bits_per_step == 24
+    assert SymbolMapper(components=2, bits=5).n_steps(3) == 3  # 24 bits, 5 symbols, idle pad
+
+
+@pytest.mark.parametrize('kwargs', [{'components': 0}, {'components': 4}, {'bits': 0},
+                                    {'bits': 25}])
+def test_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        SymbolMapper(**kwargs)
@@ -0,0 +1,163 @@
+# test_transport.py
+import threading
+import pytest
+from utilities.perturbation import SymbolMapper
+from utilities.receiver import Receiver
+from utilities.sender import SecureSender
+from utilities.transport import QueueTransport, Transport, open_transport
+
+MESSAGE = 'In-process link, end to end: 0123456789 ~!@#$%^&*()'
+
+
+@pytest.mark.parametrize('kind', ['udp', 'unix', 'queue'])
+def test_datagram_round_trip(kind, tmp_path):
+    address = {'udp': 0, 'unix': str(tmp_path / 'rx.sock'), 'queue': None}[kind]
+    receiver = open_transport(kind, address)
+    sender = open_transport(kind)
+    try:
+        dest = receiver.address
+        if kind == 'udp':
+            dest = sender.resolve(f"127.0.0.1:{receiver.address[1]}")
+        for i in range(5):
+            sender.sendto(bytes([i]) * 100, dest)
+        datagrams = []
+        while len(datagrams) < 5:
+            batch = receiver.recv_batch(16, timeout=1.0)
+            assert batch, "datagrams lost on a loopback transport"
+            datagrams += batch
+        assert [data for data, _ in datagrams] == [bytes([i]) * 100 for i in range(5)]
+        assert receiver.recv(timeout=0) is None
+    finally:
+        receiver.close()
+        sender.close()
+
+
+def test_transport_is_abstract():
+    with pytest.raises(TypeError):
+        Transport()
+
+    class Incomplete(Transport):
+        def sendto(self, packet, addr):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_queue_transport_drops_like_udp():
+    receiver, sender = QueueTransport(), QueueTransport(capacity=2)
+    try:
+        sender.sendto(b'x', 'no-such-queue')
+        for _ in range(3):
+            sender.sendto(b'y', receiver.address)
+        assert sender.dropped == 2
+        assert len(receiver.recv_batch(10)) == 2
+        with pytest.raises(ValueError):
+            QueueTransport(receiver.address)
+    finally:
+        receiver.close()
+        sender.close()
+    QueueTransport(receiver.address).close()  # Name is free again
+
+
+def test_unknown_transport():
+    with pytest.raises(ValueError):
+        open_transport('carrier-pigeon')
+
+
+def _link(symbols=False, output=None, rate=None, **sender_kwargs):
+    """(Receiver, SecureSender) joined by in-process queues"""
+    link = QueueTransport()
+    receiver = Receiver(plot=False, transport=link, output=output,
+                        symbol_mapper=SymbolMapper() if symbols else None)
+    sender = SecureSender(rate=rate, transport=QueueTransport(), dest=link.address,
+                          symbol_mapper=SymbolMapper() if symbols else None, **sender_kwargs)
+    return receiver, sender
+
+
+def _drain(receiver):
+    while receiver.poll(0):
+        pass
+
+
+def _close(receiver, sender):
+    receiver.close()
+    receiver.comm.close()
+    sender.comm.close()
+
+
+@pytest.mark.parametrize('batch_size', [1, 16, 'auto'])
+def test_sender_to_receiver(batch_size):
+    receiver, sender = _link(batch_size=batch_size, handshake=False)
+    try:
+        sender._synchronization_preamble()
+        _drain(receiver)
+        assert receiver.synchronized
+        sender.send_message(MESSAGE)
+        _drain(receiver)
+        assert ''.join(receiver.decoded_buffer) == MESSAGE
+    finally:
+        _close(receiver, sender)
+
+
+def test_handshake_stops_the_preamble_early():
+    # Paced, so the receiver thread gets to ack before the budget is spent
+    receiver, sender = _link(batch_size=20, rate=20000)
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            receiver.poll(0.01)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        steps = sender._synchronization_preamble()
+        assert receiver.synchronized and steps < sender.preamble_steps
+        sender.send_message(MESSAGE)
+        for _ in range(200):
+            if ''.join(receiver.decoded_buffer) == MESSAGE:
+                break
+            stop.wait(0.01)
+        assert ''.join(receiver.decoded_buffer) == MESSAGE
+    finally:
+        stop.set()
+        thread.join()
+        _close(receiver, sender)
+
+
+def test_file_transfer(tmp_path):
+    payload = bytes(range(256)) * 40 + b'\x00'
+    (tmp_path / 'in.bin').write_bytes(payload)
+    receiver, sender = _link(symbols=True, output=str(tmp_path / 'out.bin'),
+                             batch_size='auto', handshake=False)
+    try:
+        sender._synchronization_preamble()
+        _drain(receiver)
+        sender.send_file(str(tmp_path / 'in.bin'), chunk_steps=512)
+        _drain(receiver)
+        assert receiver.sink.done
+    finally:
+        _close(receiver, sender)
+    assert (tmp_path / 'out.bin').read_bytes() == payload
+
+
+@pytest.mark.parametrize('symbols', [False, True])
+def test_interactive_sender_counts_steps(symbols, monkeypatch, capsys):
+    receiver, sender = _link(symbols=symbols, handshake=False, batch_size='auto')
+    lines = iter([MESSAGE])
+
+    def fake_input(prompt):
+        for line in lines:
+            return line
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr('builtins.input', fake_input)
+    try:
+        sender.run()
+        _drain(receiver)
+        assert ''.join(receiver.decoded_buffer) == MESSAGE
+    finally:
+        _close(receiver, sender)
+    steps = SymbolMapper().n_steps(len(MESSAGE)) if symbols else len(MESSAGE)
+    assert f"[SENDER] {steps} samples sent" in capsys.readouterr().out
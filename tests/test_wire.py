@@ -0,0 +1,80 @@
+# test_wire.py
+import numpy as np
+import pytest
+from utilities.wire import (FLAG_PREAMBLE, FLAG_SYNC_ACK, FLAG_TRUE_STATE, HEADER, FrameError,
+                            decode_frame, decode_pickle, encode_control, encode_frame,
+                            encode_pickle, get_codec, max_batch, peek_session)
+
+
+def test_single_sample_round_trip():
+    state = np.array([0.1, -2.5, 3.75])
+    frame = decode_frame(encode_frame(state, seq=7, timestamp=123, flags=FLAG_PREAMBLE,
+                                      session=42))
+    assert (frame.seq, frame.timestamp, frame.flags, frame.session) == (7, 123, FLAG_PREAMBLE, 42)
+    assert frame.states.shape == (1, 3)
+    np.testing.assert_array_equal(frame.states[0], state.astype(np.float32))
+    assert frame.true_states is None
+
+
+def test_block_round_trip_with_true_states():
+    rng = np.random.default_rng(0)
+    states, true_states = rng.normal(size=(2, 50, 3))
+    data = encode_frame(states, true_states, seq=2**32 + 5, timestamp=1)
+    frame = decode_frame(data)
+    assert frame.seq == 5  # Wraps to 32 bits
+    assert frame.flags & FLAG_TRUE_STATE
+    np.testing.assert_array_equal(frame.states, states.astype(np.float32))
+    np.testing.assert_array_equal(frame.true_states, true_states.astype(np.float32))
+
+
+def test_single_and_block_encodings_agree():
+    state = np.array([1.0, 2.0, 3.0])
+    assert encode_frame(state, timestamp=9) == encode_frame(state[None], timestamp=9)
+
+
+def test_control_frame_and_peek_session():
+    data = encode_control(FLAG_SYNC_ACK, session=77)
+    assert len(data) == HEADER.size
+    frame = decode_frame(data)
+    assert frame.flags == FLAG_SYNC_ACK and len(frame.states) == 0
+    assert peek_session(data) == 77
+
+
+def test_max_batch_fits_datagram():
+    n = max_batch(with_true_state=False, max_datagram=1472)
+    assert len(encode_frame(np.zeros((n, 3)))) <= 1472
+    assert len(encode_frame(np.zeros((n + 1, 3)))) > 1472
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'CS\x03',
+    b'XX' + encode_frame(np.zeros(3))[2:],
+    encode_frame(np.zeros(3))[:2] + b'\x09' + encode_frame(np.zeros(3))[3:],
+    encode_frame(np.zeros((4, 3)))[:-1],
+    encode_frame(np.zeros((4, 3))) + b'\x00' * 12,
+], ids=['empty', 'short', 'magic', 'version', 'truncated', 'trailing'])
+def test_malformed_frames_raise_frame_error(data):
+    with pytest.raises(FrameError):
+        decode_frame(data)
+
+
+def test_peek_session_rejects_non_frames():
+    with pytest.raises(FrameError):
+        peek_session(b'not a frame at all, just bytes')
+
+
+def test_frame_error_is_value_error():
+    assert issubclass(FrameError, ValueError)
+
+
+def test_pickle_codec_round_trip_and_errors():
+    encode, decode = get_codec('pickle')
+    assert (encode, decode) == (encode_pickle, decode_pickle)
+    frame = decode(encode(np.ones((2, 3)), seq=3, session=4, flags=FLAG_PREAMBLE))
+    assert (frame.seq, frame.session, frame.flags) == (3, 4, FLAG_PREAMBLE)
+    np.testing.assert_array_equal(frame.states, np.ones((2, 3)))
+    with pytest.raises(FrameError):
+        decode(b'\x80garbage')
+    with pytest.raises(ValueError):
+        get_codec('json')
@@ -0,0 +1,253 @@
+# aio.py
+import asyncio
+import socket
+import numpy as np
+from utilities.receiver import ReceiverCore
+from utilities.sender import SecureSender
+from utilities.wire import (FLAG_PREAMBLE, FLAG_SYNC_ACK, FLAG_SYNC_LOST, FrameError,
+                            encode_control, get_codec)
+
+
+class _ReceiverProtocol(asyncio.DatagramProtocol):
+    """Decodes datagrams straight into the receiver's bounded queue"""
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        receiver = self.receiver
+        receiver.peer = addr
+        try:
+            frame = receiver._decode(data)
+        except FrameError:
+            receiver._malformed.inc()
+            return
+        if receiver.queue.full():
+            receiver._overflow.inc()
+            return
+        receiver.queue.put_nowait(frame)
+        # Backpressure: stop reading and let the kernel buffer absorb the
+        # burst until the consumer has drained the queue
+        if receiver.queue.full():
+            self.transport.pause_reading()
+
+    def error_received(self, exc):
+        print(f"[RECEIVER] Socket error: {exc}")
+
+
+class AsyncReceiver(ReceiverCore):
+    """Event-driven receiver: same sync/decode behaviour as Receiver
+
+    The socket is read by the event loop only when datagrams arrive, so
+    there is no timeout polling and several receivers can share one thread.
+    on_message, if given, is called with each piece of decoded text.
+    """
+
+    def __init__(self, port=12346, host='0.0.0.0', codec='binary', queue_size=1024,
+                 plot=False, on_message=None, metrics=None, symbol_mapper=None,
+                 checkpoints=None):
+        super().__init__(plot=plot, metrics=metrics, symbol_mapper=symbol_mapper,
+                         checkpoints=checkpoints)
+        self.port = port
+        self.host = host
+        self._encode, self._decode = get_codec(codec)
+        self.peer = None  # Sender address for the sync back-channel
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.on_message = on_message
+        self._malformed = self.metrics.counter('packets_malformed')
+        self._overflow = self.metrics.counter('packets_overflow')
+        self.transport = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ReceiverProtocol(self), local_addr=(self.host, self.port),
+            family=socket.AF_INET)
+
+    async def run(self):
+        """Process frames until cancelled"""
+        if self.transport is None:
+            await self.start()
+        print(f"[RECEIVER:{self.port}] Starting adaptive synchronization...")
+        try:
+            while True:
+                was_synchronized = self.synchronized
+                if self._held:
+                    # Frames wait for a gap to fill; give up on it when idle
+                    try:
+                        frame = await asyncio.wait_for(self.queue.get(), 0.1)
+                    except asyncio.TimeoutError:
+                        frame = None
+                else:
+                    frame = await self.queue.get()
+                if not self.transport.is_reading():
+                    self.transport.resume_reading()
+
+                self.profiler.begin()
+                text = self.handle_frame(frame) if frame is not None else self.flush_reorder()
+                self.profiler.tick()
+                if self.synchronized and not was_synchronized:
+                    print(f"[RECEIVER:{self.port}] Starting message decoding...")
+                if text and self.on_message is not None:
+                    self.on_message(text)
+        finally:
+            self.close()
+
+    def send_control(self, flags):
+        if self.peer is not None and self.transport is not None:
+            self.transport.sendto(encode_control(flags, encode=self._encode), self.peer)
+
+    def close(self):
+        super().close()
+        if self.transport is not None:
+            self.transport.close()
+
+
+async def serve(ports, **kwargs):
+    """Run one AsyncReceiver per port concurrently on the current loop"""
+    receivers = [AsyncReceiver(port=port, **kwargs) for port in ports]
+    try:
+        await asyncio.gather(*(r.run() for r in receivers))
+    finally:
+        for r in receivers:
+            r.close()
+    return receivers
+
+
+class _SenderProtocol(asyncio.DatagramProtocol):
+    """Tracks the transport's write buffer and the sync back-channel"""
+
+    def __init__(self, decode):
+        self.writable = asyncio.Event()
+        self.writable.set()
+        self._decode = decode
+        self.acked = False  # Receiver reported lock (FLAG_SYNC_ACK)
+        self.lost = False   # Receiver reset its sync (FLAG_SYNC_LOST)
+
+    def datagram_received(self, data, addr):
+        try:
+            flags = self._decode(data).flags
+        except FrameError:
+            return
+        self.acked |= bool(flags & FLAG_SYNC_ACK)
+        self.lost |= bool(flags & FLAG_SYNC_LOST)
+
+    def pause_writing(self):
+        self.writable.clear()
+
+    def resume_writing(self):
+        self.writable.set()
+
+    def error_received(self, exc):
+        print(f"[SENDER] Socket error: {exc}")
+
+
+class _TransportComm:
+    """Communicator-compatible send side over a connected asyncio transport"""
+
+    def __init__(self, codec):
+        self._encode, self._decode = get_codec(codec)
+        self.transport = None
+        self.seq = 0
+        self.session = 0
+
+    def send(self, state, true_state=None, dest=None, flags=0, seq=None):
+        self.send_block(state, true_state, dest, flags, seq)
+
+    def send_block(self, states, true_states=None, dest=None, flags=0, seq=None):
+        if seq is None:
+            seq = self.seq
+        self.transport.sendto(self._encode(states, true_states, seq=seq, flags=flags,
+                                           session=self.session))
+        self.seq = seq + max(1, len(states) if np.ndim(states) == 2 else 1)
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+class AsyncSender(SecureSender):
+    """SecureSender whose sends never block the event loop
+
+    Datagrams are written through an asyncio transport. When its write
+    buffer passes the high-water mark the sender awaits until it drains.
+    Pacing waits are awaited rather than slept, so other tasks keep running.
+    """
+
+    def __init__(self, dest_port=12346, host='localhost', batch_size='auto',
+                 codec='binary', rate=1000, burst=None, handshake=True, session=0):
+        super().__init__(dest_port=dest_port, host=host, batch_size=batch_size,
+                         comm=_TransportComm(codec), rate=rate, burst=burst,
+                         handshake=handshake, session=session)
+        self.dest_port = dest_port
+        self._protocol = None
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        self.comm.transport, self._protocol = await loop.create_datagram_endpoint(
+            lambda: _SenderProtocol(self.comm._decode), remote_addr=(self.host, self.dest_port),
+            family=socket.AF_INET)
+
+    async def _send_states_async(self, states, true_states, flags=0):
+        first_step = self.system.steps - len(states)
+        pacer = self.pacer
+        k = self._block_size(len(states))
+        for i in range(0, len(states), k):
+            wait = pacer.reserve(min(k, len(states) - i))
+            if wait:
+                await asyncio.sleep(wait / 1e9)
+            await self._protocol.writable.wait()
+            self.comm.send_block(states[i:i + k], true_states[i:i + k], flags=flags,
+                                 seq=first_step + i)
+        self.samples_sent += len(states)
+        return pacer.achieved_rate
+
+    async def send_preamble(self, n_steps=1000):
+        """Paper's 500-1000 step initialization, ended early by a sync ack
+
+        Returns the number of preamble steps sent.
+        """
+        if self._protocol is None:
+            await self.connect()
+        self.pacer.reset()  # Once per session, as in SecureSender
+        if not self.handshake:
+            preamble = self.system.integrate(n_steps, dt=self.dt)
+            await self._send_states_async(preamble, preamble, flags=FLAG_PREAMBLE)
+            return n_steps
+
+        protocol, pacer = self._protocol, self.pacer
+        protocol.acked = protocol.lost = False
+        k = self._block_size(n_steps)
+        budget, sent = n_steps, 0
+        while budget > 0 and sent < 10 * n_steps:
+            n = min(k, budget)
+            block = self.system.integrate(n, dt=self.dt)
+            seq = self.system.steps - n
+            wait = pacer.reserve(n)
+            # Always yield once so the ack can be read between datagrams
+            await asyncio.sleep(wait / 1e9)
+            await protocol.writable.wait()
+            self.comm.send_block(block, block, flags=FLAG_PREAMBLE, seq=seq)
+            budget -= n
+            sent += n
+            if protocol.acked:
+                break
+            if protocol.lost:
+                protocol.lost = False
+                budget = n_steps
+        self.samples_sent += sent
+        return sent
+
+    async def send_message(self, message):
+        """Mask and transmit one message, returns achieved samples/sec"""
+        if self._protocol is None:
+            await self.connect()
+        encoded_states, true_states = self._encode_message(message)
+        return await self._send_states_async(encoded_states, true_states)
+
+    def close(self):
+        self.comm.close()
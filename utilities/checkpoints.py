@@ -0,0 +1,149 @@
+# checkpoints.py
+import bisect
+import hashlib
+import os
+from collections import OrderedDict
+import numpy as np
+from utilities.lorenz import ChaoticEnsemble, ChaoticSystem
+
+
+def trajectory_key(system, dt=0.001):
+    """Everything that determines a free-running trajectory"""
+    params = tuple(float(getattr(system, name))
+                   for name in ('alpha', 'beta', 'gamma', 'a', 'b', 'I0'))
+    return params + tuple(system.initial_state.tolist()) + (float(dt), system.method)
+
+
+class CheckpointStore:
+    """States every interval steps along deterministic trajectories
+
+    The free-running trajectory from a fixed initial condition (the
+    transmitter's, and that of a synchronized receiver) depends only on
+    trajectory_key(). Checkpoints are keyed by that and the step index:
+    an in-memory LRU of cache_size entries sits on top of an optional
+    directory of memory-mapped .npy files (one per key and interval, NaN
+    rows for steps not yet computed). seek() then reaches any step n in at most
+    interval integration steps once the checkpoint below n is known, and
+    records the checkpoints it passes on the way.
+    """
+
+    def __init__(self, interval=1000, cache_size=4096, path=None, max_steps=10**8):
+        self.interval = interval
+        self.cache_size = cache_size
+        self.path = path
+        self.max_rows = max_steps // interval + 1
+        self._cache = OrderedDict()  # (key, row) -> state, oldest first
+        self._cached_rows = {}  # key -> sorted rows in _cache
+        self._files = {}  # key -> memmap (max_rows, 3) or None
+        self.hits = self.misses = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        """Backing memmap for a key, created NaN-filled on first use"""
+        if self.path is None:
+            return None
+        if key not in self._files:
+            # Row r is step r * interval, so the file is only valid for this
+            # interval (and row count)
+            digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+            filename = os.path.join(self.path,
+                                    f"{digest}-i{self.interval}-r{self.max_rows}.npy")
+            if os.path.exists(filename):
+                rows = np.load(filename, mmap_mode='r+')
+                if rows.shape != (self.max_rows, 3) or rows.dtype != np.float64:
+                    raise ValueError(f"Checkpoint file {filename} holds {rows.dtype} "
+                                     f"{rows.shape}, expected float64 ({self.max_rows}, 3)")
+            else:
+                rows = np.lib.format.open_memmap(filename, mode='w+', dtype=np.float64,
+                                                 shape=(self.max_rows, 3))
+                rows[:] = np.nan
+            self._files[key] = rows
+        return self._files[key]
+
+    def get(self, key, row):
+        """State at step row * interval, or None if not recorded"""
+        state = self._cache.get((key, row))
+        if state is not None:
+            self._cache.move_to_end((key, row))
+            return state
+        rows = self._file(key)
+        if rows is not None and row < len(rows) and not np.isnan(rows[row, 0]):
+            state = np.array(rows[row])
+            self._remember(key, row, state)
+            return state
+        return None
+
+    def put(self, key, row, state):
+        state = np.array(state, dtype=np.float64)
+        self._remember(key, row, state)
+        rows = self._file(key)
+        if rows is not None and row < len(rows):
+            rows[row] = state
+
+    def _remember(self, key, row, state):
+        if (key, row) not in self._cache:
+            bisect.insort(self._cached_rows.setdefault(key, []), row)
+        self._cache[(key, row)] = state
+        self._cache.move_to_end((key, row))
+        if len(self._cache) > self.cache_size:
+            (old_key, old_row), _ = self._cache.popitem(last=False)
+            rows = self._cached_rows[old_key]
+            del rows[bisect.bisect_left(rows, old_row)]
+            if not rows:
+                del self._cached_rows[old_key]
+
+    def _latest_below(self, key, row):
+        """Highest recorded row <= row (row 0 is always the initial state)"""
+        best = 0
+        rows = self._file(key)
+        if rows is not None:
+            known = np.flatnonzero(~np.isnan(rows[:min(row, len(rows) - 1) + 1, 0]))
+            if len(known):
+                best = int(known[-1])
+        cached = self._cached_rows.get(key)
+        if cached:
+            i = bisect.bisect_right(cached, row)
+            if i:
+                best = max(best, cached[i - 1])
+        return best
+
+    def seek(self, system, n, dt=0.001):
+        """Put system on step n of its free-running trajectory
+
+        Sets system.state and system.steps; the system's own feedback
+        history is discarded, so for a receiver this is the state a
+        perfectly synchronized receiver would have.
+        """
+        key = trajectory_key(system, dt)
+        row, remainder = divmod(n, self.interval)
+        state = self.get(key, row)
+        if state is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            start = self._latest_below(key, row)
+            state = self.get(key, start) if start else system.initial_state
+            # Walk forward a checkpoint at a time, recording each one
+            for r in range(start + 1, row + 1):
+                state = self._advance(system, state, self.interval, dt)
+                self.put(key, r, state)
+        if remainder:
+            state = self._advance(system, state, remainder, dt)
+        system.state[:] = state
+        system.steps = n
+        return system.state
+
+    @staticmethod
+    def _advance(system, state, n_steps, dt):
+        """Free-run n_steps from state on a transmitter copy of system"""
+        runner = ChaoticSystem(system_type='transmitter', method=system.method)
+        for name in ChaoticEnsemble.PARAMETERS:
+            setattr(runner, name, getattr(system, name))
+        runner.state[:] = state
+        runner.integrate(n_steps, dt=dt)
+        return runner.state.copy()
+
+    def flush(self):
+        for rows in self._files.values():
+            rows.flush()
@@ -0,0 +1,257 @@
+# cluster.py
+import multiprocessing as mp
+import os
+import queue
+import select
+import socket
+import struct
+import threading
+import time
+from utilities.server import SessionServer
+from utilities.transport import MAX_DATAGRAM
+from utilities.wire import FrameError, encode_control, peek_session
+
+# Sender address prepended to datagrams passed between dispatcher and worker
+_ADDR = struct.Struct('!4sH')
+
+
+def _pack_addr(addr):
+    return _ADDR.pack(socket.inet_aton(addr[0]), addr[1])
+
+
+def _unpack_addr(data):
+    ip, port = _ADDR.unpack_from(data)
+    return socket.inet_ntoa(ip), port
+
+
+class _DispatchedServer(SessionServer):
+    """SessionServer fed by the dispatcher over a Unix datagram socket
+
+    Datagrams arrive prefixed with the sender's address; acks go back
+    the same way for the dispatcher to send from the public port.
+    """
+
+    def receive_batch(self, timeout=0.1):
+        if not select.select([self.sock], [], [], timeout)[0]:
+            return []
+        datagrams = []
+        recv = self.sock.recv
+        try:
+            for _ in range(self.max_drain):
+                data = recv(65536)
+                datagrams.append((memoryview(data)[_ADDR.size:], _unpack_addr(data)))
+        except (BlockingIOError, InterruptedError):
+            pass
+        return datagrams
+
+    def send_control(self, session, flags):
+        addr = self.peers.get(session)
+        if addr is not None:
+            try:
+                self.sock.send(_pack_addr(addr)
+                               + encode_control(flags, encode=self._encode, session=session))
+            except (BlockingIOError, InterruptedError):
+                pass
+
+
+def _worker_main(index, mode, port, host, conn, results, stop, server_kwargs, report_interval):
+    """One receiver process: serve, and stream text and metrics to the parent"""
+    if mode == 'reuseport':
+        server = SessionServer(port=port, host=host, reuse_port=True, **server_kwargs)
+    else:
+        server = _DispatchedServer(port=port, sock=conn, **server_kwargs)
+    pending = []
+    server.on_message = lambda session, text: pending.append((session, text))
+    last_flush = last_report = time.monotonic()
+    try:
+        while not stop.is_set():
+            datagrams = server.receive_batch(0.05)
+            if datagrams:
+                server.process(datagrams)
+            now = time.monotonic()
+            if pending and (len(pending) >= 1024 or now - last_flush > 0.05):
+                results.put(('text', index, pending))
+                pending = []
+                last_flush = now
+            if now - last_report >= report_interval:
+                results.put(('metrics', index, server.metrics.snapshot()))
+                last_report = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pending:
+            results.put(('text', index, pending))
+        results.put(('metrics', index, server.metrics.snapshot()))
+        results.put(('done', index, None))
+        server.close()
+
+
+class ReceiverCluster:
+    """Receiver side spread over a pool of SessionServer worker processes
+
+    mode 'reuseport': every worker binds the port with SO_REUSEPORT and
+    the kernel shards senders across them by address hash. mode
+    'dispatch': this process owns the port and forwards each datagram to
+    worker session_id % workers over a Unix socket (for platforms without
+    SO_REUSEPORT). 'auto' picks reuseport where available.
+
+    Decoded text is collected here (on_message(session, text), else
+    decoded), along with each worker's latest metrics snapshot.
+    """
+
+    def __init__(self, port=12346, host='', workers=None, mode='auto', on_message=None,
+                 report_interval=1.0, **server_kwargs):
+        if mode == 'auto':
+            mode = 'reuseport' if hasattr(socket, 'SO_REUSEPORT') else 'dispatch'
+        if mode not in ('reuseport', 'dispatch'):
+            raise ValueError(f"Unknown cluster mode {mode!r}")
+        self.port = port
+        self.host = host
+        self.mode = mode
+        self.n_workers = workers or os.cpu_count() or 1
+        self.on_message = on_message
+        self.report_interval = report_interval
+        self.server_kwargs = server_kwargs
+
+        self.decoded = {}
+        self.worker_metrics = [None] * self.n_workers
+        self.dispatched = 0
+        self.dispatch_dropped = 0
+        self._results = mp.Queue()
+        self._stop = mp.Event()
+        self._workers = []
+        self._pipes = []
+        self._sock = None
+        self._collector = None
+        self._dispatcher = None
+        self._done = 0
+
+    def start(self, background=False):
+        """Launch the workers; background also dispatches from a thread
+
+        In dispatch mode datagrams are only forwarded while run() (or, with
+        background, a daemon thread until stop()) is dispatching.
+        """
+        if self.mode == 'dispatch':
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+            self._sock.bind((self.host, self.port))
+            self._sock.setblocking(False)
+        for index in range(self.n_workers):
+            conn = None
+            if self.mode == 'dispatch':
+                parent, conn = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+                for end in (parent, conn):
+                    end.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 << 20)
+                    end.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+                parent.setblocking(False)
+                self._pipes.append(parent)
+            worker = mp.Process(
+                target=_worker_main, daemon=True,
+                args=(index, self.mode, self.port, self.host, conn, self._results,
+                      self._stop, self.server_kwargs, self.report_interval))
+            worker.start()
+            if conn is not None:
+                conn.close()  # The worker holds its own copy
+            self._workers.append(worker)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        if background and self.mode == 'dispatch':
+            self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+            self._dispatcher.start()
+        print(f"[CLUSTER:{self.port}] {self.n_workers} workers ({self.mode})")
+
+    def _collect(self):
+        """Merge worker output until every worker has reported done"""
+        while self._done < self.n_workers:
+            try:
+                kind, index, payload = self._results.get(timeout=0.1)
+            except queue.Empty:
+                if not any(w.is_alive() for w in self._workers):
+                    break
+                continue
+            if kind == 'text':
+                for session, text in payload:
+                    if self.on_message is not None:
+                        self.on_message(session, text)
+                    else:
+                        self.decoded.setdefault(session, []).append(text)
+            elif kind == 'metrics':
+                self.worker_metrics[index] = payload
+            elif kind == 'done':
+                self._done += 1
+
+    def _dispatch(self, deadline=None):
+        """Shard datagrams from the public port to workers by session id"""
+        sock, pipes = self._sock, self._pipes
+        n = len(pipes)
+        while not self._stop.is_set() and (deadline is None or time.monotonic() < deadline):
+            readable = select.select([sock, *pipes], [], [], 0.05)[0]
+            if sock in readable:
+                try:
+                    for _ in range(4096):
+                        data, addr = sock.recvfrom(MAX_DATAGRAM)
+                        try:
+                            target = peek_session(data) % n
+                        except FrameError:
+                            target = hash(addr) % n  # Non-binary codec: shard by sender
+                        try:
+                            pipes[target].send(_pack_addr(addr) + data)
+                            self.dispatched += 1
+                        except (BlockingIOError, InterruptedError):
+                            self.dispatch_dropped += 1
+                except (BlockingIOError, InterruptedError):
+                    pass
+            for pipe in pipes:
+                if pipe in readable:
+                    # Acks from a worker, sent from the public port
+                    try:
+                        while True:
+                            data = pipe.recv(65536)
+                            sock.sendto(data[_ADDR.size:], _unpack_addr(data))
+                    except (BlockingIOError, InterruptedError):
+                        pass
+
+    def run(self, duration=None):
+        """Serve until interrupted (or for duration seconds)"""
+        if not self._workers:
+            self.start()
+        deadline = time.monotonic() + duration if duration is not None else None
+        try:
+            if self.mode == 'dispatch' and self._dispatcher is None:
+                self._dispatch(deadline)
+            else:
+                while deadline is None or time.monotonic() < deadline:
+                    time.sleep(0.1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout)
+            self._dispatcher = None
+        for worker in self._workers:
+            worker.join(timeout)
+        if self._collector is not None:
+            self._collector.join(timeout)
+        for sock in (self._sock, *self._pipes):
+            if sock is not None:
+                sock.close()
+        self._sock, self._pipes = None, []
+
+    def metrics_snapshot(self):
+        """Worker counters and gauges summed, plus each worker's snapshot"""
+        counters, gauges = {}, {}
+        for snapshot in filter(None, self.worker_metrics):
+            for name, value in snapshot['counters'].items():
+                counters[name] = counters.get(name, 0) + value
+            for name, value in snapshot['gauges'].items():
+                gauges[name] = gauges.get(name, 0) + value
+        if self.mode == 'dispatch':
+            counters['datagrams_dispatched'] = self.dispatched
+            counters['dispatch_dropped'] = self.dispatch_dropped
+        return {'timestamp': time.time(), 'counters': counters, 'gauges': gauges,
+                'workers': self.worker_metrics}
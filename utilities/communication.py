@@ -1,42 +1,126 @@
 # communication.py
-import socket
-import pickle
 import numpy as np
-import time
+from utilities.profiling import StageProfiler
+from utilities.transport import UDPTransport
+from utilities.wire import FrameError, encode_control, get_codec
 
 class Communicator:
-    def __init__(self, port, is_sender):
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    """Frames over a transport.Transport (UDP on port by default)
+
+    A receiver's UDP transport binds port; pass transport= for Unix
+    sockets or an in-process QueueTransport, whose addresses then replace
+    the 'host:port' destinations.
+    """
+    def __init__(self, port, is_sender, codec='binary', session=0, transport=None,
+                 recv_buffer=None, send_buffer=None):
+        if transport is None:
+            transport = UDPTransport(port=None if is_sender else port,
+                                     recv_buffer=recv_buffer, send_buffer=send_buffer)
+        self.transport = transport
         self.is_sender = is_sender
-        
-        if not is_sender:
-            self.sock.bind(('', port))
-            self.sock.settimeout(0.1)
+        self.codec = codec
+        self._encode, self._decode = get_codec(codec)
+        self.seq = 0
+        self.session = session  # Stamped on every frame sent
+        self._pending = None  # (states, true_states, next row) of a batch
+        self.peer = None  # Address of the last datagram received
+        # Shared with the sender/receiver that owns this link
+        self.profiler = StageProfiler()
+        self.timeout = 0.1  # receive_frame() wait
 
 
-    def send(self, state, true_state=None, dest='localhost:12346'):
+    def send(self, state, true_state=None, dest='localhost:12346', flags=0, seq=None):
         """Correct parameter order maintained"""
-        ip, port = dest.split(':')
-        packet = pickle.dumps({
-            'state': state.astype(np.float32).tolist(),
-            'true_state': true_state.astype(np.float32).tolist() 
-                        if true_state is not None else None,
-            'timestamp': time.time_ns()
-        })
-        self.sock.sendto(packet, (ip, int(port)))
+        self.send_block(state, true_state, dest, flags, seq)
 
 
-    def receive(self):
+    def send_block(self, states, true_states=None, dest='localhost:12346', flags=0, seq=None):
+        """Send a (K, 3) block of samples as one datagram
+
+        seq is the chaotic step index of the first sample; without it
+        frames are simply numbered.
+        """
+        if seq is None:
+            seq = self.seq
+        packet = self._encode(states, true_states, seq=seq, flags=flags,
+                              session=self.session)
+        self.profiler.lap('encode')
+        self.seq = seq + max(1, len(states) if np.ndim(states) == 2 else 1)
+        self.transport.sendto(packet, self.transport.resolve(dest))
+        self.profiler.lap('send')
+
+
+    def send_control(self, flags, addr, session=None):
+        """Flags-only frame to a socket address, e.g. a sync ack to self.peer"""
+        session = self.session if session is None else session
+        self.transport.sendto(encode_control(flags, encode=self._encode, session=session), addr)
+
+
+    def receive_frame(self):
+        """Next decoded Frame, or None on timeout or a malformed datagram"""
+        return self._receive(self.timeout)
+
+
+    def poll_frame(self):
+        """Like receive_frame() but never waits; None if nothing is queued"""
         try:
-            data, _ = self.sock.recvfrom(4096)
-            packet = pickle.loads(data)
-            return (
-                np.array(packet['state'], dtype=np.float64),
-                np.array(packet['true_state'], dtype=np.float64) 
-                if packet['true_state'] is not None else None
-            )
-        except (socket.timeout, pickle.UnpicklingError):
+            return self._receive(0)
+        except OSError:
+            return None
+
+
+    def _receive(self, timeout):
+        datagram = self.transport.recv(timeout)
+        self.profiler.lap('recv')  # Includes waiting for the datagram
+        if datagram is None:
+            return None
+        data, self.peer = datagram
+        try:
+            return self._decode(data)
+        except FrameError:
+            return None
+
+
+    def receive_frames(self, timeout=None, max_frames=4096):
+        """Wait up to timeout (default self.timeout) for traffic, then decode
+        everything pending in one call; malformed datagrams are skipped"""
+        datagrams = self.transport.recv_batch(
+            max_frames, self.timeout if timeout is None else timeout)
+        self.profiler.lap('recv')
+        frames = []
+        decode = self._decode
+        for data, addr in datagrams:
+            try:
+                frames.append(decode(data))
+            except FrameError:
+                continue
+            self.peer = addr
+        self.profiler.lap('unpack')
+        return frames
+
+
+    def receive_block(self):
+        """(states, true_states) of the next datagram as (K, 3) arrays"""
+        if self._pending is not None:
+            states, true_states, row = self._pending
+            self._pending = None
+            return states[row:], true_states[row:] if true_states is not None else None
+        frame = self.receive_frame()
+        if frame is None:
             return None, None
+        return frame.states, frame.true_states
+
+
+    def receive(self):
+        """Next single sample, unpacking batched datagrams row by row"""
+        if self._pending is None:
+            states, true_states = self.receive_block()
+            if states is None:
+                return None, None
+            self._pending = (states, true_states, 0)
+        states, true_states, row = self._pending
+        self._pending = (states, true_states, row + 1) if row + 1 < len(states) else None
+        return states[row], true_states[row] if true_states is not None else None
 
     def close(self):
-        self.sock.close()
+        self.transport.close()
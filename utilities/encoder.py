@@ -1,11 +1,15 @@
+import numpy as np
+from utilities.perturbation import char_codes
+
 class TextEncoder:
     def __init__(self, scale=0.001):
         self.scale = scale  # Scale factor for perturbations
 
     def encode(self, text):
         """Encodes text into perturbations for Lorenz initialization."""
-        return [(ord(char) - 32) * self.scale for char in text]
+        return (char_codes(text) - 32) * self.scale
 
     def decode(self, perturbations):
         """Decodes received perturbations back into text."""
-        return ''.join(chr(int(p / self.scale) + 32) for p in perturbations)
+        codes = (np.asarray(perturbations, dtype=np.float64) / self.scale).astype(np.int64) + 32
+        return codes.astype('<u4').tobytes().decode('utf-32-le')
@@ -0,0 +1,240 @@
+# loadgen.py
+import time
+import numpy as np
+from utilities.lorenz import ChaoticEnsemble
+from utilities.pacing import Pacer
+from utilities.perturbation import PerturbationEncoder
+from utilities.transport import UDPTransport
+from utilities.wire import (FLAG_PREAMBLE, FLAG_SYNC_ACK, FLAG_SYNC_LOST, FrameError,
+                            decode_frame, encode_frame)
+
+
+class LossModel:
+    """Gilbert-Elliott packet loss per session: loss on average, in bursts
+
+    Each session is in a good or a lost state; a lost run lasts burst
+    packets on average and the stationary loss fraction is loss. burst=1
+    is independent (Bernoulli) loss.
+    """
+
+    def __init__(self, n_sessions, loss=0.0, burst=1.0, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.loss = loss
+        self.recover = 1.0 / max(burst, 1.0)
+        # P(good -> lost) giving a stationary loss fraction of loss
+        self.fail = loss * self.recover / (1.0 - loss) if loss < 1 else 1.0
+        self.lost = np.zeros(n_sessions, dtype=bool)
+
+    def draw(self):
+        """(n_sessions,) mask of packets to drop this round"""
+        if not self.loss:
+            return self.lost
+        u = self.rng.random(len(self.lost))
+        self.lost = np.where(self.lost, u >= self.recover, u < self.fail)
+        return self.lost
+
+
+class LoadGenerator:
+    """M synthetic transmitters sending preamble and random text to a receiver
+
+    The transmitters are rows of one ChaoticEnsemble, each its own session
+    id (sessions from first_session on). Every round advances all of them
+    block steps and sends one frame per session, paced by a Pacer at rate
+    packets/s in aggregate; frames chosen by the LossModel are skipped
+    (their steps still advance, as real loss would). Like SecureSender's
+    handshake, a session sends preamble until the receiver acks lock (and
+    at least preamble steps), and goes back to preamble on FLAG_SYNC_LOST.
+    The characters of every delivered message step are kept per session
+    for checking what the receiver decoded.
+    """
+
+    def __init__(self, sessions=100, port=12346, host='127.0.0.1', block=20, preamble=200,
+                 rate=None, loss=0.0, burst=1.0, first_session=0, seed=0, transport=None):
+        self.n_sessions = sessions
+        self.block = block
+        self.preamble = preamble
+        self.transport = transport if transport is not None else UDPTransport(send_buffer=8 << 20)
+        self.dest = self.transport.resolve(f"{host}:{port}")
+        self.pacer = Pacer(rate=rate)
+        self.loss = LossModel(sessions, loss, burst, seed)
+        self.rng = np.random.default_rng(seed + 1)
+        self.ensemble = ChaoticEnsemble(sessions)
+        self.session_ids = list(range(first_session, first_session + sessions))
+        self._rows = {session: row for row, session in enumerate(self.session_ids)}
+        self.acked = np.zeros(sessions, dtype=bool)
+        self.step = 0
+        self.packets_sent = self.packets_dropped = 0
+        self.chars_sent = 0
+        self.message_seconds = 0.0
+        self._delivered = [[] for _ in range(sessions)]  # Per session, code arrays
+
+    def _poll_acks(self):
+        """Apply the receiver's back-channel frames to acked"""
+        for data, _ in self.transport.recv_batch(4096, 0):
+            try:
+                frame = decode_frame(data)
+            except FrameError:
+                continue
+            row = self._rows.get(frame.session)
+            if row is None:
+                continue
+            if frame.flags & FLAG_SYNC_ACK:
+                self.acked[row] = True
+            elif frame.flags & FLAG_SYNC_LOST:
+                self.acked[row] = False
+
+    def _round(self, message):
+        """Advance every transmitter block steps and send the frames
+
+        With message, acked sessions send random text; the rest preamble.
+        """
+        self._poll_acks()
+        trajectory = np.empty((self.block, self.n_sessions, 3))
+        for i in range(self.block):
+            trajectory[i] = self.ensemble.step()
+        modulated = self.acked.copy() if message else np.zeros(self.n_sessions, dtype=bool)
+        codes = None
+        if modulated.any():
+            codes = self.rng.integers(32, 127, (self.block, self.n_sessions), dtype=np.uint8)
+            masks = PerturbationEncoder.encode_array(codes.tobytes()).reshape(codes.shape)
+            trajectory[:, :, 0] += masks * modulated
+        dropped = self.loss.draw()
+        sendto, dest, wait, seq = self.transport.sendto, self.dest, self.pacer.wait, self.step
+        for row, session in enumerate(self.session_ids):
+            wait(1)
+            if dropped[row]:
+                continue
+            sendto(encode_frame(trajectory[:, row], seq=seq,
+                                flags=0 if modulated[row] else FLAG_PREAMBLE,
+                                session=session), dest)
+            if modulated[row]:
+                self._delivered[row].append(codes[:, row])
+        n_dropped = int(dropped.sum())
+        self.packets_dropped += n_dropped
+        self.packets_sent += self.n_sessions - n_dropped
+        self.chars_sent += int((modulated & ~dropped).sum()) * self.block
+        self.step += self.block
+
+    def run(self, duration):
+        """Preamble, then random messages until duration seconds have passed
+
+        Returns the achieved aggregate packets/s (intentional drops count,
+        since their pacing slot is used).
+        """
+        self.pacer.reset()
+        start = time.perf_counter()
+        for _ in range(-(-self.preamble // self.block)):
+            self._round(message=False)
+        messages = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            self._round(message=True)
+        elapsed = time.perf_counter() - start
+        self.message_seconds = elapsed - (messages - start)
+        return (self.packets_sent + self.packets_dropped) / elapsed
+
+    def expected(self, row):
+        """Characters of the message steps delivered to session row"""
+        chunks = self._delivered[row]
+        return np.concatenate(chunks).tobytes().decode('latin-1') if chunks else ''
+
+    def close(self):
+        self.transport.close()
+
+
+def _accuracy(generator, decoded):
+    """Fraction of delivered characters decoded correctly, over all sessions
+
+    Receivers step through but do not decode preamble frames, so the
+    decoded text lines up with the delivered message steps from its start.
+    """
+    correct = total = 0
+    for row, session in enumerate(generator.session_ids):
+        expected = generator.expected(row)
+        text = ''.join(decoded.get(session, ()))
+        correct += sum(a == b for a, b in zip(text, expected))
+        total += len(expected)
+    return correct / total if total else 1.0
+
+
+def find_capacity(port=12346, sessions=100, rates=None, start_rate=2000, duration=2.0,
+                  block=20, preamble=200, loss=0.0, burst=1.0, workers=1, mode='auto',
+                  max_drop=0.001, min_accuracy=0.999, settle=1.0, refine=2, seed=0):
+    """Step the aggregate rate up against a launched ReceiverCluster
+
+    Each level uses fresh sessions, and its own seed, at rates[i]
+    packets/s (default: doubling from start_rate until a level fails, or
+    halving until one is sustained if start_rate already fails, then refine
+    bisection steps between the sustained and the failing rate). A level is
+    sustained when the receiver got all but max_drop of the packets sent
+    (beyond the intentional loss) and decoded min_accuracy of the
+    delivered characters (sessions still unlocked at the end deliver
+    none; see 'locked'). Returns (levels, best): per-level reports and
+    the fastest sustained one (None if none was).
+    """
+    from utilities.cluster import ReceiverCluster
+    cluster = ReceiverCluster(port=port, workers=workers, mode=mode, report_interval=0.2,
+                              capacity=65536, idle_timeout=max(duration, 5.0))
+    cluster.start(background=True)
+    time.sleep(0.5)  # Let the workers bind
+    levels, best = [], None
+    explicit = rates is not None
+    rates = list(rates) if explicit else [start_rate]
+    good = bad = None  # Bracket of the search
+    try:
+        first_session, last = 0, {}
+        while rates:
+            rate = rates.pop(0)
+            generator = LoadGenerator(sessions, port, block=block, preamble=preamble,
+                                      rate=rate, loss=loss, burst=burst,
+                                      first_session=first_session,
+                                      seed=seed + 2 * len(levels))  # Loss uses seed, text seed + 1
+            try:
+                achieved = generator.run(duration)
+            finally:
+                generator.close()
+            first_session += sessions
+            time.sleep(settle)  # Let the workers drain and report
+            counters = cluster.metrics_snapshot()['counters']
+            received = counters.get('packets_received', 0) - last.get('packets_received', 0)
+            last = counters
+            drop = 1.0 - received / generator.packets_sent if generator.packets_sent else 0.0
+            accuracy = _accuracy(generator, cluster.decoded)
+            level = {
+                'target_packets_per_s': rate,
+                'packets_per_s': achieved,
+                'chars_per_s': generator.chars_sent / max(generator.message_seconds, 1e-9),
+                'packets_sent': generator.packets_sent,
+                'packets_received': received,
+                'drop_rate': max(drop, 0.0),
+                'accuracy': accuracy,
+                'locked': float(generator.acked.mean()),
+                'generator_limited': rate is not None and achieved < 0.9 * rate,
+            }
+            level['sustained'] = level['drop_rate'] <= max_drop and accuracy >= min_accuracy
+            levels.append(level)
+            print(f"[LOADGEN] {achieved:9.0f} pkts/s {level['chars_per_s']:10.0f} chars/s "
+                  f"drop {level['drop_rate']:.2%} accuracy {accuracy:.2%}"
+                  f"{'' if level['sustained'] else '  <- not sustained'}")
+            if level['sustained'] and (best is None
+                                       or level['packets_per_s'] > best['packets_per_s']):
+                best = level
+            if not explicit:
+                if level['sustained']:
+                    good = rate
+                else:
+                    bad = rate
+                if level['sustained'] and level['generator_limited']:
+                    print("[LOADGEN] generator cannot go faster; capacity is at least this")
+                elif bad is None:
+                    rates.append(rate * 2)
+                elif good is None:
+                    if rate > 1:
+                        rates.append(rate / 2)
+                elif good is not None and refine > 0:
+                    refine -= 1
+                    rates.append((good + bad) / 2)
+            for session in generator.session_ids:
+                cluster.decoded.pop(session, None)
+    finally:
+        cluster.stop()
+    return levels, best
@@ -1,8 +1,11 @@
 # lorenz.py
 import numpy as np
+from utilities.propagator import PiecewiseAffinePropagator
+
+INTEGRATION_METHODS = ('euler', 'exact')
 
 class ChaoticSystem:
-    def __init__(self, system_type='transmitter'):
+    def __init__(self, system_type='transmitter', method='euler'):
         # Paper's EXACT parameters from Section 3 Example
         self.alpha = 6.3       # R/L1 ratio = 0.1/0.0159 
         self.beta = 0.7        # R/L2 ratio = 0.1/0.1429
@@ -14,7 +17,25 @@ class ChaoticSystem:
         
         # Paper's exact initial conditions
         self.state = np.array([0.1, 0.11, 0.12], dtype=np.float64)
+        self.initial_state = self.state.copy()
+        self.steps = 0  # Steps taken so far; frames carry it as their seq
         self.system_type = system_type
+        self.method = self._check_method(method)
+        self._propagator = None
+
+    @staticmethod
+    def _check_method(method):
+        if method not in INTEGRATION_METHODS:
+            raise ValueError(f"Unknown integration method {method!r}, "
+                             f"expected one of {INTEGRATION_METHODS}")
+        return method
+
+    @property
+    def propagator(self):
+        """Lazily built piecewise-exact propagator (matrix exponentials are cached)"""
+        if self._propagator is None:
+            self._propagator = PiecewiseAffinePropagator(self)
+        return self._propagator
 
     def nonlinear_func(self, x):
         """Implementation of Eq. (14) piecewise-linear function"""
@@ -22,8 +43,11 @@ class ChaoticSystem:
             np.abs(x + self.I0) - np.abs(x - self.I0)
         )
 
-    def continuous_step(self, error_signal=0, dt=0.001):
+    def continuous_step(self, error_signal=0, dt=0.001, method=None):
         """Paper's continuous dynamics with time scaling t=6349.2τ"""
+        if self._check_method(method or self.method) == 'exact':
+            return self._exact_step(error_signal, dt)
+
         x, y, z = self.state
         
         # Scaled time step from paper's circuit implementation
@@ -42,4 +66,226 @@ class ChaoticSystem:
         
         # Scaled Euler integration
         self.state += np.array([dx, dy, dz]) * scaled_dt
+        self.steps += 1
+        return self.state.copy()
+
+    def _exact_step(self, error_signal, dt):
+        """Piecewise-exact step (to within 2^-24 dt), receiver drive v = x + error_signal"""
+        drive = None
+        if self.system_type == 'receiver':
+            drive = self.state[0] + error_signal
+        self.state[:] = self.propagator.step(self.state, dt=dt, drive=drive)
+        self.steps += 1
         return self.state.copy()
+
+    def integrate(self, n_steps, error_signals=None, out=None, dt=0.001,
+                  method=None, drive=None, errors_out=None, levels=None):
+        """Advance n_steps of continuous_step in one call.
+
+        Row i of the (n_steps, 3) result holds the state after step i, i.e.
+        exactly what the i-th continuous_step call would have returned.
+        error_signals gives the per-step receiver feedback (ignored for the
+        transmitter). out may be a caller-owned C-contiguous float64 buffer
+        that is reused across calls instead of allocating a new one.
+        method overrides self.method ('euler' or 'exact') for this call.
+
+        Instead of error_signals a receiver can be given drive, the received
+        x components; the feedback is then drive[i] - x computed before each
+        step, exactly as the decode loop does per packet. Those errors (the
+        recovered s_r = v - w) are written to errors_out when provided.
+
+        levels=(spacing, top) makes a driven receiver decision-directed:
+        s_r is taken to carry a symbol round(s_r / spacing) in [0, top],
+        and that symbol's amplitude is removed from the feedback. The
+        masking then no longer drives the receiver (it would otherwise be
+        pushed off the transmitter by L * s for as long as a message lasts);
+        only the residual sync error does. errors_out still gets s_r.
+        """
+        if out is None:
+            out = np.empty((n_steps, 3), dtype=np.float64)
+        elif (out.shape != (n_steps, 3) or out.dtype != np.float64
+              or not out.flags.c_contiguous):
+            raise ValueError("out must be a C-contiguous float64 array of shape (n_steps, 3)")
+        if n_steps == 0:
+            return out
+
+        driven = drive is not None
+        source = drive if driven else error_signals
+        feedback = self.system_type == 'receiver' and source is not None
+        if driven and errors_out is None:
+            errors_out = np.empty(n_steps)
+        if feedback:
+            errors = np.asarray(source, dtype=np.float64)
+            if errors.shape != (n_steps,):
+                raise ValueError("error_signals/drive must have shape (n_steps,)")
+            errors = errors.tolist()
+            l0, l1, l2 = (float(g) for g in self.L)
+        driven = driven and feedback
+        decide = driven and levels is not None
+        if decide:
+            spacing, top = float(levels[0]), levels[1]
+
+        if self._check_method(method or self.method) == 'exact':
+            for i in range(n_steps):
+                e = 0
+                if feedback:
+                    e = errors[i] - self.state[0] if driven else errors[i]
+                if driven:
+                    errors_out[i] = e
+                if decide:
+                    e -= min(max(round(e / spacing), 0), top) * spacing
+                out[i] = self._exact_step(e, dt)
+            return out
+
+        # Plain Python floats: same IEEE arithmetic as the ndarray path
+        # without the per-step array allocations
+        alpha, beta, gamma = float(self.alpha), float(self.beta), float(self.gamma)
+        b, I0 = float(self.b), float(self.I0)
+        half_ab = 0.5*(float(self.a) - b)
+        scaled_dt = dt / 6349.2
+        x, y, z = self.state.tolist()
+        flat = memoryview(out.reshape(-1))
+        if driven:
+            recovered = memoryview(errors_out)
+
+        for i in range(n_steps):
+            dx = -alpha*(x + y + (b*x + half_ab*(abs(x + I0) - abs(x - I0))))
+            dy = -beta*(x + y) - gamma*z
+            dz = y
+            if feedback:
+                e = errors[i]
+                if driven:
+                    e -= x
+                    recovered[i] = e
+                    if decide:
+                        e -= min(max(round(e / spacing), 0), top) * spacing
+                dx += l0 * e
+                dy += l1 * e
+                dz += l2 * e
+            x += dx * scaled_dt
+            y += dy * scaled_dt
+            z += dz * scaled_dt
+            j = 3*i
+            flat[j] = x
+            flat[j + 1] = y
+            flat[j + 2] = z
+
+        self.state[:] = out[-1]
+        self.steps += n_steps
+        return out
+
+
+class ChaoticEnsemble:
+    """N independent copies of ChaoticSystem advanced as one (N, 3) array.
+
+    Parameters and Lyapunov gains are per-system arrays, so links with
+    different circuits can share one ensemble. States and gains are stored
+    in Fortran order so each component column is contiguous for the
+    vectorized Euler step.
+    """
+    PARAMETERS = ('alpha', 'beta', 'gamma', 'a', 'b', 'I0')
+
+    def __init__(self, n_systems, system_type='transmitter'):
+        template = ChaoticSystem(system_type=system_type)
+        for name in self.PARAMETERS:
+            setattr(self, name, np.full(n_systems, float(getattr(template, name))))
+        self.L = np.asfortranarray(np.tile(template.L.astype(np.float64), (n_systems, 1)))
+        self.receiver = np.full(n_systems, system_type == 'receiver')
+        self.states = np.asfortranarray(np.tile(template.state, (n_systems, 1)))
+        self._scratch = np.empty((6, n_systems))
+
+    @classmethod
+    def from_systems(cls, systems):
+        """Pack existing ChaoticSystem objects (parameters, gains, states)"""
+        ensemble = cls(len(systems))
+        for i, system in enumerate(systems):
+            for name in cls.PARAMETERS:
+                getattr(ensemble, name)[i] = getattr(system, name)
+            ensemble.L[i] = system.L
+            ensemble.receiver[i] = system.system_type == 'receiver'
+            ensemble.states[i] = system.state
+        return ensemble
+
+    def __len__(self):
+        return self.states.shape[0]
+
+    def nonlinear_func(self, x, out=None):
+        """Eq. (14) evaluated for every system at once
+
+        |x + I0| - |x - I0| is 2*clip(x, -I0, I0), which saves two passes.
+        """
+        tmp = self._scratch[3]
+        out = np.clip(x, -self.I0, self.I0, out=out)
+        np.subtract(self.a, self.b, out=tmp)
+        out *= tmp
+        np.multiply(self.b, x, out=tmp)
+        out += tmp
+        return out
+
+    def step(self, error_signals=None, dt=0.001):
+        """One scaled Euler step of every system, per-system feedback
+
+        error_signals is an (N,) array of x-component errors; it is only
+        injected into systems flagged as receivers.
+        """
+        x, y, z = self.states[:, 0], self.states[:, 1], self.states[:, 2]
+        dx, dy, dz, tmp, e = self._scratch[:5]
+        scaled_dt = dt / 6349.2
+
+        # Eqs. 15-17
+        self.nonlinear_func(x, out=dx)
+        dx += x
+        dx += y
+        dx *= self.alpha
+        np.negative(dx, out=dx)
+        np.add(x, y, out=dy)
+        dy *= self.beta
+        np.multiply(self.gamma, z, out=tmp)
+        dy += tmp
+        np.negative(dy, out=dy)
+        dz[:] = y
+
+        # Lyapunov control injection (receivers only)
+        if error_signals is not None:
+            np.multiply(error_signals, self.receiver, out=e)
+            for col, d in enumerate((dx, dy, dz)):
+                np.multiply(self.L[:, col], e, out=tmp)
+                d += tmp
+
+        for col, d in zip((x, y, z), (dx, dy, dz)):
+            d *= scaled_dt
+            col += d
+        return self.states
+
+    def step_subset(self, index, error_signals=None, dt=0.001):
+        """One scaled Euler step of only the systems in index
+
+        Same dynamics as step(), gathered for the selected rows so a
+        server can advance just the links that received samples.
+        error_signals, if given, is aligned with index. Returns the new
+        (len(index), 3) states.
+        """
+        states = self.states[index]
+        x, y, z = states[:, 0], states[:, 1], states[:, 2]
+        I0, a, b = self.I0[index], self.a[index], self.b[index]
+
+        deriv = np.empty_like(states)
+        g = np.clip(x, -I0, I0)
+        g *= a - b
+        g += b * x
+        deriv[:, 0] = -self.alpha[index] * (g + x + y)  # Eqs. 15-17
+        deriv[:, 1] = -(self.beta[index] * (x + y) + self.gamma[index] * z)
+        deriv[:, 2] = y
+
+        if error_signals is not None:
+            e = np.asarray(error_signals, dtype=np.float64) * self.receiver[index]
+            deriv += self.L[index] * e[:, None]
+
+        deriv *= dt / 6349.2
+        states += deriv
+        self.states[index] = states
+        return states
+
+    def reset_states(self, index, state=(0.1, 0.11, 0.12)):
+        """Put the systems in index back on the initial condition"""
+        self.states[index] = state
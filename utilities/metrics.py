@@ -0,0 +1,283 @@
+# metrics.py
+import json
+import math
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+class Counter:
+    """Monotonic event counter"""
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+
+class Gauge:
+    """Last-written value"""
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+
+class LogLinearHistogram:
+    """Log-linear histogram: power-of-two buckets split linearly
+
+    Each binary order of magnitude is divided into sub_buckets equal
+    slots, so the relative error of a reported quantile is at most
+    1/sub_buckets at any scale (ns latencies and 1e-7 sync errors alike).
+
+    record() only appends to a pending list; every flush_at values are
+    bucketed together with numpy, which keeps the per-packet cost well
+    under a microsecond. Readers (quantile, snapshot, count, ...) fold in
+    whatever is pending without disturbing it, so another thread may
+    read while one records.
+    """
+    __slots__ = ('sub_buckets', 'min_exp', 'max_exp', 'counts', 'flush_at', '_count',
+                 '_total', '_min', '_max', '_offset', '_pending', '_lock')
+
+    def __init__(self, sub_buckets=16, min_exp=-64, max_exp=64, flush_at=1024):
+        self.sub_buckets = sub_buckets
+        self.min_exp = min_exp
+        self.max_exp = max_exp
+        self.counts = [0] * ((max_exp - min_exp + 1) * sub_buckets + 1)
+        self.flush_at = flush_at
+        self._count = 0
+        self._total = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+        # frexp mantissa m is in [0.5, 1), so int(m * 2 * sub_buckets) is in
+        # [sub_buckets, 2 * sub_buckets); fold both offsets into one constant
+        self._offset = 1 - min_exp * sub_buckets - sub_buckets
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def record(self, value):
+        pending = self._pending
+        pending.append(value)
+        if len(pending) >= self.flush_at:
+            self.flush()
+
+    def record_many(self, values):
+        """record() every value of a sequence at once"""
+        values = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            self._bucket(values)
+
+    def flush(self):
+        """Bucket the pending values (called by the recording thread)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._bucket(np.array(pending, dtype=np.float64))
+
+    def _bucket(self, values):
+        if not len(values):
+            return
+        self._count += len(values)
+        self._total += float(values.sum())
+        self._min = min(self._min, float(values.min()))
+        self._max = max(self._max, float(values.max()))
+        positive = values[values > 0]
+        self.counts[0] += len(values) - len(positive)  # Zero and negative share slot 0
+        if not len(positive):
+            return
+        mantissa, exponent = np.frexp(positive)
+        index = exponent.astype(np.int64) * self.sub_buckets
+        index += (mantissa * 2 * self.sub_buckets).astype(np.int64)
+        index += self._offset
+        # Out-of-range exponents go to the end slots
+        np.clip(index, 1, len(self.counts) - 1, out=index)
+        low = int(index.min())
+        tally = np.bincount(index - low)
+        hit = np.flatnonzero(tally)
+        counts = self.counts
+        for i, n in zip((hit + low).tolist(), tally[hit].tolist()):
+            counts[i] += n
+
+    def _settled(self):
+        """A copy with the pending values bucketed"""
+        copy = LogLinearHistogram(self.sub_buckets, self.min_exp, self.max_exp, self.flush_at)
+        with self._lock:
+            pending = list(self._pending)
+            copy.counts = list(self.counts)
+            copy._count, copy._total = self._count, self._total
+            copy._min, copy._max = self._min, self._max
+        copy._bucket(np.array(pending, dtype=np.float64))
+        return copy
+
+    @property
+    def count(self):
+        with self._lock:
+            return self._count + len(self._pending)
+
+    @property
+    def total(self):
+        return self._settled()._total
+
+    @property
+    def min(self):
+        return self._settled()._min
+
+    @property
+    def max(self):
+        return self._settled()._max
+
+    def _bucket_value(self, index):
+        """Upper edge of a bucket"""
+        if index == 0:
+            return 0.0
+        exponent, sub = divmod(index - 1, self.sub_buckets)
+        mantissa = 0.5 + (sub + 1) / (2 * self.sub_buckets)
+        return math.ldexp(mantissa, exponent + self.min_exp)
+
+    def quantile(self, q):
+        return self._settled()._quantile(q)
+
+    def _quantile(self, q):
+        if not self._count:
+            return 0.0
+        target = q * self._count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return min(self._bucket_value(index), self._max)
+        return self._max
+
+    def snapshot(self):
+        h = self._settled()
+        if not h._count:
+            return {'count': 0}
+        return {
+            'count': h._count,
+            'mean': h._total / h._count,
+            'min': h._min,
+            'max': h._max,
+            'p50': h._quantile(0.5),
+            'p90': h._quantile(0.9),
+            'p99': h._quantile(0.99),
+            'p999': h._quantile(0.999),
+        }
+
+
+class Metrics:
+    """Named counters, gauges and histograms with JSON/text snapshots
+
+    Registration and snapshot() share a lock, so a MetricsReporter thread
+    can snapshot while the hot path registers new metrics; updating a
+    metric already bound takes no lock.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+
+    def _get(self, registry, name, factory):
+        metric = registry.get(name)
+        if metric is None:
+            with self._lock:
+                metric = registry.get(name)
+                if metric is None:
+                    metric = registry[name] = factory()
+        return metric
+
+    def counter(self, name):
+        return self._get(self.counters, name, Counter)
+
+    def gauge(self, name):
+        return self._get(self.gauges, name, Gauge)
+
+    def histogram(self, name, **kwargs):
+        return self._get(self.histograms, name, lambda: LogLinearHistogram(**kwargs))
+
+    def snapshot(self):
+        with self._lock:
+            counters = list(self.counters.items())
+            gauges = list(self.gauges.items())
+            histograms = list(self.histograms.items())
+        return {
+            'timestamp': time.time(),
+            'uptime_s': time.time() - self.start_time,
+            'counters': {name: c.value for name, c in counters},
+            'gauges': {name: g.value for name, g in gauges},
+            'histograms': {name: h.snapshot() for name, h in histograms},
+        }
+
+    @staticmethod
+    def format_text(snapshot):
+        lines = [f"uptime_s {snapshot['uptime_s']:.1f}"]
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"{name} {value}")
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f"{name} {value:.4g}")
+        for name, rate in sorted(snapshot.get('rates', {}).items()):
+            lines.append(f"{name}_per_s {rate:.1f}")
+        for name, h in sorted(snapshot['histograms'].items()):
+            fields = ' '.join(f"{k}={v:.4g}" for k, v in h.items() if k != 'count')
+            lines.append(f"{name} count={h['count']} {fields}".rstrip())
+        return "\n".join(lines)
+
+
+class MetricsReporter(threading.Thread):
+    """Periodically dumps a Metrics snapshot for scraping
+
+    Writes to path (JSON if it ends in .json, text otherwise; replaced
+    atomically) or to stdout. Each snapshot also carries per-second rates
+    of every counter since the previous dump.
+    """
+
+    def __init__(self, metrics, interval=5.0, path=None):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.interval = interval
+        self.path = path
+        self._stop_event = threading.Event()
+        self._last = (time.time(), {})
+
+    def collect(self):
+        snapshot = self.metrics.snapshot()
+        last_time, last_counters = self._last
+        elapsed = max(snapshot['timestamp'] - last_time, 1e-9)
+        snapshot['rates'] = {
+            name: (value - last_counters.get(name, 0)) / elapsed
+            for name, value in snapshot['counters'].items()
+        }
+        self._last = (snapshot['timestamp'], snapshot['counters'])
+        return snapshot
+
+    def dump(self):
+        snapshot = self.collect()
+        if self.path is None:
+            print(Metrics.format_text(snapshot), file=sys.stdout, flush=True)
+            return
+        if self.path.endswith('.json'):
+            text = json.dumps(snapshot)
+        else:
+            text = Metrics.format_text(snapshot)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(text + "\n")
+        os.replace(tmp, self.path)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.dump()
+
+    def stop(self):
+        """Stop reporting (started or not) and write a final snapshot"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(self.interval + 1)
+        self.dump()
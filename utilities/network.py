@@ -1,24 +1,50 @@
-import socket
 import pickle
+from utilities.transport import UDPTransport
+from utilities.wire import get_codec
 
 class UDPConnection:
-    def __init__(self, host='localhost', port=12345, is_sender=False):
+    """Legacy dict/pickle API over transport.UDPTransport
+
+    New code should use communication.Communicator; this keeps the old
+    calls working with the shared socket handling and buffer sizes.
+    """
+    def __init__(self, host='localhost', port=12345, is_sender=False, codec='pickle',
+                 recv_buffer=None, send_buffer=None):
         self.host = host
         self.port = port
         self.is_sender = is_sender
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        if not is_sender:
-            self.sock.bind((self.host, self.port))
+        self.codec = codec
+        if codec != 'pickle':
+            self._encode, self._decode = get_codec(codec)
+        self.seq = 0
+        self.transport = UDPTransport(host, None if is_sender else port,
+                                      recv_buffer=recv_buffer, send_buffer=send_buffer)
+        self.sock = self.transport.sock
 
     def send(self, data, dest_ip, dest_port):
-        """Sends serialized Lorenz state data."""
-        packet = pickle.dumps(data)
-        self.sock.sendto(packet, (dest_ip, dest_port))
+        """Sends serialized Lorenz state data.
+
+        With codec='binary', data is a state array or a dict with 'state'
+        and optional 'true_state' entries.
+        """
+        if self.codec == 'pickle':
+            packet = pickle.dumps(data)
+        elif isinstance(data, dict):
+            packet = self._encode(data['state'], data.get('true_state'), seq=self.seq)
+        else:
+            packet = self._encode(data, seq=self.seq)
+        self.seq += 1
+        self.transport.sendto(packet, (dest_ip, dest_port))
 
     def receive(self):
-        """Receives data and returns deserialized Lorenz state."""
-        data, _ = self.sock.recvfrom(1024)
-        return pickle.loads(data)
+        """Receives data and returns deserialized Lorenz state.
+
+        With codec='binary' this is a wire.Frame.
+        """
+        data, _ = self.transport.recv()
+        if self.codec == 'pickle':
+            return pickle.loads(data)
+        return self._decode(data)
 
     def close(self):
-        self.sock.close()
+        self.transport.close()
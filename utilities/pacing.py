@@ -0,0 +1,91 @@
+# pacing.py
+import time
+
+_now_ns = time.perf_counter_ns
+
+
+class Pacer:
+    """Token bucket rate limiter in samples/sec over perf_counter_ns
+
+    Tokens accrue at rate per second up to burst. reserve(n) takes n
+    tokens and returns how long to wait (ns) before sending them; the
+    bucket may go into debt, so a block larger than burst is paced as a
+    whole instead of being refused. rate=None runs unthrottled.
+
+    Waiting sleeps for the coarse part and spins on the clock for the last
+    spin_ns, so pacing holds at rates where a bare time.sleep() per packet
+    would oversleep by its scheduler granularity. Only wall-clock send
+    times are shaped; the chaotic timeline (dt) is unaffected.
+    """
+
+    def __init__(self, rate=None, burst=None, spin_ns=200_000):
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive, or None for unthrottled")
+        self.rate = rate
+        # Default burst: 10 ms worth of samples
+        self.burst = burst if burst is not None else max(1.0, (rate or 0) / 100)
+        self.spin_ns = spin_ns
+        self.reset()
+
+    def reset(self):
+        self._tokens = self.burst
+        self._last = None
+        self._start = None
+        self.samples = 0
+        self.waited_ns = 0
+
+    @property
+    def unthrottled(self):
+        return self.rate is None
+
+    def reserve(self, n):
+        """Take n tokens, returning the wait in ns before they may be sent"""
+        now = _now_ns()
+        if self._start is None:
+            self._start = self._last = now
+        self.samples += n
+        if self.rate is None:
+            return 0
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate / 1e9)
+        self._last = now
+        self._tokens -= n
+        if self._tokens >= 0:
+            return 0
+        wait = int(-self._tokens * 1e9 / self.rate)
+        self.waited_ns += wait
+        return wait
+
+    def wait(self, n):
+        """Block until n samples may be sent"""
+        wait = self.reserve(n)
+        if not wait:
+            return
+        deadline = _now_ns() + wait
+        if wait > self.spin_ns:
+            time.sleep((wait - self.spin_ns) / 1e9)
+        while _now_ns() < deadline:
+            pass
+
+    @property
+    def elapsed(self):
+        return (_now_ns() - self._start) / 1e9 if self._start is not None else 0.0
+
+    @property
+    def achieved_rate(self):
+        return self.samples / max(self.elapsed, 1e-9)
+
+    def stats(self):
+        return {
+            'target_rate': self.rate,
+            'achieved_rate': self.achieved_rate,
+            'samples': self.samples,
+            'elapsed_s': self.elapsed,
+            'throttled_s': self.waited_ns / 1e9,
+        }
+
+    def describe(self):
+        """Achieved vs target rate, for log lines"""
+        if self.rate is None:
+            return f"{self.achieved_rate:.0f} samples/sec, unthrottled"
+        return (f"{self.achieved_rate:.0f}/{self.rate:.0f} samples/sec "
+                f"({self.achieved_rate / self.rate:.0%} of target)")
@@ -10,8 +10,144 @@ class PerturbationEncoder:
         scaled = (ord(char) - 32) * cls.SCALE_FACTOR
         return np.array([scaled, 0.0, 0.0], dtype=np.float32)
 
+    @classmethod
+    def encode_array(cls, data):
+        """x perturbations for a whole str/bytes message in one call
+
+        Matches encode(char)[0] element for element (float32 values).
+        """
+        return ((char_codes(data) - 32) * cls.SCALE_FACTOR).astype(np.float32)
+
 class PerturbationDecoder:
     @classmethod
     def decode(cls, perturbation):
         scaled = perturbation[0] / PerturbationEncoder.SCALE_FACTOR + 32
         return chr(max(32, min(127, int(np.round(scaled)))))
+
+    @classmethod
+    def decode_array(cls, values):
+        """bytes for a vector of recovered x perturbations
+
+        Same rounding and 32-127 clamping as decode(), applied at once.
+        """
+        scaled = np.asarray(values, dtype=np.float64) / PerturbationEncoder.SCALE_FACTOR + 32
+        return np.clip(np.rint(scaled), 32, 127).astype(np.uint8).tobytes()
+
+def char_codes(data):
+    """Character codes of a str (any code point) or bytes-like as an array"""
+    if isinstance(data, str):
+        return np.frombuffer(data.encode('utf-32-le'), dtype='<u4').astype(np.int64)
+    return np.frombuffer(data, dtype=np.uint8).astype(np.int64)
+
+class SymbolMapper:
+    """Packs message bits across x, y and z with 2**bits levels per component
+
+    The legacy scheme carries one character (log2(95) ≈ 6.6 bits) in x per
+    step. Here every step carries components * bits payload bits: the bit
+    stream is cut into bits-wide symbols and each symbol is sent as one of
+    evenly spaced amplitudes in [0, max_amplitude] on the next component.
+
+    Amplitude index 0 is IDLE, never data: unmodulated steps (preamble,
+    padding) demap to nothing, so NUL bytes in the payload survive. A
+    symbol of value v is sent at index 1 + v. The last symbol of a
+    message is padded with zero bits; when that padding holds whole bytes
+    (only possible with bits > 8) one MARK symbol per padding byte goes
+    just before it, and the demapper drops those bytes. Partial bytes are
+    dropped at the next IDLE: a message that does not end on a byte
+    boundary ends with IDLE slots (an extra idle step if need be), so the
+    next one starts aligned. Decoding is stateful across blocks, so
+    blocks need not end on symbol or byte boundaries.
+    """
+    IDLE = 0
+
+    def __init__(self, components=3, bits=8, max_amplitude=PerturbationEncoder.MAX_AMPLITUDE):
+        if not 1 <= components <= 3:
+            raise ValueError("components must be 1, 2 or 3")
+        if not 1 <= bits <= 24:
+            raise ValueError("bits must be between 1 and 24")
+        self.components = components
+        self.bits = bits
+        self.levels = 2 ** bits  # Data values per symbol
+        self.mark = self.levels + 1  # Highest amplitude index
+        self.max_amplitude = max_amplitude
+        self.step = max_amplitude / self.mark
+        self._shifts = np.arange(bits - 1, -1, -1, dtype=np.int64)
+        self._weights = 1 << self._shifts
+        self.reset()
+
+    @property
+    def bits_per_step(self):
+        return self.components * self.bits
+
+    def _padding(self, n_bytes):
+        """(zero bits in the last symbol, symbols incl. MARKs, idle slots)"""
+        pad = -8 * n_bytes % self.bits
+        n_symbols = (8 * n_bytes + pad) // self.bits + (pad // 8 if pad >= 8 else 0)
+        idle = -n_symbols % self.components
+        if pad % 8 and not idle:
+            idle = self.components  # A whole idle step ends the partial byte
+        return pad, n_symbols, idle
+
+    def n_steps(self, n_bytes):
+        """Steps map() uses for n_bytes of data"""
+        _, n_symbols, idle = self._padding(n_bytes)
+        return (n_symbols + idle) // self.components
+
+    def symbols_from_bytes(self, data):
+        """Amplitude indices carrying data, IDLE padded to whole steps"""
+        data = bytes(data)
+        pad, _, idle = self._padding(len(data))
+        bitstream = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        bitstream = np.concatenate((bitstream, np.zeros(pad, dtype=np.uint8)))
+        symbols = bitstream.reshape(-1, self.bits) @ self._weights + 1
+        if pad >= 8:
+            marks = np.full(pad // 8, self.mark, dtype=np.int64)
+            symbols = np.concatenate((symbols[:-1], marks, symbols[-1:]))
+        return np.concatenate((symbols, np.full(idle, self.IDLE, dtype=np.int64)))
+
+    def map(self, data):
+        """(n_steps, 3) float32 perturbations carrying data"""
+        symbols = self.symbols_from_bytes(data).reshape(-1, self.components)
+        perturb = np.zeros((len(symbols), 3), dtype=np.float32)
+        perturb[:, :self.components] = symbols * self.step
+        return perturb
+
+    def demap_symbols(self, perturbations):
+        """Nearest amplitude indices for an (n_steps, 3) block"""
+        values = np.asarray(perturbations, dtype=np.float64)[:, :self.components]
+        return np.clip(np.rint(values / self.step), 0, self.mark).astype(np.int64)
+
+    def demap(self, perturbations):
+        """Bytes recovered from a block; partial bytes carry to the next call"""
+        symbols = self.demap_symbols(perturbations).reshape(-1)
+        special = np.flatnonzero((symbols == self.IDLE) | (symbols == self.mark))
+        if not len(special):
+            return self._unpack(symbols - 1)
+        parts, start = [], 0
+        for i in special.tolist():
+            parts.append(self._unpack(symbols[start:i] - 1))
+            if symbols[i] == self.IDLE:
+                self.reset()
+            else:
+                self._marks += 1
+            start = i + 1
+        parts.append(self._unpack(symbols[start:] - 1))
+        return b''.join(parts)
+
+    def _unpack(self, values):
+        if not len(values):
+            return b''
+        bits = ((values[:, None] >> self._shifts) & 1).astype(np.uint8).reshape(-1)
+        if self._marks:
+            # The symbol after MARKs ends a message; drop its padding bytes
+            keep = max(self.bits - 8 * self._marks, 0)
+            bits = np.concatenate((bits[:keep], bits[self.bits:]))
+            self._marks = 0
+        bitstream = np.concatenate((self._carry, bits))
+        whole = len(bitstream) - len(bitstream) % 8
+        self._carry = bitstream[whole:]
+        return np.packbits(bitstream[:whole]).tobytes()
+
+    def reset(self):
+        self._carry = np.empty(0, dtype=np.uint8)
+        self._marks = 0
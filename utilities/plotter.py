@@ -5,6 +5,78 @@ from matplotlib.gridspec import GridSpec
 from collections import deque
 import time
 
+class RingBuffer:
+    """Fixed-size NumPy ring buffer with O(1) append"""
+    def __init__(self, size, dtype=np.float64):
+        self.data = np.zeros(size, dtype=dtype)
+        self.size = size
+        self.count = 0  # Total values ever appended
+
+    def append(self, value):
+        """Store value, returning the one it evicted (None while filling)"""
+        pos = self.count % self.size
+        evicted = self.data[pos] if self.count >= self.size else None
+        self.data[pos] = value
+        self.count += 1
+        return evicted
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def ordered(self):
+        """Buffered values, oldest first (a copy, bounded by size)"""
+        if self.count <= self.size:
+            return self.data[:self.count].copy()
+        pos = self.count % self.size
+        return np.concatenate((self.data[pos:], self.data[:pos]))
+
+class WindowStats:
+    """Running mean/variance/min over the last size values in O(1) per value"""
+    def __init__(self, size):
+        self.values = RingBuffer(size)
+        self.total = 0.0
+        self.total_sq = 0.0
+        # Monotonic deque of (index, value): increasing values, front is the min
+        self._minima = deque()
+
+    def append(self, value):
+        index = self.values.count
+        minima = self._minima
+        while minima and minima[-1][1] >= value:
+            minima.pop()
+        minima.append((index, value))
+        if minima[0][0] <= index - self.values.size:
+            minima.popleft()
+        evicted = self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+        if evicted is not None:
+            self.total -= evicted
+            self.total_sq -= evicted * evicted
+        # Resync the sums once per lap so rounding cannot accumulate
+        if self.values.count % self.values.size == 0:
+            self.total = float(self.values.data.sum())
+            self.total_sq = float(np.dot(self.values.data, self.values.data))
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def mean(self):
+        n = len(self.values)
+        return self.total / n if n else 0.0
+
+    @property
+    def std(self):
+        n = len(self.values)
+        if not n:
+            return 0.0
+        mean = self.total / n
+        return float(np.sqrt(max(0.0, self.total_sq / n - mean * mean)))
+
+    def min(self):
+        return float(self._minima[0][1]) if self._minima else 0.0
+
 class RealTimeChaosPlotter:
     def __init__(self):
         plt.ion()
@@ -44,105 +116,130 @@ class RealTimeChaosPlotter:
         
     def init_data(self):
         """Initialize plot elements and data buffers"""
-        # Phase space plot elements
-        # self.phase_scatter = self.ax_phase.scatter([], [], c='blue', s=2, alpha=0.5)
-        # self.current_point = self.ax_phase.scatter([], [], c='red', s=50, marker='x')
+        # Buffer sizes
+        self.window_size = 1000
+        self.stats_window = 100
+        self.n_annotations = 30  # Non-space characters shown as perturbations
+        self.text_window = 100   # Characters shown in the message panel
         
-        # Perturbation markers and annotations
-        self.perturb_scatter = self.ax_perturb.scatter([], [], c='red', s=30, alpha=0.7)
+        # Perturbation markers and a fixed pool of reusable annotations
+        self.perturb_scatter = self.ax_perturb.scatter([], [], c='red', s=30, alpha=0.7,
+                                                       animated=True)
         self.perturb_annotations = []
+        for _ in range(self.n_annotations):
+            ann = self.ax_perturb.annotate(
+                '', xy=(0, 0), xytext=(0, 10), textcoords='offset points',
+                ha='center', va='bottom', fontsize=8, animated=True, visible=False,
+                bbox=dict(boxstyle='round,pad=0.3', fc='yellow', alpha=0.7),
+                arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0')
+            )
+            self.perturb_annotations.append(ann)
         
         # Error line
-        self.error_line, = self.ax_error.plot([], [], 'k-', lw=1)
+        self.error_line, = self.ax_error.plot([], [], 'k-', lw=1, animated=True)
+        self.ax_error.set_xlim(0, self.window_size)
+        self.ax_error.set_ylim(1e-10, 1e-2)
         
         # Message and stats text
         self.stats_text = self.ax_stats.text(0.05, 0.95, "", transform=self.ax_stats.transAxes,
-                                            va='top', fontsize=9, fontfamily='monospace')
+                                            va='top', fontsize=9, fontfamily='monospace',
+                                            animated=True)
         self.msg_text = self.ax_msg.text(0.05, 0.95, "", transform=self.ax_msg.transAxes,
-                                        va='top', wrap=True, fontsize=11)
+                                        va='top', wrap=True, fontsize=11, animated=True)
         
-        # Data buffers with appropriate sizes
-        self.window_size = 1000
-        self.trail_size = 100  # Number of points to show in phase trail
-        self.rx_values = deque(maxlen=self.window_size)
-        self.ry_values = deque(maxlen=self.window_size)
-        self.error_values = deque(maxlen=self.window_size)
-        self.perturb_times = []
-        self.perturb_values = []
-        self.messages = []
+        # Fixed-size data buffers
+        self.rx_values = RingBuffer(self.window_size)
+        self.error_values = RingBuffer(self.window_size)
+        self.perturb_times = RingBuffer(self.n_annotations, dtype=np.int64)
+        self.perturb_values = RingBuffer(self.n_annotations)
+        self.perturb_chars = RingBuffer(self.n_annotations, dtype='U1')
+        self.messages = RingBuffer(self.text_window, dtype='U1')
         
         # Statistics tracking
         self.sync_quality = 0
-        self.sync_stability = []
+        self.sync_stability = WindowStats(self.stats_window)
         self.message_rate = 0
         self.total_chars = 0
+        self.dropped_samples = 0  # Skipped by a background renderer
         self.decode_start_time = time.time()
+
+        # Blitting: the static background is re-captured on every full draw
+        self._background = None
+        self._needs_full_draw = True
+        self._refreshed_count = 0
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
         
     def update(self, receiver_state, perturb_value, error, message):
         """Main update method with improved statistics"""
-        # Process new data - now storing both X and Y components
+        self.ingest(receiver_state, perturb_value, error, message)
+
+        # Control update rate to prevent excessive redraws
+        current_time = time.time()
+        if current_time - self.last_update_time > 0.1:  # Max 10 FPS
+            self.refresh()
+            plt.pause(0.001)
+            self.last_update_time = current_time
+
+    def ingest(self, receiver_state, perturb_value, error, message):
+        """Record one decoded sample without redrawing, O(1)"""
+        sample_index = self.rx_values.count
         self.rx_values.append(receiver_state[0])
-        # self.ry_values.append(receiver_state[1])
         self.error_values.append(error)
         
-        # Track perturbations with proper positioning
+        # Track perturbations by absolute sample index
         if message is not None:
-            self.perturb_times.append(len(self.rx_values) - 1)
-            self.perturb_values.append(perturb_value)
             self.messages.append(message)
             self.total_chars += 1
+            if message != ' ':
+                self.perturb_times.append(sample_index)
+                self.perturb_values.append(perturb_value)
+                self.perturb_chars.append(message)
         
         # Calculate statistics
         self.update_statistics(error)
         
-        # Update all plots
-        # self.update_phase_plot()  # New phase plot update
+    def refresh(self):
+        """Redraw all panels from the buffered data"""
+        if self.rx_values.count == self._refreshed_count and not self._needs_full_draw:
+            return  # Nothing new since the last frame
+        self._refreshed_count = self.rx_values.count
         self.update_perturbation_plot()
         self.update_error_plot()
         self.update_message_display()
         self.update_stats_display()
+        self._blit()
         
-        # Control update rate to prevent excessive redraws
-        current_time = time.time()
-        if current_time - self.last_update_time > 0.1:  # Max 10 FPS
-            plt.pause(0.001)
-            self.last_update_time = current_time
+    def _on_draw(self, event):
+        """Full redraw happened: grab the new background, repaint artists"""
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._needs_full_draw = False
+        self._draw_animated()
     
-    def update_phase_plot(self):
-        """Update phase space visualization (X vs Y components)"""
-        if len(self.rx_values) > 1 and len(self.ry_values) > 1:
-            # Get last trail_size points for phase trail
-            x_trail = list(self.rx_values)[-self.trail_size:]
-            y_trail = list(self.ry_values)[-self.trail_size:]
-            
-            # Update trail line
-            self.phase_line.set_data(x_trail, y_trail)
-            
-            # Update scatter plot for all points
-            x_data = list(self.rx_values)
-            y_data = list(self.ry_values)
-            self.phase_scatter.set_offsets(np.column_stack((x_data, y_data)))
+    def _draw_animated(self):
+        for artist in (self.perturb_scatter, self.error_line,
+                       self.stats_text, self.msg_text, *self.perturb_annotations):
+            if artist.get_visible():
+                self.fig.draw_artist(artist)
             
-            # Update current point marker
-            self.current_point.set_offsets(np.array([[x_trail[-1], y_trail[-1]]]))
-            
-            # Dynamically adjust limits
-            x_min, x_max = min(x_data), max(x_data)
-            y_min, y_max = min(y_data), max(y_data)
-            
-            # Set equal aspect ratio for true phase space visualization
-            x_range = x_max - x_min
-            y_range = y_max - y_min
-            max_range = max(x_range, y_range)
-            
-            x_center = (x_min + x_max) / 2
-            y_center = (y_min + y_max) / 2
-            
-            self.ax_phase.set_xlim(x_center - max_range/1.8, x_center + max_range/1.8)
-            self.ax_phase.set_ylim(y_center - max_range/1.8, y_center + max_range/1.8)
+    def _blit(self):
+        """Repaint only the animated artists over the cached background"""
+        canvas = self.fig.canvas
+        if (self._needs_full_draw or self._background is None
+                or not getattr(canvas, 'supports_blit', False)):
+            # Axis limits changed (or no blit support): full draw, which
+            # re-captures the background through _on_draw
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self._background)
+        self._draw_animated()
+        canvas.blit(self.fig.bbox)
             
-            # Update title with component ranges
-            self.ax_phase.set_title(f"Phase Space (X: {x_min:.6f} to {x_max:.6f}, Y: {y_min:.6f} to {y_max:.6f})")
+    def _set_limits(self, ax, axis, low, high):
+        """Change axis limits, flagging a full redraw only if they moved"""
+        get, set_ = (ax.get_xlim, ax.set_xlim) if axis == 'x' else (ax.get_ylim, ax.set_ylim)
+        if get() != (low, high):
+            set_(low, high)
+            self._needs_full_draw = True
     
     def update_statistics(self, error):
         """Calculate enhanced system statistics"""
@@ -151,8 +248,6 @@ class RealTimeChaosPlotter:
         log_error = np.log10(max(error, 1e-10))
         self.sync_quality = (1-alpha) * self.sync_quality + alpha * (-log_error)
         self.sync_stability.append(error)
-        if len(self.sync_stability) > 100:
-            self.sync_stability.pop(0)
             
         # Message rate (chars per second)
         elapsed = max(1, time.time() - self.decode_start_time)
@@ -160,98 +255,79 @@ class RealTimeChaosPlotter:
         
     def update_perturbation_plot(self):
         """Show only the last 30 non-space characters in perturbation plot"""
-        # Clear previous annotations
-        for ann in self.perturb_annotations:
-            ann.remove()
-        self.perturb_annotations = []
-        
-        if not self.perturb_times:
+        if not len(self.perturb_times):
             return
             
-        # Filter out spaces and get only last 30 characters
-        non_space_indices = [i for i, msg in enumerate(self.messages) if msg != ' ']
-        last_30_indices = non_space_indices[-30:] if len(non_space_indices) > 0 else []
-        
-        if not last_30_indices:
-            return
-        
-        # Get plot data for these indices
-        plot_times = [self.perturb_times[i] for i in last_30_indices]
-        plot_values = [self.perturb_values[i] for i in last_30_indices]
-        plot_msgs = [self.messages[i] for i in last_30_indices]
+        plot_times = self.perturb_times.ordered()
+        plot_values = self.perturb_values.ordered()
+        plot_msgs = self.perturb_chars.ordered()
         
         # Update scatter plot with filtered data
         self.perturb_scatter.set_offsets(np.column_stack((plot_times, plot_values)))
         
-        # Focus x-axis on where perturbations actually exist
-        if plot_times:
-            first_perturb = min(plot_times)
-            last_perturb = max(plot_times)
+        # Focus x-axis on where perturbations exist; leave headroom on the
+        # right so new characters usually land inside the current limits
+        first_perturb, last_perturb = plot_times[0], plot_times[-1]
+        x_low, x_high = self.ax_perturb.get_xlim()
+        if first_perturb < x_low or last_perturb > x_high or \
+                (last_perturb - first_perturb) < 0.25 * (x_high - x_low):
             padding = max(10, (last_perturb - first_perturb) * 0.05)
-            self.ax_perturb.set_xlim(first_perturb - padding, last_perturb + padding)
+            self._set_limits(self.ax_perturb, 'x', first_perturb - padding,
+                             last_perturb + padding + max(50, last_perturb - first_perturb))
         
-        # Add character annotations for all points
-        for i in range(len(plot_times)):
-            x, y = plot_times[i], plot_values[i]
-            msg = plot_msgs[i]
-            
-            # Create styled annotation box
-            ann = self.ax_perturb.annotate(
-                msg, xy=(x, y), xytext=(0, 10), textcoords='offset points',
-                ha='center', va='bottom', fontsize=8,
-                bbox=dict(boxstyle='round,pad=0.3', fc='yellow', alpha=0.7),
-                arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0')
-            )
-            self.perturb_annotations.append(ann)
+        # Reuse the annotation pool: move and relabel, hide the spares
+        for i, ann in enumerate(self.perturb_annotations):
+            if i < len(plot_times):
+                ann.xy = (plot_times[i], plot_values[i])
+                ann.set_text(plot_msgs[i])
+                ann.set_visible(True)
+            else:
+                ann.set_visible(False)
         
         # Scale y-axis for perturbations
-        if plot_values:
-            y_min, y_max = min(plot_values), max(plot_values)
+        y_min, y_max = plot_values.min(), plot_values.max()
+        y_low, y_high = self.ax_perturb.get_ylim()
+        if y_min < y_low or y_max > y_high:
             padding = max(0.0001, (y_max - y_min) * 0.2)
-            self.ax_perturb.set_ylim(y_min - padding, y_max + padding)
+            self._set_limits(self.ax_perturb, 'y', y_min - padding, y_max + padding)
     
     def update_error_plot(self):
         """Update error visualization with improved formatting"""
-        x = np.arange(len(self.error_values))
-        self.error_line.set_data(x, self.error_values)
+        errors = self.error_values.ordered()
+        self.error_line.set_data(np.arange(len(errors)), errors)
         
-        self.ax_error.set_xlim(max(0, len(self.error_values) - self.window_size), 
-                              max(self.window_size, len(self.error_values)))
-                              
-        if self.error_values:
-            # Set appropriate log scale limits
-            self.ax_error.set_ylim(
-                max(1e-10, min(self.error_values) * 0.1),
-                max(1e-2, max(self.error_values) * 2)
-            )
+        if len(errors):
+            # Log scale limits only move when the data leaves them or
+            # the range collapses by more than two decades
+            low = max(1e-10, errors.min() * 0.1)
+            high = max(1e-2, errors.max() * 2)
+            y_low, y_high = self.ax_error.get_ylim()
+            if low < y_low or high > y_high or low > y_low * 100:
+                self._set_limits(self.ax_error, 'y', low, high)
     
     def update_stats_display(self):
         """Enhanced statistics panel"""
-        # Calculate stability metrics
-        stability = np.std(self.sync_stability) if self.sync_stability else 0
-        recent_errors = list(self.error_values)[-100:] if self.error_values else [0]
-        
         stats = [
             f"Sync Quality:   {max(0, min(10, self.sync_quality)):.2f}/10",
-            f"Error (mean):   {np.mean(recent_errors):.2e}",
-            f"Error (min):    {min(recent_errors):.2e}",
-            f"Stability:      {stability:.2e}",
+            f"Error (mean):   {self.sync_stability.mean:.2e}",
+            f"Error (min):    {self.sync_stability.min():.2e}",
+            f"Stability:      {self.sync_stability.std:.2e}",
             f"Message Rate:   {self.message_rate:.2f} char/sec",
             f"Total Decoded:  {self.total_chars} chars",
             f"Runtime:        {time.time() - self.decode_start_time:.1f} sec",
             f"Window Size:    {self.window_size} steps",
-            f"Data Points:    {len(self.rx_values)}"
+            f"Data Points:    {self.rx_values.count}",
+            f"Dropped:        {self.dropped_samples} samples"
         ]
         
         self.stats_text.set_text("\n".join(stats))
     
     def update_message_display(self):
         """Display spaces properly in the decoded message box"""
-        recent_messages = self.messages[-100:]
-        decoded_text = "".join(recent_messages)
+        decoded_text = "".join(self.messages.ordered())
             
         # Add message stats
-        header = f"LATEST DECODED TEXT ({len(self.messages)} chars):\n"
+        header = f"LATEST DECODED TEXT ({self.total_chars} chars):\n"
         formatted = header + decoded_text
             
         self.msg_text.set_text(formatted)
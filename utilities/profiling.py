@@ -0,0 +1,134 @@
+# profiling.py
+import cProfile
+import io
+import pstats
+import signal
+import sys
+import time
+from utilities.metrics import Metrics
+
+_now = time.perf_counter_ns
+
+
+class StageProfiler:
+    """Opt-in wall-clock breakdown of a hot loop by stage
+
+    The loop calls begin() once per iteration and lap(stage) after each
+    stage; the time since the previous mark goes into a stage_<name>_ns
+    histogram of metrics (so MetricsReporter snapshots carry it too).
+    Disabled, each call is an attribute test and a return.
+
+    capture(n) additionally runs cProfile over the next n packets, counted
+    by tick(); install_signals() wires both to SIGUSR1/SIGUSR2 so a
+    running process can be inspected without a restart.
+    """
+
+    def __init__(self, metrics=None, enabled=False):
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.enabled = enabled
+        self._stages = {}  # name -> LogLinearHistogram
+        self._last = _now()
+        self._armed = False  # A capture is pending or running
+        self._capture_packets = 0
+        self._capture_path = None
+        self._profile = None
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        self._last = _now()
+
+    def begin(self):
+        if self.enabled:
+            self._last = _now()
+
+    def lap(self, stage):
+        if not self.enabled:
+            return
+        now = _now()
+        hist = self._stages.get(stage)
+        if hist is None:
+            hist = self._stages[stage] = self.metrics.histogram(f"stage_{stage}_ns")
+        hist.record(now - self._last)
+        self._last = now
+
+    def tick(self, n=1):
+        """Count n packets towards a cProfile capture"""
+        if not self._armed:
+            return
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return
+        self._capture_packets -= n
+        if self._capture_packets <= 0:
+            self._finish_capture()
+
+    def capture(self, packets=1000, path=None):
+        """cProfile the next packets packets; stats go to path or stderr"""
+        self._capture_packets = packets
+        self._capture_path = path
+        self._armed = True
+
+    def _finish_capture(self):
+        profile, self._profile = self._profile, None
+        self._armed = False
+        profile.disable()
+        if self._capture_path is not None:
+            profile.dump_stats(self._capture_path)
+            print(f"[PROFILE] cProfile stats written to {self._capture_path}", file=sys.stderr)
+            return
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(25)
+        print(out.getvalue(), file=sys.stderr, flush=True)
+
+    def breakdown(self):
+        """Per-stage totals, largest first, with each stage's share of the time"""
+        grand = sum(h.total for h in self._stages.values()) or 1
+        rows = {}
+        for name, h in sorted(self._stages.items(), key=lambda item: -item[1].total):
+            if not h.count:
+                continue
+            rows[name] = {
+                'count': h.count,
+                'total_ms': h.total / 1e6,
+                'mean_us': h.total / h.count / 1e3,
+                'p99_us': h.quantile(0.99) / 1e3,
+                'share': h.total / grand,
+            }
+        return rows
+
+    def format_breakdown(self):
+        rows = self.breakdown()
+        if not rows:
+            return "[PROFILE] no stage timings (timers off or idle)"
+        lines = [f"{'stage':<12} {'count':>9} {'total ms':>10} {'mean us':>9} "
+                 f"{'p99 us':>9} {'share':>6}"]
+        for name, r in rows.items():
+            lines.append(f"{name:<12} {r['count']:>9} {r['total_ms']:>10.1f} "
+                         f"{r['mean_us']:>9.2f} {r['p99_us']:>9.2f} {r['share']:>6.1%}")
+        return "\n".join(lines)
+
+    def dump(self, file=None):
+        print(self.format_breakdown(), file=file or sys.stderr, flush=True)
+
+    def install_signals(self, packets=1000, path=None):
+        """SIGUSR1: turn the timers on, or dump the breakdown if already on.
+        SIGUSR2: cProfile the next packets packets. POSIX only; a no-op elsewhere.
+        """
+        if not hasattr(signal, 'SIGUSR1'):
+            return False
+
+        def on_dump(signum, frame):
+            if self.enabled:
+                self.dump()
+            else:
+                self.enable()
+                print("[PROFILE] stage timers on; signal again to dump", file=sys.stderr)
+
+        def on_capture(signum, frame):
+            self.capture(packets, path)
+            print(f"[PROFILE] profiling the next {packets} packets", file=sys.stderr)
+
+        signal.signal(signal.SIGUSR1, on_dump)
+        signal.signal(signal.SIGUSR2, on_capture)
+        return True
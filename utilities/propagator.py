@@ -0,0 +1,112 @@
+# propagator.py
+import numpy as np
+
+TIME_SCALE = 6349.2  # Paper's circuit time scaling t=6349.2τ
+
+
+def _expm(M):
+    """Matrix exponential by scaling and squaring of a Taylor series"""
+    norm = np.linalg.norm(M, ord=1)
+    squarings = max(0, int(np.ceil(np.log2(norm / 0.5)))) if norm > 0.5 else 0
+    A = M / (2 ** squarings)
+    result = np.eye(M.shape[0])
+    term = np.eye(M.shape[0])
+    for k in range(1, 20):
+        term = term @ A / k
+        result = result + term
+        if np.linalg.norm(term, ord=1) < 1e-18:
+            break
+    for _ in range(squarings):
+        result = result @ result
+    return result
+
+
+class PiecewiseAffinePropagator:
+    """Piecewise-exact stepping of the Eq. (14)-(17) dynamics.
+
+    nonlinear_func splits the x axis at ±I0 into three regions, and inside
+    each one the system is the affine ODE s' = A s + u. One step of length h
+    is therefore s(h) = Φ s + γ with Φ = exp(A h), computed once per region
+    and step size from the augmented matrix [[A, u, L], [0, 0, 0]].
+
+    The receiver variant folds the Lyapunov gains into the closed loop,
+    s' = (A - L e₁ᵀ) s + u + L v, with the drive v = x + error_signal held
+    over the step. Steps longer than max_step (in scaled time) are split
+    into equal sub-steps so a region cannot be entered and left unseen,
+    and a sub-step whose end point lands in another region is halved (with
+    its own cached propagators) until the crossing is resolved or
+    max_depth is reached. Steps are thus exact within a region and
+    piecewise-exact to within 2^-max_depth of a step (2^-24 dt by default)
+    across a breakpoint.
+
+    Propagators are cached per system parameter set, so changing alpha,
+    beta, gamma, a, b, I0 or L between steps takes effect at once.
+    """
+
+    def __init__(self, system, max_step=0.01, max_depth=24):
+        self.system = system
+        self.max_step = max_step
+        self.max_depth = max_depth
+        self._cache = {}
+
+    def region(self, x):
+        I0 = self.system.I0
+        return 1 if x > I0 else (-1 if x < -I0 else 0)
+
+    def _params(self):
+        s = self.system
+        return (s.alpha, s.beta, s.gamma, s.a, s.b, s.I0, np.asarray(s.L).tobytes())
+
+    def _matrices(self, region, h, receiver, params):
+        key = (params, region, h, receiver)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        s = self.system
+        slope = s.a if region == 0 else s.b
+        offset = region * (s.a - s.b) * s.I0
+        A = np.array([
+            [-s.alpha*(1 + slope), -s.alpha, 0.0],
+            [-s.beta, -s.beta, -s.gamma],
+            [0.0, 1.0, 0.0],
+        ])
+        L = np.asarray(s.L, dtype=np.float64)
+        if receiver:
+            A[:, 0] -= L
+
+        M = np.zeros((5, 5))
+        M[:3, :3] = A
+        M[0, 3] = -s.alpha*offset
+        M[:3, 4] = L
+        E = _expm(M * h)
+        cached = (E[:3, :3].copy(), E[:3, 3].copy(), E[:3, 4].copy())
+        self._cache[key] = cached
+        return cached
+
+    def step(self, state, dt=0.001, drive=None):
+        """Return the state one step of dt (unscaled) after state"""
+        receiver = drive is not None
+        drive = drive if receiver else 0.0
+        h = dt / TIME_SCALE
+        n_sub = max(1, int(np.ceil(h / self.max_step)))
+        state = np.asarray(state, dtype=np.float64)
+        params = self._params()
+        for _ in range(n_sub):
+            state = self._advance(state, h / n_sub, drive, receiver, params, 0)
+        return state
+
+    def _advance(self, state, h, drive, receiver, params, depth):
+        region = self.region(state[0])
+        phi, gamma_u, gamma_v = self._matrices(region, h, receiver, params)
+        nxt = phi @ state + gamma_u
+        if receiver:
+            nxt += gamma_v * drive
+        if self.region(nxt[0]) == region or depth >= self.max_depth:
+            return nxt
+        half = h / 2
+        mid = self._advance(state, half, drive, receiver, params, depth + 1)
+        return self._advance(mid, half, drive, receiver, params, depth + 1)
+
+    def clear_cache(self):
+        self._cache.clear()
@@ -1,89 +1,406 @@
 # receiver.py
+import codecs
+import heapq
 import numpy as np
 import time
 from utilities.communication import Communicator
-from utilities.plotter import RealTimeChaosPlotter
 from utilities.lorenz import ChaoticSystem
+from utilities.perturbation import PerturbationDecoder, PerturbationEncoder
+from utilities.metrics import Metrics, MetricsReporter
+from utilities.profiling import StageProfiler
+from utilities.stream import StreamDecoder
+from utilities.sync import SyncTracker
+from utilities.wire import FLAG_PREAMBLE, FLAG_SYNC_ACK, FLAG_SYNC_LOST, Frame
 
-class Receiver:
-    def __init__(self, port=12346):
-        self.comm = Communicator(port=port, is_sender=False)
+class ReceiverCore:
+    """Synchronization and decoding state, independent of the transport
+
+    Frames are fed in with handle_frame() (or bare (K, 3) state blocks with
+    process_block()); the blocking Receiver and the asyncio receiver both
+    drive this.
+    """
+    def __init__(self, plot=True, metrics=None, symbol_mapper=None, checkpoints=None):
         self.system = ChaoticSystem(system_type='receiver')
         self.decoded_buffer = []
-        self.plotter = RealTimeChaosPlotter()
+        self.renderer = None
+        if plot:
+            # Only plotting receivers pay for the renderer process
+            from utilities.renderer import PlotRenderer
+            self.renderer = PlotRenderer()
         self.dt = 0.001
         self.sync_threshold = 1e-4
+        self.samples_received = 0
+        self.synchronized = False
+        self.sync_tracker = SyncTracker(window=100)
+        # Frames carry the step index of their first sample; out-of-order
+        # frames wait in a small window, gaps are free-run over
+        self.reorder_window = 8  # Frames held before skipping a gap
+        # Longer gaps drop lock instead. A single link coasts on one
+        # integrate() call (a few ms for 10000 steps); SessionServer is stricter
+        self.max_free_run = 10000
+        # Optional perturbation.SymbolMapper, must match the sender's
+        self.symbol_mapper = symbol_mapper
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        # Optional checkpoints.CheckpointStore: start and reset on the
+        # sender's trajectory at the frame's step instead of step 0 (lock
+        # itself is kept by the feedback, not by re-seeking)
+        self.checkpoints = checkpoints
+        # Optional stream.StreamDecoder: demapped bytes go to it (e.g. a
+        # file) instead of being accumulated in decoded_buffer
+        self.sink = None
+        self._init_metrics(metrics or Metrics())
 
-    def _adaptive_sync(self):
-        """Paper's continuous synchronization from Section 3"""
-        print("[RECEIVER] Starting adaptive synchronization...")
-        error_buffer = []
-        
-        while True:
-            received_state, _ = self.comm.receive()
-            if received_state is None:
+    def _init_metrics(self, metrics):
+        """Bind the hot-path counters and histograms once"""
+        self.metrics = metrics
+        self._packets = metrics.counter('packets_received')
+        self._packets_reordered = metrics.counter('packets_reordered')
+        self._packets_stale = metrics.counter('packets_stale')
+        self._samples_lost = metrics.counter('samples_lost')
+        self._gaps = metrics.counter('loss_gaps')
+        self._samples = metrics.counter('samples_received')
+        self._decoded = metrics.counter('samples_decoded')
+        self._resets = metrics.counter('sync_resets')
+        self._latency = metrics.histogram('latency_ns')
+        self._record_latency = self._latency.record
+        self._jitter = metrics.gauge('jitter_ns')
+        self._sync_error = metrics.histogram('sync_error')
+        self._sync_time = metrics.histogram('sync_convergence_s')
+        self._sync_steps = metrics.histogram('sync_convergence_steps')
+        # Opt-in per-stage timings, stage_<name>_ns in the same registry
+        self.profiler = StageProfiler(metrics)
+        self._next_step = None  # Unwrapped step index of the next sample
+        self._held = []  # Heap of (first step, arrival, states, preamble)
+        self._arrivals = 0
+        self._last_latency = None
+        self._sync_started = None
+
+    def observe_frame(self, frame):
+        """Account one received datagram: latency and jitter"""
+        self._packets.value += 1
+        self._samples.value += len(frame.states)
+        latency = time.time_ns() - frame.timestamp
+        self._record_latency(latency)
+        # RFC 3550 interarrival jitter estimate, J += (|D| - J) / 16
+        last = self._last_latency
+        if last is not None:
+            jitter = self._jitter
+            jitter.value += (abs(latency - last) - jitter.value) / 16
+        self._last_latency = latency
+
+    def handle_frame(self, frame):
+        """Observe and process one decoded wire.Frame"""
+        self.observe_frame(frame)
+        self.profiler.lap('observe')
+        text = self._sequence(frame) if len(frame.states) else ''
+        # Ack every preamble datagram once locked, so a lost ack only
+        # costs one more datagram
+        if frame.flags & FLAG_PREAMBLE and self.synchronized:
+            self.send_control(FLAG_SYNC_ACK)
+        return text
+
+    def send_control(self, flags):
+        """Back-channel to the sender; transports that can reply override"""
+
+    def feed_states(self, states, first_step):
+        """Sequence a (K, 3) block that did not arrive as a datagram (e.g.
+        read back from a file); first_step is the sender's step index of
+        its first row. Returns newly decoded text.
+        """
+        return self._sequence(Frame(first_step, 0, 0, states, None))
+
+    def _sequence(self, frame):
+        """Feed a frame's samples to process_block in step order
+
+        frame.seq (32 bits, wrapping) is the sender's step index of the
+        first sample. Frames behind the next expected step are stale
+        (overlaps are trimmed); frames ahead of it are held until the gap
+        fills or the reorder window overflows.
+        """
+        states = frame.states
+        preamble = bool(frame.flags & FLAG_PREAMBLE)
+        if self._next_step is None:
+            self._next_step = frame.seq
+            if self.checkpoints is not None:
+                self.checkpoints.seek(self.system, frame.seq, dt=self.dt)
+        offset = (frame.seq - self._next_step) & 0xFFFFFFFF
+        if offset >= 0x80000000:
+            behind = 0x100000000 - offset
+            if behind >= len(states):
+                self._packets_stale.value += 1  # Late or duplicate
+                return ''
+            states, offset = states[behind:], 0
+        if offset:
+            self._arrivals += 1
+            heapq.heappush(self._held,
+                           (self._next_step + offset, self._arrivals, states, preamble))
+            return self._release() if len(self._held) > self.reorder_window else ''
+        text = self._run(states, preamble)
+        return text + self._release() if self._held else text
+
+    def _release(self, flush=False):
+        """Process held frames that are now in order
+
+        While the window is over full (or on flush) the gap before the
+        oldest held frame is given up on and free-run over.
+        """
+        text = ''
+        held = self._held
+        while held:
+            start, _, states, preamble = held[0]
+            if start + len(states) <= self._next_step:
+                heapq.heappop(held)
+                self._packets_stale.value += 1
                 continue
-            
-            error = received_state - self.system.state
-            error_buffer.append(np.linalg.norm(error))
-            
-            # Apply Lyapunov control
-            self.system.continuous_step(
-                error_signal=error[0],  # x-component feedback
-                dt=self.dt
-            )
-            
+            if start > self._next_step:
+                if not (flush or len(held) > self.reorder_window):
+                    break
+                self._free_run(start - self._next_step)
+            heapq.heappop(held)
+            self._packets_reordered.value += 1
+            text += self._run(states[self._next_step - start:], preamble)
+        return text
+
+    def flush_reorder(self):
+        """Give up on every gap and decode all held frames (e.g. when idle)"""
+        return self._release(flush=True) if self._held else ''
+
+    def _run(self, states, preamble=False):
+        self._next_step += len(states)
+        if preamble and self.synchronized:
+            # Preamble still in flight after lock: keep tracking, no text
+            self._step_block(states)
+            return ''
+        return self.process_block(states)
+
+    def _free_run(self, gap):
+        """Advance over gap lost steps without feedback, keeping step alignment"""
+        self._samples_lost.value += gap
+        self._gaps.value += 1
+        self._next_step += gap
+        if gap > self.max_free_run:
+            # Too long to coast on: resynchronize from the next preamble
+            self.synchronized = False
+            self.sync_tracker.reset()
+            self._sync_started = None
+            return
+        if self.sink is not None and self.synchronized:
+            # Keep the output aligned: lost steps become NUL bytes
+            self.sink.feed(bytes(gap * self.symbol_mapper.bits_per_step // 8))
+        self.system.integrate(gap, dt=self.dt)
+
+    def _levels(self):
+        """(spacing, top) of the x symbols, for decision-directed feedback"""
+        if self.symbol_mapper is not None:
+            return self.symbol_mapper.step, self.symbol_mapper.mark
+        return PerturbationEncoder.SCALE_FACTOR, 95  # Characters 32-127
+
+    def _step_block(self, states, levels=None):
+        """Drive the receiver through a (K, 3) block of received samples
+
+        Returns the recovered x errors s_r = v - w (taken before each
+        step, as the feedback is) and the receiver trajectory after each
+        step. With levels the decided symbols are kept out of the feedback
+        (see ChaoticSystem.integrate).
+        """
+        n = len(states)
+        recovered = np.empty(n)
+        trajectory = self.system.integrate(
+            n, drive=states[:, 0], errors_out=recovered, dt=self.dt, levels=levels)
+        self.samples_received += n
+        return recovered, trajectory
+
+    def sync_block(self, received_states):
+        """Paper's continuous synchronization from Section 3
+
+        Returns True once the moving error average drops below threshold.
+        """
+        if self._sync_started is None:
+            self._sync_started = (time.perf_counter(), self.samples_received)
+
+        # Full error vectors, measured before each step
+        before = np.vstack((self.system.state, 
+                            np.empty((len(received_states) - 1, 3))))
+        _, trajectory = self._step_block(received_states)
+        self.profiler.lap('integrate')
+        before[1:] = trajectory[:-1]
+        norms = np.linalg.norm(received_states - before, axis=1)
+        tracker = self.sync_tracker
+        tracker.extend(norms)
+        for norm in norms.tolist():
+            self._sync_error.record(norm)
+        self.profiler.lap('sync_error')
         
-            # Dynamic stability check
-            if len(error_buffer) > 100:
-                ma_error = np.mean(error_buffer[-100:])
-                if ma_error < self.sync_threshold:
-                    print(f"Synchronized (MAE: {ma_error:.2e})")
-                    return True
-                elif ma_error > 1e-2:  # Paper's resync condition
-                    print("Resetting synchronization...")
+        # Dynamic stability check
+        if tracker.ready:
+            ma_error = tracker.mean
+            if ma_error < self.sync_threshold:
+                print(f"Synchronized (MAE: {ma_error:.2e})")
+                started, steps = self._sync_started
+                self._sync_time.record(time.perf_counter() - started)
+                self._sync_steps.record(self.samples_received - steps)
+                return True
+            elif ma_error > 1e-2:  # Paper's resync condition
+                print("Resetting synchronization...")
+                self._resets.inc()
+                if self.checkpoints is not None and self._next_step is not None:
+                    self.checkpoints.seek(self.system, self._next_step, dt=self.dt)
+                else:
                     self.system.state = np.array([0.1, 0.11, 0.12])
-                    error_buffer.clear()
+                tracker.reset()
+                self.send_control(FLAG_SYNC_LOST)
+        return False
+
+    def decode_block(self, masked_states):
+        """Paper's message recovery s_r = v - w, returns decoded text"""
+        if self.symbol_mapper is not None:
+            return self._decode_symbols(masked_states)
+        recovered, trajectory = self._step_block(masked_states, self._levels())
+        self.profiler.lap('integrate')
+        decoded = PerturbationDecoder.decode_array(recovered).decode('latin-1')
+        self.decoded_buffer.extend(decoded)
+        self._decoded.inc(len(decoded))
+        self.profiler.lap('demap')
+
+        # Hand the block to the background renderer; never blocks
+        if self.renderer is not None:
+            errors = np.linalg.norm(masked_states - trajectory, axis=1)
+            self.renderer.push(trajectory, recovered, errors, decoded)
+            self.profiler.lap('render')
+        return decoded
+
+    def recover_components(self, masked_states, levels=None):
+        """Step through a block, returning s_r = v - w for x, y and z
+
+        Like the x feedback error, each component is taken against the
+        receiver state before the step. Returns (recovered, trajectory).
+        """
+        before = np.empty(masked_states.shape, dtype=np.float64)
+        before[0] = self.system.state
+        recovered_x, trajectory = self._step_block(masked_states, levels)
+        before[1:] = trajectory[:-1]
+        recovered = masked_states - before
+        recovered[:, 0] = recovered_x
+        return recovered, trajectory
+
+    def _decode_symbols(self, masked_states):
+        """s_r = v - w on every component, demapped by symbol_mapper"""
+        recovered, trajectory = self.recover_components(masked_states, self._levels())
+        recovered_x = recovered[:, 0]
+        self.profiler.lap('integrate')
+
+        # Idle symbols (padding, unmodulated steps) demap to nothing
+        data = self.symbol_mapper.demap(recovered)
+        self._decoded.inc(len(data))
+        self.profiler.lap('demap')
+        if self.sink is not None:
+            self.sink.feed(data)
+            decoded = ''
+        else:
+            decoded = self._text_decoder.decode(data)
+            self.decoded_buffer.extend(decoded)
+        self.profiler.lap('output')
+
+        if self.renderer is not None:
+            errors = np.linalg.norm(masked_states - trajectory, axis=1)
+            self.renderer.push(trajectory, recovered_x, errors, decoded)
+            self.profiler.lap('render')
+        return decoded
+
+    def close(self):
+        if self.renderer is not None:
+            self.renderer.close()
+            self.renderer = None
+
+    def process_block(self, states):
+        """Sync until locked, then decode; returns newly decoded text"""
+        if not self.synchronized:
+            self.synchronized = self.sync_block(states)
+            return ''
+        return self.decode_block(states)
+
+
+class Receiver(ReceiverCore):
+    def __init__(self, port=12346, plot=True, metrics_interval=None, metrics_path=None,
+                 checkpoints=None, symbol_mapper=None, output=None, transport=None):
+        if output is not None and symbol_mapper is None:
+            raise ValueError("output needs the sender's SymbolMapper (file streams "
+                             "are not representable in the per-character scheme)")
+        super().__init__(plot=plot, symbol_mapper=symbol_mapper, checkpoints=checkpoints)
+        # UDP on port unless given another transport.Transport
+        self.comm = Communicator(port=port, is_sender=False, transport=transport)
+        self.comm.profiler = self.profiler
+        # Decode a StreamEncoder file transfer to this path, then stop
+        if output is not None:
+            self.sink = StreamDecoder(output)
+        # Headless periodic snapshots (stdout, or a .json/text file)
+        self.reporter = None
+        if metrics_interval:
+            self.reporter = MetricsReporter(self.metrics, metrics_interval, metrics_path)
+
+    def send_control(self, flags):
+        if self.comm.peer is not None:
+            self.comm.send_control(flags, self.comm.peer)
+
+    def poll(self, timeout=None):
+        """Handle every frame pending (waiting up to timeout for the first)
+
+        Returns the number of samples received.
+        """
+        profiler = self.profiler
+        profiler.begin()
+        frames = self.comm.receive_frames(timeout)
+        if not frames:
+            self.flush_reorder()
+            return 0
+        samples = 0
+        for frame in frames:
+            self.handle_frame(frame)
+            profiler.tick()
+            samples += len(frame.states)
+        return samples
+
+    def _adaptive_sync(self):
+        """Block on the socket until synchronized"""
+        print("[RECEIVER] Starting adaptive synchronization...")
+        while not self.synchronized:
+            self.poll()
+        return True
 
 
     def _decode_messages(self):
-        """Paper's message recovery s_r = v - w"""
+        """Block on the socket decoding messages until interrupted"""
         print("[RECEIVER] Starting message decoding...")
+        start = time.perf_counter()
+        decoded_samples = 0
         try:
             while True:
-                masked_state, true_state = self.comm.receive()
-                if masked_state is not None:
-                    s_r = masked_state[0] - self.system.state[0]
-                    decoded_char = self._scale_to_char(s_r)
-                    self.decoded_buffer.append(decoded_char)
-                    
-                    error = masked_state - self.system.state
-
-                    self.system.continuous_step(
-                        error_signal=error[0],
-                        dt=self.dt
-                    )
-
-                    self.plotter.update(
-                        receiver_state=self.system.state.copy(),
-                        perturb_value=s_r,
-                        error=np.linalg.norm(masked_state - self.system.state),
-                        message=decoded_char
-                    )
-
+                decoded_samples += self.poll()
+                if self.sink is not None and self.sink.done:
+                    print(f"[RECEIVER] {self.sink.written} bytes written")
+                    break
 
         except KeyboardInterrupt:
-            self.plotter.save_animation()
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            print(f"\n[RECEIVER] {decoded_samples} samples decoded "
+                  f"({decoded_samples / elapsed:.0f} samples/sec)")
             print(f"\nFINAL MESSAGE: {''.join(self.decoded_buffer)}")
         finally:
+            if self.profiler.enabled:
+                self.profiler.dump()
+            self.close()
             self.comm.close()
 
-
-    def _scale_to_char(self, value):
-        """Paper's I₀=3.9 scaling from Section 4"""
-        scaled = value / (0.25/95)  # 0.25V max / 95 ASCII chars
-        return chr(max(32, min(127, int(np.round(scaled + 32)))))
+    def close(self):
+        super().close()
+        if self.sink is not None:
+            self.sink.close()
+        if self.reporter is not None:
+            self.reporter.stop()
+            self.reporter = None
 
     def run(self):
+        if self.reporter is not None:
+            self.reporter.start()
         if self._adaptive_sync():
             self._decode_messages()
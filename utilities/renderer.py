@@ -0,0 +1,74 @@
+# renderer.py
+import multiprocessing as mp
+import numpy as np
+from utilities.ringbuffer import SampleRing
+
+# Record layout pushed by the decoder: receiver x, y, z, s_r, error, char
+RECORD_WIDTH = 6
+
+
+def _render_loop(ring_name, capacity, fps, max_per_frame, stop):
+    """Renderer process: drain the ring at its own frame rate and draw"""
+    import matplotlib.pyplot as plt
+    from utilities.plotter import RealTimeChaosPlotter
+
+    ring = SampleRing(capacity, RECORD_WIDTH, name=ring_name)
+    plotter = RealTimeChaosPlotter()
+    since = 0
+    try:
+        while not stop.is_set():
+            records, since, dropped = ring.read(since)
+            # Drop frames instead of falling further behind the decoder
+            if len(records) > max_per_frame:
+                dropped += len(records) - max_per_frame
+                records = records[-max_per_frame:]
+            plotter.dropped_samples += dropped
+
+            for x, y, z, s_r, error, code in records.tolist():
+                plotter.ingest((x, y, z), s_r, error, chr(int(code)))
+            if len(records):
+                plotter.refresh()
+            plt.pause(1.0 / fps)
+    finally:
+        ring.close()
+        plt.close('all')
+
+
+class PlotRenderer:
+    """Runs RealTimeChaosPlotter in a separate process
+
+    The decode loop only calls push(), which copies a block into a shared
+    memory SampleRing and returns; it never waits on matplotlib.
+    """
+
+    def __init__(self, fps=10, capacity=8192, max_per_frame=1000):
+        self.ring = SampleRing(capacity, RECORD_WIDTH)
+        self._stop = mp.Event()
+        self._block = np.empty((0, RECORD_WIDTH))
+        self.process = mp.Process(
+            target=_render_loop,
+            args=(self.ring.name, capacity, fps, max_per_frame, self._stop),
+            daemon=True)
+        self.process.start()
+
+    def push(self, trajectory, recovered, errors, decoded):
+        """Queue a decoded block: (K, 3) states, s_r, errors and text"""
+        n = len(recovered)
+        if self._block.shape[0] != n:
+            self._block = np.empty((n, RECORD_WIDTH))
+        block = self._block
+        block[:, :3] = trajectory
+        block[:, 3] = recovered
+        block[:, 4] = errors
+        codes = np.frombuffer(decoded.encode('latin-1', errors='replace'), dtype=np.uint8)
+        # Symbol-mapped blocks carry a different number of characters than
+        # samples; those are plotted without annotations
+        block[:, 5] = codes if len(codes) == n else 32
+        self.ring.push_block(block)
+
+    def close(self, timeout=2.0):
+        self._stop.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
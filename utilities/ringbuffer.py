@@ -0,0 +1,90 @@
+# ringbuffer.py
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class SampleRing:
+    """Single-producer/single-consumer ring of float64 records in shared memory
+
+    The producer never waits: it claims the slots (a seqlock-style
+    write-in-progress counter), writes them and then bumps a
+    monotonically increasing write counter, overwriting the oldest
+    records when the consumer falls behind. The consumer keeps its own
+    read counter, skips whatever was overwritten and reports it as
+    dropped, so a slow reader loses samples instead of stalling the
+    writer. After copying it checks the claim counter, so slots being
+    rewritten during the copy are dropped rather than returned torn. No
+    locks are taken on either side.
+    """
+    HEADER_SLOTS = 2  # int64 write counter, int64 claim counter
+
+    def __init__(self, capacity=4096, width=6, name=None):
+        self.capacity = capacity
+        self.width = width
+        size = 8 * (self.HEADER_SLOTS + capacity * width)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self._counter = np.ndarray((self.HEADER_SLOTS,), dtype=np.int64,
+                                   buffer=self.shm.buf)
+        self._data = np.ndarray((capacity, width), dtype=np.float64,
+                                buffer=self.shm.buf, offset=8 * self.HEADER_SLOTS)
+        if self.owner:
+            self._counter[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def write_index(self):
+        return int(self._counter[0])
+
+    def push_block(self, records):
+        """Append a (K, width) block of records (producer side)"""
+        records = np.asarray(records, dtype=np.float64).reshape(-1, self.width)
+        start = int(self._counter[0])
+        if len(records) > self.capacity:
+            # Only the newest capacity records survive; the consumer sees
+            # the rest as dropped
+            start += len(records) - self.capacity
+            records = records[-self.capacity:]
+        # Claim before touching the slots, so readers can tell which
+        # ones may be mid-write
+        self._counter[1] = start + len(records)
+        pos = start % self.capacity
+        first = min(len(records), self.capacity - pos)
+        self._data[pos:pos + first] = records[:first]
+        self._data[:len(records) - first] = records[first:]
+        # Publish only after the slots are written
+        self._counter[0] = start + len(records)
+
+    def read(self, since):
+        """Records written after counter value since (consumer side)
+
+        Returns (records, next_since, dropped).
+        """
+        end = int(self._counter[0])
+        start = max(since, end - self.capacity)
+        dropped = start - since
+        if end <= start:
+            return np.empty((0, self.width)), end, dropped
+
+        idx = np.arange(start, end) % self.capacity
+        records = self._data[idx]
+        # Slots the producer claimed while we were copying may be torn
+        lapped = min(int(self._counter[1]) - self.capacity - start, end - start)
+        if lapped > 0:
+            records = records[lapped:]
+            dropped += lapped
+        return records, end, dropped
+
+    def close(self):
+        self._counter = None
+        self._data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -1,44 +1,156 @@
 # sender.py
-import time
 import numpy as np
 from utilities.communication import Communicator
+from utilities.pacing import Pacer
+from utilities.profiling import StageProfiler
 from utilities.perturbation import PerturbationEncoder
 from utilities.lorenz import ChaoticSystem
+from utilities.stream import StreamEncoder
+from utilities.wire import FLAG_PREAMBLE, FLAG_SYNC_ACK, FLAG_SYNC_LOST, max_batch
 
 class SecureSender:
-    def __init__(self, dest_port=12346):
-        self.comm = Communicator(port=12345, is_sender=True)
+    def __init__(self, dest_port=12346, batch_size=1, comm=None, symbol_mapper=None,
+                 rate=1000, burst=None, handshake=True, host='localhost', session=0,
+                 transport=None, dest=None):
+        if comm is None:
+            comm = Communicator(port=12345, is_sender=True, transport=transport)
+        self.comm = comm
+        # Links sharing one server port are told apart by session id
+        self.comm.session = session
         self.system = ChaoticSystem(system_type='transmitter')
-        self.dest = f"localhost:{dest_port}"
+        self.host = host
+        # A transport's own address (socket path, queue name) overrides host:port
+        self.dest = dest if dest is not None else f"{host}:{dest_port}"
         self.sync_interval = 10  # Paper's 10:1 sync-to-message ratio
         self.dt = 0.001
+        # Samples per datagram: an int, or 'auto' to fill the MTU
+        self.batch_size = batch_size
+        self.samples_sent = 0
+        # Optional perturbation.SymbolMapper for multi-component symbols
+        self.symbol_mapper = symbol_mapper
+        # Target samples/sec (None = unthrottled), paced off the wall clock
+        self.pacer = Pacer(rate=rate, burst=burst)
+        # Stop the preamble when the receiver acks lock (wire.FLAG_SYNC_ACK)
+        self.handshake = handshake
+        self.preamble_steps = 1000  # Paper's upper bound
+        # Opt-in per-stage timings (integrate, map, pace, encode, send)
+        self.profiler = StageProfiler()
+        self.comm.profiler = self.profiler
+
+    def _block_size(self, n_samples):
+        limit = max_batch(with_true_state=True)
+        if self.batch_size == 'auto':
+            return min(limit, n_samples)
+        return max(1, min(limit, int(self.batch_size)))
+
+    def _send_states(self, states, true_states, first_step=None, flags=0):
+        """Send samples K per datagram at the pacer's rate
+
+        Each frame's seq is the step index of its first sample; by default
+        the states are taken to be the system's most recent steps. The
+        pacer carries over between calls (it is reset once per session,
+        by the preamble), so back-to-back messages or file chunks share
+        one rate. Returns the achieved samples/sec since then.
+        """
+        if first_step is None:
+            first_step = self.system.steps - len(states)
+        pacer = self.pacer
+        profiler = self.profiler
+        profiler.begin()
+        k = self._block_size(len(states))
+        for i in range(0, len(states), k):
+            pacer.wait(min(k, len(states) - i))
+            profiler.lap('pace')
+            if k == 1:
+                self.comm.send(state=states[i], true_state=true_states[i], dest=self.dest,
+                               flags=flags, seq=first_step + i)
+            else:
+                self.comm.send_block(states[i:i + k], true_states[i:i + k], dest=self.dest,
+                                     flags=flags, seq=first_step + i)
+            profiler.tick()
+        self.samples_sent += len(states)
+        return pacer.achieved_rate
 
     def _synchronization_preamble(self):
-        """Paper's 500-1000 step initialization"""
+        """Paper's 500-1000 step initialization
+
+        With the handshake the preamble is generated a datagram at a time
+        and ends as soon as the receiver acks lock; a FLAG_SYNC_LOST reply
+        (receiver reset) restarts the step budget. Returns the number of
+        preamble steps sent.
+        """
         print("[SENDER] Transmitting sync preamble...")
-        for _ in range(1000):
-            true_state = self.system.continuous_step(dt=self.dt)
-            self.comm.send(state=true_state, true_state=true_state, dest=self.dest)
-            time.sleep(self.dt)
+        self.pacer.reset()  # A new session starts the rate accounting
+        if not self.handshake:
+            preamble = self.system.integrate(self.preamble_steps, dt=self.dt)
+            self._send_states(preamble, preamble, flags=FLAG_PREAMBLE)
+            print(f"[SENDER] Preamble sent ({self.pacer.describe()})")
+            return self.preamble_steps
+
+        while self._poll_control() is not None:
+            pass  # Drop acks left over from an earlier preamble
+        pacer = self.pacer
+        k = self._block_size(self.preamble_steps)
+        budget, sent = self.preamble_steps, 0
+        while budget > 0 and sent < 10 * self.preamble_steps:
+            n = min(k, budget)
+            block = self.system.integrate(n, dt=self.dt)
+            pacer.wait(n)
+            self.comm.send_block(block, block, dest=self.dest, flags=FLAG_PREAMBLE,
+                                 seq=self.system.steps - n)
+            budget -= n
+            sent += n
+            flags = self._poll_control()
+            while flags is not None:
+                if flags & FLAG_SYNC_ACK:
+                    budget = 0
+                elif flags & FLAG_SYNC_LOST:
+                    budget = self.preamble_steps
+                flags = self._poll_control()
+        self.samples_sent += sent
+        print(f"[SENDER] Preamble sent: {sent} steps ({pacer.describe()})")
+        return sent
+
+    def _poll_control(self):
+        """Flags of a pending back-channel frame, or None"""
+        poll = getattr(self.comm, 'poll_frame', None)
+        frame = poll() if poll is not None else None
+        return frame.flags if frame is not None else None
 
 
     def _encode_message(self, message):
         """Paper's signal masking from Section 3"""
-        encoded = []
-        true_states = [] 
-        
-        for char in message:
-            perturb = PerturbationEncoder.encode(char)
-            true_state = self.system.continuous_step(dt=self.dt)
-            true_states.append(true_state.copy())  # Save true state
-            
-            masked_state = true_state.copy()
-            masked_state[0] += perturb[0]  # v = x₁ + s
-            encoded.append(masked_state)
+        profiler = self.profiler
+        profiler.begin()
+        if self.symbol_mapper is not None:
+            data = message.encode('utf-8') if isinstance(message, str) else message
+            perturb = self.symbol_mapper.map(data)
+            profiler.lap('map')
+            true_states = self.system.integrate(len(perturb), dt=self.dt)
+            profiler.lap('integrate')
+            return true_states + perturb, true_states
+
+        perturb = PerturbationEncoder.encode_array(message)
+        profiler.lap('map')
+        true_states = self.system.integrate(len(perturb), dt=self.dt)
+        profiler.lap('integrate')
+        encoded = true_states.copy()
+        encoded[:, 0] += perturb  # v = x₁ + s
         
         return encoded, true_states
 
 
+    def send_message(self, message):
+        """Mask and transmit one message, returns achieved samples/sec"""
+        encoded_states, true_states = self._encode_message(message)
+        return self._send_states(encoded_states, true_states)
+
+
+    def send_file(self, source, chunk_steps=16384):
+        """Stream a file through the masking in bounded memory, returns steps sent"""
+        return StreamEncoder(self, chunk_steps).send(source)
+
+
     def run(self):
         self._synchronization_preamble()
         print("[SENDER] Ready for message input")
@@ -47,25 +159,25 @@ class SecureSender:
             while True:
                 # Background sync transmission
                 if sync_counter % self.sync_interval == 0:
+                    self.pacer.wait(1)
                     state = self.system.continuous_step(dt=self.dt)
-                    self.comm.send(state,true_state=state, dest=self.dest)  # Fixed here
+                    self.comm.send(state,true_state=state, dest=self.dest, flags=FLAG_PREAMBLE,
+                                   seq=self.system.steps - 1)  # Fixed here
                     
                 # Message handling
                 message = input("Enter message (or press Enter): ")
                 if message:
-                    encoded_states, true_states = self._encode_message(message)
-                    for i, state in enumerate(encoded_states):
-                        # Include both true_state and dest parameters
-                        self.comm.send(
-                            state=state,
-                            true_state=true_states[i],  # Actual chaotic state
-                            dest=self.dest
-                        )
-                        sync_counter += 1
-                        time.sleep(0.001)
+                    # Steps, not characters: a SymbolMapper packs several per step
+                    sent = self.samples_sent
+                    self.send_message(message)
+                    steps = self.samples_sent - sent
+                    sync_counter += steps
+                    print(f"[SENDER] {steps} samples sent ({self.pacer.describe()})")
 
                 
         except KeyboardInterrupt:
             pass
         finally:
+            if self.profiler.enabled:
+                self.profiler.dump()
             self.comm.close()
@@ -0,0 +1,359 @@
+# server.py
+import time
+import numpy as np
+from utilities.lorenz import ChaoticEnsemble, ChaoticSystem
+from utilities.metrics import Metrics
+from utilities.perturbation import PerturbationDecoder, PerturbationEncoder
+from utilities.transport import SocketTransport, UDPTransport
+from utilities.wire import (FLAG_PREAMBLE, FLAG_SYNC_ACK, FLAG_SYNC_LOST, FrameError,
+                            encode_control, get_codec)
+
+
+class SessionServer:
+    """Many sender links demultiplexed from one UDP port by session id
+
+    Each session is a row of one receiver ChaoticEnsemble rather than a
+    Receiver object. A session is created when its first FLAG_PREAMBLE
+    frame arrives and evicted after idle_timeout seconds without traffic;
+    frames for unknown sessions that are not preamble are dropped.
+
+    The transport (UDP by default) is drained in batches. Every session with samples in the
+    batch is then advanced together, one step_subset() call per sample
+    position. Sync is tracked per session with the same 100-sample moving
+    average and lock/reset thresholds as ReceiverCore (a ring of error
+    norms per row with running sums), and locked sessions decode the
+    legacy x-channel perturbations.
+
+    Frame seq is the sender's step index: stale or duplicate frames are
+    dropped and gaps are free-run (stepped without feedback) so lost
+    datagrams do not shift a session against its sender. Frames are
+    reordered within each drained batch only; a frame that arrives after
+    its gap was free-run counts as stale.
+    """
+
+    def __init__(self, port=12346, host='', capacity=65536, idle_timeout=30.0, codec='binary',
+                 on_message=None, metrics=None, max_drain=4096, recv_buffer=8 << 20,
+                 reuse_port=False, sock=None, checkpoints=None, transport=None):
+        if transport is None:
+            if sock is None:
+                transport = UDPTransport(host, port, recv_buffer=recv_buffer,
+                                         reuse_port=reuse_port)
+                port = transport.address[1]
+            else:
+                transport = SocketTransport(sock)
+        self.transport = transport
+        self.sock = getattr(transport, 'sock', None)
+        if self.sock is not None:
+            self.sock.setblocking(False)
+        self.port = port
+        self._encode, self._decode = get_codec(codec)
+        self.max_drain = max_drain
+
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self.dt = 0.001
+        self.sync_window = 100
+        self.sync_threshold = 1e-4
+        self.reset_threshold = 1e-2  # Paper's resync condition
+        # Longer gaps drop the session's lock. Stricter than ReceiverCore's
+        # 10000: a gap is free-run as NaN rows inside the batch's lockstep
+        # loop, so one session's gap lengthens the step loop (and the padded
+        # block) of every session in that batch
+        self.max_free_run = 1000
+
+        # Session table: id -> ensemble row, plus per-row arrays
+        self.ensemble = ChaoticEnsemble(capacity, system_type='receiver')
+        self.slots = {}
+        self.peers = {}  # session id -> address for acks
+        self._free = list(range(capacity - 1, -1, -1))
+        self.session_ids = np.zeros(capacity, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.synchronized = np.zeros(capacity, dtype=bool)
+        self.last_seen = np.zeros(capacity)
+        self.error_ring = np.zeros((capacity, self.sync_window), dtype=np.float32)
+        self.error_sum = np.zeros(capacity)
+        self.error_count = np.zeros(capacity, dtype=np.int64)
+        self._next_step = [None] * capacity  # Unwrapped step index expected next
+        self._last_evict = time.monotonic()
+        # Optional checkpoints.CheckpointStore: new sessions start on the
+        # sender's trajectory at their first frame's step
+        self.checkpoints = checkpoints
+        self._seeker = ChaoticSystem(system_type='receiver')
+
+        # Decoded text goes to on_message(session, text), else into decoded
+        # (an evicted session's entry goes with it)
+        self.on_message = on_message
+        self.decoded = {}
+        self._init_metrics(metrics or Metrics())
+
+    def _init_metrics(self, metrics):
+        self.metrics = metrics
+        self._packets = metrics.counter('packets_received')
+        self._stale = metrics.counter('packets_stale')
+        self._lost = metrics.counter('samples_lost')
+        self._malformed = metrics.counter('packets_malformed')
+        self._unknown = metrics.counter('packets_unknown_session')
+        self._samples = metrics.counter('samples_received')
+        self._decoded = metrics.counter('samples_decoded')
+        self._created = metrics.counter('sessions_created')
+        self._evicted = metrics.counter('sessions_evicted')
+        self._rejected = metrics.counter('sessions_rejected')
+        self._locked = metrics.counter('sessions_synchronized')
+        self._resets = metrics.counter('sync_resets')
+        self._active = metrics.gauge('sessions_active')
+        self._latency = metrics.histogram('latency_ns')
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _open(self, session, now):
+        """Ensemble row for a new session, or None when full"""
+        if not self._free:
+            self.evict_idle(now)
+            if not self._free:
+                self._rejected.inc()
+                return None
+        slot = self._free.pop()
+        self.slots[session] = slot
+        self.session_ids[slot] = session
+        self.active[slot] = True
+        self.synchronized[slot] = False
+        self.error_ring[slot] = 0.0
+        self.error_sum[slot] = 0.0
+        self.error_count[slot] = 0
+        self._next_step[slot] = None
+        self.last_seen[slot] = now  # Not idle yet, even with no samples
+        self.ensemble.reset_states(slot)
+        self._created.inc()
+        self._active.set(len(self.slots))
+        return slot
+
+    def evict_idle(self, now=None):
+        """Free every session idle for longer than idle_timeout"""
+        now = time.monotonic() if now is None else now
+        self._last_evict = now
+        idle = np.flatnonzero(self.active & (now - self.last_seen > self.idle_timeout))
+        for slot in idle.tolist():
+            session = int(self.session_ids[slot])
+            del self.slots[session]
+            self.peers.pop(session, None)
+            self.decoded.pop(session, None)
+            self._free.append(slot)
+        self.active[idle] = False
+        self._evicted.inc(len(idle))
+        self._active.set(len(self.slots))
+        return len(idle)
+
+    def receive_batch(self, timeout=0.1):
+        """Wait up to timeout for traffic, then drain up to max_drain datagrams"""
+        return self.transport.recv_batch(self.max_drain, timeout)
+
+    def process(self, datagrams):
+        """Demultiplex, step and decode a batch; returns {session: new text}"""
+        now = time.monotonic()
+        now_ns = time.time_ns()
+        arrivals = {}  # slot -> frames with samples, in arrival order
+        blocks = {}  # slot -> list of ((K, 3) states, preamble), in step order
+        preamble = {}  # session -> slot that asked for an ack
+        decode, slots, peers, last_seen = self._decode, self.slots, self.peers, self.last_seen
+        for data, addr in datagrams:
+            try:
+                frame = decode(data)
+            except FrameError:
+                self._malformed.value += 1
+                continue
+            self._packets.value += 1
+            self._latency.record(now_ns - frame.timestamp)
+            session = frame.session
+            slot = slots.get(session)
+            if slot is None:
+                if not frame.flags & FLAG_PREAMBLE:
+                    self._unknown.value += 1
+                    continue
+                slot = self._open(session, now)
+                if slot is None:
+                    continue
+            peers[session] = addr
+            # Seen now: an eviction by a later _open in this batch must
+            # not free a slot that already has arrivals
+            last_seen[slot] = now
+            if frame.flags & FLAG_PREAMBLE:
+                preamble[session] = slot
+            if len(frame.states):
+                self._samples.value += len(frame.states)
+                arrivals.setdefault(slot, []).append(frame)
+
+        # Within a batch, frames of a session are put back in step order
+        for slot, frames in arrivals.items():
+            if len(frames) > 1:
+                first = self._next_step[slot]
+                first = frames[0].seq if first is None else first
+                frames.sort(key=lambda f: (f.seq - first + 0x80000000) & 0xFFFFFFFF)
+            for frame in frames:
+                self._sequence(slot, frame, blocks)
+
+        text = self._step(blocks) if blocks else {}
+
+        # Ack every preamble datagram of a locked session
+        for session, slot in preamble.items():
+            if self.synchronized[slot]:
+                self.send_control(session, FLAG_SYNC_ACK)
+        if now - self._last_evict > self.idle_timeout / 4:
+            self.evict_idle(now)
+
+        if self.on_message is not None:
+            for session, piece in text.items():
+                self.on_message(session, piece)
+        else:
+            for session, piece in text.items():
+                self.decoded.setdefault(session, []).append(piece)
+        return text
+
+    def _sequence(self, slot, frame, blocks):
+        """Queue a frame's samples in step order, NaN rows over gaps"""
+        states = frame.states
+        expected = self._next_step[slot]
+        if expected is None:
+            expected = frame.seq
+            if self.checkpoints is not None:
+                self.ensemble.states[slot] = self.checkpoints.seek(self._seeker, frame.seq,
+                                                                   dt=self.dt)
+        offset = (frame.seq - expected) & 0xFFFFFFFF
+        if offset >= 0x80000000:
+            behind = 0x100000000 - offset
+            if behind >= len(states):
+                self._stale.value += 1
+                return
+            states, offset = states[behind:], 0
+        queued = blocks.setdefault(slot, [])
+        if offset:
+            self._lost.value += offset
+            if offset > self.max_free_run:
+                self._unlock(slot)
+            else:
+                queued.append((np.full((offset, 3), np.nan), False))
+        queued.append((states, bool(frame.flags & FLAG_PREAMBLE)))
+        self._next_step[slot] = expected + offset + len(states)
+
+    def _unlock(self, slot):
+        """Back to syncing; the session needs a new preamble"""
+        self.synchronized[slot] = False
+        self.error_ring[slot] = 0.0
+        self.error_sum[slot] = 0.0
+        self.error_count[slot] = 0
+
+    def _step(self, blocks):
+        """Advance every session with samples, one sample position at a time"""
+        slots = np.fromiter(blocks.keys(), dtype=np.int64, count=len(blocks))
+        drives = [b[0][0] if len(b) == 1 else np.concatenate([states for states, _ in b])
+                  for b in blocks.values()]
+        lengths = np.fromiter(map(len, drives), dtype=np.int64, count=len(drives))
+
+        kmax = int(lengths.max())
+        padded = np.zeros((len(slots), kmax, 3))
+        # Preamble samples still in flight after lock are tracked, not decoded
+        muted = np.zeros((len(slots), kmax), dtype=bool)
+        for row, (drive, queued) in enumerate(zip(drives, blocks.values())):
+            padded[row, :len(drive)] = drive
+            start = 0
+            for states, preamble in queued:
+                if preamble:
+                    muted[row, start:start + len(states)] = True
+                start += len(states)
+        recovered = np.zeros((len(slots), kmax))
+        decoding = np.zeros((len(slots), kmax), dtype=bool)
+
+        ensemble, all_rows = self.ensemble, np.arange(len(slots))
+        scale = PerturbationEncoder.SCALE_FACTOR
+        for r in range(kmax):
+            rows = all_rows if r == 0 else np.flatnonzero(lengths > r)
+            sel = slots[rows]
+            # Error against the receiver state before the step, as in
+            # ChaoticSystem.integrate(drive=...)
+            errors = padded[rows, r] - ensemble.states[sel]
+            recovered[rows, r] = errors[:, 0]
+            synced = self.synchronized[sel]
+            message = synced & ~muted[rows, r]
+            # Locked sessions keep the decided character out of the
+            # feedback (decision-directed, as ReceiverCore does)
+            feedback = errors[:, 0] - message * (np.clip(np.rint(errors[:, 0] / scale), 0, 95)
+                                                * scale)
+            # NaN rows are lost steps: free-run with no feedback
+            received = ~np.isnan(feedback)
+            if received.all():
+                decoding[rows, r] = message
+                ensemble.step_subset(sel, feedback, dt=self.dt)
+            else:
+                decoding[rows, r] = message & received
+                ensemble.step_subset(sel, np.where(received, feedback, 0.0), dt=self.dt)
+                synced = synced | ~received
+            if not synced.all():
+                syncing = ~synced
+                self._track(sel[syncing], np.linalg.norm(errors[syncing], axis=1))
+
+        text = {}
+        for row in np.flatnonzero(decoding.any(axis=1)).tolist():
+            values = recovered[row, decoding[row]]
+            text[int(self.session_ids[slots[row]])] = \
+                PerturbationDecoder.decode_array(values).decode('latin-1')
+            self._decoded.value += len(values)
+        return text
+
+    def _track(self, sel, norms):
+        """Moving average of the error norm per session; lock or reset"""
+        count = self.error_count[sel]
+        pos = count % self.sync_window
+        norms = norms.astype(np.float32)
+        # Window sums: add the new norm, subtract the one it overwrites
+        self.error_sum[sel] += norms - self.error_ring[sel, pos]
+        self.error_ring[sel, pos] = norms
+        count += 1
+        self.error_count[sel] = count
+        # Resync the running sums once per lap of the ring, as SyncTracker
+        # does, so add/subtract rounding cannot accumulate
+        lapped = sel[count % self.sync_window == 0]
+        if len(lapped):
+            self.error_sum[lapped] = self.error_ring[lapped].sum(axis=1, dtype=np.float64)
+        ready = count > self.sync_window
+        mean = self.error_sum[sel] / self.sync_window
+
+        locked = sel[ready & (mean < self.sync_threshold)]
+        self.synchronized[locked] = True
+        self._locked.inc(len(locked))
+
+        lost = ready & (mean > self.reset_threshold)
+        if lost.any():
+            lost = sel[lost]
+            self.error_ring[lost] = 0.0
+            self.error_sum[lost] = 0.0
+            self.error_count[lost] = 0
+            self.ensemble.reset_states(lost)
+            self._resets.inc(len(lost))
+            for slot in lost.tolist():
+                self.send_control(int(self.session_ids[slot]), FLAG_SYNC_LOST)
+
+    def send_control(self, session, flags):
+        addr = self.peers.get(session)
+        if addr is not None:
+            # Best effort (a full buffer drops it); the sender retries on
+            # the next preamble frame
+            self.transport.sendto(encode_control(flags, encode=self._encode, session=session),
+                                  addr)
+
+    def run(self, timeout=0.1):
+        """Serve until interrupted"""
+        print(f"[SERVER:{self.port}] Serving up to {self.capacity} sessions...")
+        try:
+            while True:
+                datagrams = self.receive_batch(timeout)
+                if datagrams:
+                    self.process(datagrams)
+                elif time.monotonic() - self._last_evict > self.idle_timeout / 4:
+                    self.evict_idle()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        self.transport.close()
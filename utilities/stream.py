@@ -0,0 +1,175 @@
+# stream.py
+import os
+import struct
+import numpy as np
+from utilities.perturbation import SymbolMapper
+
+# Stream framing: magic, payload length; the decoder skips whatever
+# precedes the magic (e.g. noise decoded before lock)
+STREAM_MAGIC = b'CSF\x01'
+STREAM_HEADER = struct.Struct('<4sQ')
+
+
+def read_chunks(source, chunk_size=1 << 16):
+    """Yield successive chunks of a path or binary file object"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            yield from read_chunks(f, chunk_size)
+        return
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    return os.fstat(source.fileno()).st_size - source.tell()
+
+
+class StreamEncoder:
+    """Masks a file of any size chunk by chunk through a SecureSender
+
+    The sender's SymbolMapper carries the bytes (one is installed if it
+    has none: the legacy one-character scheme cannot carry newlines or
+    binary data). Chunks are a whole number of steps, so only the last
+    one is padded, and the stream starts with STREAM_HEADER so the
+    receiver knows where the data begins and how long it is. Memory use
+    is bounded by the chunk size.
+    """
+
+    def __init__(self, sender, chunk_steps=16384):
+        if sender.symbol_mapper is None:
+            sender.symbol_mapper = SymbolMapper()
+        self.sender = sender
+        self.mapper = sender.symbol_mapper
+        if self.mapper.bits_per_step % 8:
+            raise ValueError("file streams need a whole number of bytes per step")
+        self.bytes_per_step = self.mapper.bits_per_step // 8
+        self.chunk_bytes = chunk_steps * self.bytes_per_step
+
+    def _rechunk(self, source, size):
+        """Header + file bytes, cut into whole-step chunks"""
+        pending = STREAM_HEADER.pack(STREAM_MAGIC, size)
+        for chunk in read_chunks(source, self.chunk_bytes):
+            pending += chunk
+            if len(pending) >= self.chunk_bytes:
+                yield pending[:self.chunk_bytes]
+                pending = pending[self.chunk_bytes:]
+        if pending:
+            yield pending
+
+    def n_steps(self, size):
+        """Masked steps needed for a payload of size bytes"""
+        # Every chunk but the last is whole steps, so only the tail pads
+        total = STREAM_HEADER.size + size
+        return (total // self.bytes_per_step
+                + self.mapper.n_steps(total % self.bytes_per_step))
+
+    def blocks(self, source, size=None):
+        """Yield (masked_states, true_states) per chunk, in step order"""
+        size = _source_size(source) if size is None else size
+        for chunk in self._rechunk(source, size):
+            yield self.sender._encode_message(chunk)
+
+    def send(self, source, size=None):
+        """Stream a file to the sender's destination; returns steps sent"""
+        steps = 0
+        for masked, true_states in self.blocks(source, size):
+            self.sender._send_states(masked, true_states)
+            steps += len(masked)
+        return steps
+
+    def to_memmap(self, source, path, size=None, preamble=1000):
+        """Write the preamble and masked trajectory to a float32 .npy file
+
+        The file can be decoded offline with decode_trajectory().
+        """
+        size = _source_size(source) if size is None else size
+        n = preamble + self.n_steps(size)
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(n, 3))
+        out[:preamble] = self.sender.system.integrate(preamble, dt=self.sender.dt)
+        row = preamble
+        for masked, _ in self.blocks(source, size):
+            out[row:row + len(masked)] = masked
+            row += len(masked)
+        out.flush()
+        return out
+
+
+class StreamDecoder:
+    """Receiver-side sink writing a framed stream to a file incrementally
+
+    Set as ReceiverCore.sink; it is fed the raw demapped bytes of every
+    block. Bytes before STREAM_MAGIC (unmodulated steps, or noise decoded
+    before the sender started) are skipped and counted in skipped, then
+    exactly the announced number of bytes is written.
+    """
+
+    def __init__(self, out):
+        self._owns = isinstance(out, (str, os.PathLike))
+        self.file = open(out, 'wb') if self._owns else out
+        self._pending = b''
+        self.size = None
+        self.written = 0
+        self.skipped = 0
+
+    @property
+    def done(self):
+        return self.size is not None and self.written >= self.size
+
+    def feed(self, data):
+        if self.done:
+            return
+        if self.size is None:
+            data = self._pending + data
+            start = data.find(STREAM_MAGIC)
+            if start < 0:
+                # Keep a tail that may be the start of a split magic
+                keep = len(STREAM_MAGIC) - 1
+                self.skipped += max(len(data) - keep, 0)
+                self._pending = data[-keep:]
+                return
+            self.skipped += start
+            data = data[start:]
+            if len(data) < STREAM_HEADER.size:
+                self._pending = data
+                return
+            _, self.size = STREAM_HEADER.unpack_from(data)
+            self._pending = b''
+            data = data[STREAM_HEADER.size:]
+        data = data[:self.size - self.written]
+        self.file.write(data)
+        self.written += len(data)
+        if self.done:
+            self.file.flush()
+
+    def close(self):
+        if self._owns:
+            self.file.close()
+
+
+def decode_trajectory(path, out, receiver, block_steps=16384, sync_steps=100, first_step=0):
+    """Decode a to_memmap() trajectory file into out, block by block
+
+    receiver is a ReceiverCore with the sender's SymbolMapper. first_step
+    is the sender's step index at the start of the preamble. Lock is only
+    judged at block ends, so the preamble goes in sync_steps blocks.
+    """
+    if receiver.symbol_mapper is None:
+        raise ValueError("decoding a stream needs the sender's SymbolMapper")
+    states = np.load(path, mmap_mode='r')
+    sink = receiver.sink = StreamDecoder(out)
+    try:
+        start = 0
+        while start < len(states) and not sink.done:
+            n = block_steps if receiver.synchronized else sync_steps
+            block = np.asarray(states[start:start + n], dtype=np.float64)
+            receiver.feed_states(block, first_step + start)
+            start += n
+    finally:
+        sink.close()
+        receiver.sink = None
+    return sink.written
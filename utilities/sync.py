@@ -0,0 +1,57 @@
+# sync.py
+import numpy as np
+
+
+class SyncTracker:
+    """Moving average of the last window sync errors, O(1) per sample
+
+    Replaces the unbounded error list and its np.mean(errors[-100:]) per
+    packet: errors go into a fixed ring and a running sum is adjusted by
+    what enters and leaves it. The sum is recomputed once per lap so
+    rounding cannot accumulate.
+    """
+
+    def __init__(self, window=100):
+        self.window = window
+        self.values = np.zeros(window)
+        self.total = 0.0
+        self.count = 0  # Errors seen since the last reset
+        self._pos = 0
+
+    def extend(self, errors):
+        errors = np.asarray(errors, dtype=np.float64)
+        n = len(errors)
+        if n >= self.window:
+            self.values[:] = errors[-self.window:]
+            self._pos = 0
+            self.total = float(self.values.sum())
+        else:
+            end = self._pos + n
+            if end < self.window:
+                self.total += float(errors.sum() - self.values[self._pos:end].sum())
+                self.values[self._pos:end] = errors
+                self._pos = end
+            else:
+                # Wrapping: write both pieces and resync the sum
+                first = self.window - self._pos
+                self.values[self._pos:] = errors[:first]
+                self.values[:n - first] = errors[first:]
+                self._pos = n - first
+                self.total = float(self.values.sum())
+        self.count += n
+
+    @property
+    def ready(self):
+        """A full window has been seen (the paper's >100 samples)"""
+        return self.count > self.window
+
+    @property
+    def mean(self):
+        n = min(self.count, self.window)
+        return self.total / n if n else 0.0
+
+    def reset(self):
+        self.values[:] = 0.0
+        self.total = 0.0
+        self.count = 0
+        self._pos = 0
@@ -0,0 +1,239 @@
+# transport.py
+import abc
+import itertools
+import os
+import queue
+import select
+import socket
+import sys
+import threading
+
+# Large enough for any wire frame (and for legacy pickled states)
+MAX_DATAGRAM = 65536
+
+
+class Transport(abc.ABC):
+    """Datagram transport behind Communicator and SessionServer
+
+    sendto(packet, addr) and recv(timeout) move single datagrams;
+    recv_batch() waits up to timeout for the first and then drains
+    everything already queued without blocking. Addresses are whatever
+    the backend uses (a (host, port) tuple, a socket path, a queue name);
+    resolve() turns the 'host:port' strings the sender is configured
+    with into one.
+    """
+
+    @abc.abstractmethod
+    def sendto(self, packet, addr):
+        pass
+
+    @abc.abstractmethod
+    def recv(self, timeout=None):
+        """(data, addr) of the next datagram; None if none within timeout
+
+        timeout None blocks, 0 polls.
+        """
+
+    @abc.abstractmethod
+    def recv_batch(self, max_n=4096, timeout=0.0):
+        pass
+
+    def resolve(self, dest):
+        return dest
+
+    @property
+    @abc.abstractmethod
+    def address(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SocketTransport(Transport):
+    """A datagram socket; receives drain non-blocking
+
+    Sends block while the socket is in blocking mode (backpressure, e.g.
+    from a full AF_UNIX peer); in non-blocking mode a full buffer drops
+    the datagram, as does a Unix peer that no longer exists. Drops are
+    counted in dropped.
+    """
+
+    def __init__(self, sock, recv_buffer=None, send_buffer=None, max_datagram=MAX_DATAGRAM):
+        if recv_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer)
+        if send_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer)
+        self.sock = sock
+        self.max_datagram = max_datagram
+        self.dropped = 0
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def sendto(self, packet, addr):
+        try:
+            self.sock.sendto(packet, addr)
+        except (BlockingIOError, ConnectionRefusedError, FileNotFoundError):
+            self.dropped += 1  # Full buffer, or a Unix peer that has gone
+
+    def recv(self, timeout=None):
+        try:
+            if timeout is None:
+                return self.sock.recvfrom(self.max_datagram)
+            if not select.select([self.sock], [], [], timeout)[0]:
+                return None
+            return self.sock.recvfrom(self.max_datagram, socket.MSG_DONTWAIT)
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            return None
+
+    def recv_batch(self, max_n=4096, timeout=0.0):
+        first = self.recv(timeout)
+        if first is None:
+            return []
+        datagrams = [first]
+        recvfrom, size, flags = self.sock.recvfrom, self.max_datagram, socket.MSG_DONTWAIT
+        try:
+            for _ in range(max_n - 1):
+                datagrams.append(recvfrom(size, flags))
+        except (BlockingIOError, InterruptedError):
+            pass
+        return datagrams
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def close(self):
+        self.sock.close()
+
+
+class UDPTransport(SocketTransport):
+    """AF_INET datagrams; bound to (host, port) unless port is None"""
+
+    def __init__(self, host='', port=None, recv_buffer=None, send_buffer=None,
+                 reuse_port=False, sock=None, max_datagram=MAX_DATAGRAM):
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if reuse_port:
+                # Several processes bind the same port; the kernel spreads
+                # senders over them by address hash
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().__init__(sock, recv_buffer, send_buffer, max_datagram)
+        if port is not None:
+            sock.bind((host, port))
+        self._resolved = {}
+
+    def resolve(self, dest):
+        """'host:port' -> (ip, port), resolved once"""
+        if not isinstance(dest, str):
+            return dest
+        addr = self._resolved.get(dest)
+        if addr is None:
+            host, port = dest.rsplit(':', 1)
+            addr = self._resolved[dest] = (socket.gethostbyname(host), int(port))
+        return addr
+
+
+class UnixTransport(SocketTransport):
+    """AF_UNIX datagrams: same-host links without the IP stack
+
+    Bound to path if given (a stale socket file there is replaced),
+    else autobound to an abstract address on Linux so peers can reply.
+    A receiver queues at most net.unix.max_dgram_qlen datagrams (often
+    only 10), after which sends block, or drop with blocking=False.
+    """
+
+    def __init__(self, path=None, recv_buffer=None, send_buffer=None,
+                 max_datagram=MAX_DATAGRAM, blocking=True):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(blocking)
+        super().__init__(sock, recv_buffer, send_buffer, max_datagram)
+        self.path = path
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)
+            sock.bind(path)
+        elif sys.platform.startswith('linux'):  # Abstract-namespace autobind
+            sock.bind('')
+
+    def close(self):
+        super().close()
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class QueueTransport(Transport):
+    """In-process datagrams for running both ends in one process
+
+    Packets are handed to the peer's queue by reference: no copy, no
+    system call. Queues are found by name; sends to an unknown name or a
+    queue already holding capacity datagrams are dropped, as UDP would.
+    """
+
+    _queues = {}
+    _names = itertools.count()
+    _lock = threading.Lock()
+
+    def __init__(self, name=None, capacity=65536):
+        with QueueTransport._lock:
+            if name is None:
+                name = f"queue-{next(QueueTransport._names)}"
+            if name in QueueTransport._queues:
+                raise ValueError(f"Queue transport {name!r} already open")
+            self._queue = QueueTransport._queues[name] = queue.SimpleQueue()
+        self.name = name
+        self.capacity = capacity
+        self.dropped = 0
+
+    def sendto(self, packet, addr):
+        peer = QueueTransport._queues.get(addr)
+        if peer is None or peer.qsize() >= self.capacity:
+            self.dropped += 1
+            return
+        peer.put((packet, self.name))
+
+    def recv(self, timeout=None):
+        try:
+            if timeout == 0:
+                return self._queue.get_nowait()
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def recv_batch(self, max_n=4096, timeout=0.0):
+        first = self.recv(timeout)
+        if first is None:
+            return []
+        datagrams = [first]
+        get = self._queue.get_nowait
+        try:
+            for _ in range(max_n - 1):
+                datagrams.append(get())
+        except queue.Empty:
+            pass
+        return datagrams
+
+    @property
+    def address(self):
+        return self.name
+
+    def close(self):
+        with QueueTransport._lock:
+            if QueueTransport._queues.get(self.name) is self._queue:
+                del QueueTransport._queues[self.name]
+
+
+TRANSPORTS = {'udp': UDPTransport, 'unix': UnixTransport, 'queue': QueueTransport}
+
+
+def open_transport(kind='udp', address=None, **kwargs):
+    """Transport by name: udp binds port address (None: unbound), unix binds
+    path address, queue registers name address"""
+    if kind not in TRANSPORTS:
+        raise ValueError(f"Unknown transport {kind!r}; choose from {sorted(TRANSPORTS)}")
+    if kind == 'udp':
+        return UDPTransport(port=address, **kwargs)
+    if kind == 'unix':
+        return UnixTransport(path=address, **kwargs)
+    return QueueTransport(name=address, **kwargs)
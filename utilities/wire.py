@@ -0,0 +1,155 @@
+# wire.py
+import struct
+import time
+import pickle
+from collections import namedtuple
+import numpy as np
+
+MAGIC = b'CS'
+VERSION = 3
+
+# Flags
+FLAG_TRUE_STATE = 0x01  # payload carries true_states after states
+FLAG_SYNC_ACK = 0x02    # receiver -> sender: locked on, preamble can stop
+FLAG_SYNC_LOST = 0x04   # receiver -> sender: sync reset, keep the preamble going
+FLAG_PREAMBLE = 0x08    # sender -> receiver: sync preamble sample, please ack
+
+# magic, version, flags, sample count, (2 pad bytes), session id, sequence
+# number, send timestamp (ns); 24 bytes keeps the float32 payload aligned
+HEADER = struct.Struct('<2sBBHxxIIQ')
+STATE_BYTES = 3 * 4  # float32 x, y, z
+
+# Largest UDP payload that fits a 1500-byte Ethernet MTU without fragmenting
+MAX_DATAGRAM = 1500 - 20 - 8
+
+Frame = namedtuple('Frame', ['seq', 'timestamp', 'flags', 'states', 'true_states', 'session'],
+                   defaults=(0,))
+
+
+class FrameError(ValueError):
+    """Raised for datagrams that are not valid frames"""
+
+
+def max_batch(with_true_state=True, max_datagram=MAX_DATAGRAM):
+    """Most samples that fit in one datagram of max_datagram bytes"""
+    per_sample = STATE_BYTES * (2 if with_true_state else 1)
+    return (max_datagram - HEADER.size) // per_sample
+
+
+# Whole-frame layouts for one state / state + true_state
+_FRAMES = {n: struct.Struct(HEADER.format + f'{3*n}f') for n in (1, 2)}
+
+
+_SESSION = struct.Struct('<I')
+_SESSION_OFFSET = 8
+
+
+def peek_session(data):
+    """Session id of a binary frame without decoding it (for dispatchers)"""
+    if len(data) < HEADER.size or data[:2] != MAGIC:
+        raise FrameError("Not a binary frame")
+    return _SESSION.unpack_from(data, _SESSION_OFFSET)[0]
+
+
+def encode_control(flags, seq=0, encode=None, session=0):
+    """Sample-less frame carrying only flags (the sync back-channel)"""
+    return (encode or encode_frame)(np.empty((0, 3), dtype=np.float32), seq=seq, flags=flags,
+                                    session=session)
+
+
+def _floats(values):
+    return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+
+def encode_frame(states, true_states=None, seq=0, timestamp=None, flags=0, session=0):
+    """Pack K samples (and optional true states) into one binary frame
+
+    states is a single (3,) state or a (K, 3) block. Layout (little
+    endian): 24-byte header, then float32 states[K, 3] and, when
+    FLAG_TRUE_STATE is set, float32 true_states[K, 3]. session tells
+    the links multiplexed on one server port apart.
+    """
+    if timestamp is None:
+        timestamp = time.time_ns()
+    if true_states is not None:
+        flags |= FLAG_TRUE_STATE
+    seq &= 0xFFFFFFFF
+
+    if np.ndim(states) == 1:
+        # Single-sample fast path: one struct pack, no temporary arrays
+        values = _floats(states)
+        if true_states is not None:
+            values += _floats(true_states)
+        return _FRAMES[len(values) // 3].pack(
+            MAGIC, VERSION, flags, 1, session, seq, timestamp, *values)
+
+    states = np.asarray(states, dtype=np.float32)
+    count = len(states)
+    parts = [HEADER.pack(MAGIC, VERSION, flags, count, session, seq, timestamp),
+             states.tobytes()]
+    if true_states is not None:
+        parts.append(np.asarray(true_states, dtype=np.float32).tobytes())
+    return b''.join(parts)
+
+
+def decode_frame(data):
+    """Unpack a frame; (K, 3) state blocks are zero-copy views of data"""
+    if len(data) < HEADER.size:
+        raise FrameError(f"Frame too short ({len(data)} bytes)")
+    magic, version, flags, count, session, seq, timestamp = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise FrameError(f"Bad frame magic {magic!r}")
+    if version != VERSION:
+        raise FrameError(f"Unsupported frame version {version}")
+    n_blocks = 2 if flags & FLAG_TRUE_STATE else 1
+    if len(data) != HEADER.size + n_blocks * count * STATE_BYTES:
+        raise FrameError(f"Bad frame length {len(data)} for {count} samples, flags {flags:#x}")
+    payload = np.frombuffer(data, dtype=np.float32, count=3*count*n_blocks,
+                            offset=HEADER.size).reshape(n_blocks, count, 3)
+    return Frame(seq, timestamp, flags, payload[0],
+                 payload[1] if n_blocks == 2 else None, session)
+
+
+def encode_pickle(states, true_states=None, seq=0, timestamp=None, flags=0, session=0):
+    """Legacy pickle encoding, kept for interoperability and comparison"""
+    return pickle.dumps({
+        'state': np.asarray(states).astype(np.float32).tolist(),
+        'true_state': np.asarray(true_states).astype(np.float32).tolist()
+                      if true_states is not None else None,
+        'timestamp': time.time_ns() if timestamp is None else timestamp,
+        'seq': seq,
+        'flags': flags,
+        'session': session,
+    })
+
+
+def decode_pickle(data):
+    """Legacy pickle decoding. Only use this with trusted peers"""
+    try:
+        packet = pickle.loads(data)
+        true_states = packet['true_state']
+        return Frame(
+            packet.get('seq', 0),
+            packet['timestamp'],
+            packet.get('flags', 0),
+            np.array(packet['state'], dtype=np.float64).reshape(-1, 3),
+            np.array(true_states, dtype=np.float64).reshape(-1, 3)
+            if true_states is not None else None,
+            packet.get('session', 0),
+        )
+    except (pickle.UnpicklingError, EOFError, KeyError, TypeError, ValueError) as exc:
+        raise FrameError(str(exc)) from exc
+
+
+CODECS = {
+    'binary': (encode_frame, decode_frame),
+    'pickle': (encode_pickle, decode_pickle),
+}
+
+
+def get_codec(name):
+    """Return the (encode, decode) pair for a codec name"""
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown codec {name!r}, expected one of {tuple(CODECS)}") from None